@@ -0,0 +1,595 @@
+# Teste de carga do explorador de filmes.
+# Simula N sessões do Streamlit em paralelo (AppTest, no mesmo processo, como num
+# servidor real: caches, agrupamento de consultas e disjuntor são compartilhados)
+# percorrendo o fluxo típico de uso: abertura, busca por título, clique no diretor,
+# clique no primeiro ator e abertura das estatísticas. As consultas vão a um
+# endpoint SPARQL local que reproduz respostas gravadas, com latência e limite de
+# requisições configuráveis. Ao final, mostra a vazão, os percentis p50/p95/p99 do
+# tempo de cada página, os fluxos com falha e a memória: a de cada sessão (liberada
+# quando as sessões terminam) separada da compartilhada (caches e índices).
+#
+# O endpoint local responde, em ordem: com a resposta gravada para a consulta (em
+# fixtures/carga/), com a resposta do endpoint real (apenas com --record, que grava
+# a resposta) ou com uma resposta sintética determinística, no mesmo formato das
+# consultas do app (QIDs de filmes, diretores, atores e gêneros, e rótulos).
+#
+# Gravação das respostas (requer acesso ao endpoint):
+#     python benchmarks/load_test.py --sessions 1 --record
+# Teste de carga com as respostas gravadas (ou sintéticas, na falta delas):
+#     python benchmarks/load_test.py --sessions 20 --latency 300 --rate 10 --max-concurrent 5
+
+import argparse
+import contextlib
+import csv
+import gc
+import hashlib
+import io
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+current_dir = Path(__file__).parent
+parent_dir = current_dir.parent
+sys.path.append(str(parent_dir))
+
+from src.cache import cache_key
+from src.instrumentation import percentile
+
+FIXTURES_DIR = current_dir / "fixtures" / "carga"
+APP_PATH = parent_dir / "src" / "app.py"
+UPSTREAM_ENDPOINT = "https://query.wikidata.org/sparql"
+USER_AGENT = "RodrigoNogueira/1.0"
+
+# Títulos buscados pelas sessões, em rodízio: sessões com o mesmo título
+# exercitam o cache e o agrupamento de consultas idênticas.
+TITLES = [
+    "Inception",
+    "The Godfather",
+    "Pulp Fiction",
+    "Titanic",
+    "Jaws",
+    "Psycho",
+    "Alien",
+    "Heat",
+]
+
+STEPS = ["abertura", "busca_titulo", "clique_diretor", "clique_ator", "estatisticas"]
+
+FORMAT_EXTENSIONS = {
+    "text/tab-separated-values": "tsv",
+    "text/csv": "csv",
+    "application/sparql-results+json": "json",
+}
+
+# Respostas sintéticas.
+# Cada QID é derivado de um hash do texto (título, pessoa ou filme), de modo que a
+# mesma consulta devolve sempre os mesmos filmes e o mesmo filme sempre tem o
+# mesmo diretor, elenco, ano e gêneros.
+
+ENTITY_PREFIX = "http://www.wikidata.org/entity/"
+GENRE_IDS = ["Q130232", "Q2484376", "Q157443", "Q200092", "Q319221", "Q188473", "Q1054574"]
+CAST_SIZE = 12
+
+
+def stable_number(text, span):
+    return int(hashlib.sha1(text.encode("utf-8")).hexdigest()[:8], 16) % span
+
+
+def synthetic_film(number, director=None):
+    seed = f"Q{number}"
+    actors = [f"Q{300000 + stable_number(f'{seed}/{i}', 20000)}" for i in range(CAST_SIZE)]
+    genres = [GENRE_IDS[stable_number(f"{seed}/g{i}", len(GENRE_IDS))] for i in range(2)]
+    return {
+        "film": ENTITY_PREFIX + seed,
+        "director": ENTITY_PREFIX + (director or f"Q{200000 + stable_number(seed, 997)}"),
+        "actors": " ".join(dict.fromkeys(actors)),
+        "year": str(1940 + stable_number(seed + "/ano", 80)),
+        "genreIds": " ".join(dict.fromkeys(genres)),
+    }
+
+
+def synthetic_label(qid, language):
+    number = int(qid[1:])
+    if 200000 <= number < 201000:
+        base = f"Diretor {number - 200000}"
+    elif 300000 <= number < 320000:
+        base = f"Ator {number - 300000}"
+    elif qid in GENRE_IDS:
+        base = f"gênero {GENRE_IDS.index(qid)}"
+    else:
+        base = f"Filme {qid}"
+    return base if language == "en" else f"{base} ({language})"
+
+
+def film_number_for_title(title):
+    return 1000000 + stable_number(title, 900000)
+
+
+def synthetic_rows(query):
+    if "?item ?label" in query:
+        match = re.search(r'wikibase:language "([^",]+)', query)
+        language = match.group(1) if match else "en"
+        return [
+            {"item": ENTITY_PREFIX + qid, "label": synthetic_label(qid, language)}
+            for qid in dict.fromkeys(re.findall(r"wd:(Q\d+)", query))
+        ]
+
+    if "VALUES ?title" in query:
+        rows = []
+        for title in re.findall(r'"((?:[^"\\]|\\.)*)"@en', query):
+            row = synthetic_film(film_number_for_title(title))
+            row["title"] = title
+            rows.append(row)
+        return rows
+
+    match = re.search(r'\?film rdfs:label "((?:[^"\\]|\\.)*)"@en', query)
+    if match:
+        return [synthetic_film(film_number_for_title(match.group(1)))]
+
+    match = re.search(r"VALUES \?film \{([^}]*)\}", query)
+    if match:
+        return [synthetic_film(int(qid)) for qid in re.findall(r"wd:Q(\d+)", match.group(1))]
+
+    # Filmografia de uma pessoa: entre 5 e 80 filmes, paginados com LIMIT/OFFSET
+    match = re.search(r"wdt:(P57|P161) wd:(Q\d+)", query)
+    person = match.group(2) if match else cache_key(query)
+    count = 5 + stable_number(person, 76)
+    numbers = [1000000 + stable_number(f"{person}/{i}", 900000) for i in range(count)]
+    director = person if match and match.group(1) == "P57" else None
+    rows = [synthetic_film(number, director) for number in numbers]
+    rows.sort(key=lambda row: (-int(row["year"]), row["film"]))
+
+    limit = re.search(r"LIMIT (\d+)", query)
+    offset = re.search(r"OFFSET (\d+)", query)
+    start = int(offset.group(1)) if offset else 0
+    end = start + int(limit.group(1)) if limit else None
+    return rows[start:end]
+
+
+def tsv_term(value):
+    if value.startswith(ENTITY_PREFIX):
+        return f"<{value}>"
+    escaped = value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n").replace("\t", "\\t")
+    return f'"{escaped}"'
+
+
+def encode_rows(rows, result_format):
+    names = list(dict.fromkeys(name for row in rows for name in row)) or ["film"]
+    if result_format == "tsv":
+        lines = ["\t".join(f"?{name}" for name in names)]
+        lines.extend("\t".join(tsv_term(row[name]) if name in row else "" for name in names) for row in rows)
+        return ("\n".join(lines) + "\n").encode("utf-8")
+    if result_format == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\r\n")
+        writer.writerow(names)
+        writer.writerows([row.get(name, "") for name in names] for row in rows)
+        return buffer.getvalue().encode("utf-8")
+
+    bindings = [
+        {
+            name: {"type": "uri" if value.startswith(ENTITY_PREFIX) else "literal", "value": value}
+            for name, value in row.items()
+        }
+        for row in rows
+    ]
+    return json.dumps({"head": {"vars": names}, "results": {"bindings": bindings}}).encode("utf-8")
+
+
+# Endpoint SPARQL local.
+# Atende GET e POST como o Wikidata, com uma latência média (mais uma variação
+# aleatória) por resposta e dois limites, como o serviço público: requisições por
+# segundo (balde de fichas) e consultas simultâneas. Acima deles, responde 429
+# com Retry-After, que o cliente do app respeita ao tentar novamente.
+
+class StubEndpoint:
+    def __init__(self, latency=0.0, jitter=0.0, rate=0.0, burst=None, max_concurrent=0,
+                 retry_after=1, record=False, upstream=UPSTREAM_ENDPOINT, synthetic=True):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate = rate
+        self.burst = burst or max(rate, 1)
+        self.max_concurrent = max_concurrent
+        self.retry_after = retry_after
+        self.record = record
+        self.upstream = upstream
+        self.synthetic = synthetic
+        self._lock = threading.Lock()
+        self._tokens = self.burst
+        self._refilled = time.monotonic()
+        self._active = 0
+        self.stats = {
+            "requisicoes": 0, "gravadas": 0, "sinteticas": 0, "upstream": 0,
+            "limitadas": 0, "falhas": 0, "pico_simultaneas": 0,
+        }
+        self._server = None
+
+    def start(self):
+        endpoint = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                query = parse_qs(urlparse(self.path).query).get("query", [""])[0]
+                endpoint.handle(self, query)
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode("utf-8")
+                endpoint.handle(self, parse_qs(body).get("query", [""])[0])
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self._server.server_port}/sparql"
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def _admit(self):
+        with self._lock:
+            self.stats["requisicoes"] += 1
+            if self.rate:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate)
+                self._refilled = now
+            if (self.rate and self._tokens < 1) or (self.max_concurrent and self._active >= self.max_concurrent):
+                self.stats["limitadas"] += 1
+                return False
+            if self.rate:
+                self._tokens -= 1
+            self._active += 1
+            self.stats["pico_simultaneas"] = max(self.stats["pico_simultaneas"], self._active)
+            return True
+
+    def handle(self, handler, query):
+        if not self._admit():
+            handler.send_response(429)
+            handler.send_header("Retry-After", str(self.retry_after))
+            handler.send_header("Content-Length", "0")
+            handler.end_headers()
+            return
+
+        content_type = handler.headers.get("Accept", "").split(",")[0].strip()
+        if content_type not in FORMAT_EXTENSIONS:
+            content_type = "application/sparql-results+json"
+        try:
+            start = time.perf_counter()
+            status, body = self.respond(query, content_type)
+            delay = self.latency + random.uniform(0, self.jitter) - (time.perf_counter() - start)
+            if delay > 0:
+                time.sleep(delay)
+        except Exception as e:
+            print(f"Falha no endpoint local: {e}")
+            self.count("falhas")
+            status, body = 500, str(e).encode("utf-8")
+        finally:
+            with self._lock:
+                self._active -= 1
+
+        handler.send_response(status)
+        handler.send_header("Content-Type", content_type)
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def respond(self, query, content_type):
+        path = FIXTURES_DIR / f"{cache_key(query)}.{FORMAT_EXTENSIONS[content_type]}"
+        if path.exists():
+            self.count("gravadas")
+            return 200, path.read_bytes()
+
+        if self.record:
+            response = requests.post(
+                self.upstream,
+                data={"query": query},
+                headers={"Accept": content_type, "User-Agent": USER_AGENT},
+                timeout=(5, 120)
+            )
+            self.count("upstream")
+            if response.ok:
+                FIXTURES_DIR.mkdir(parents=True, exist_ok=True)
+                path.write_bytes(response.content)
+            return response.status_code, response.content
+
+        if not self.synthetic:
+            self.count("falhas")
+            return 404, b"Consulta sem resposta gravada"
+
+        self.count("sinteticas")
+        return 200, encode_rows(synthetic_rows(query), FORMAT_EXTENSIONS[content_type])
+
+    def count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+
+# Sessões simuladas.
+# Cada sessão é um AppTest próprio; o tempo de cada página é o tempo de uma
+# execução completa do script, como o usuário o percebe após cada interação.
+
+def click_first(app, prefix):
+    for button in app.button:
+        if button.key and button.key.startswith(prefix):
+            return button.click().run()
+    raise LookupError(f"nenhum botão {prefix}* na página")
+
+
+def session_flow(app, title):
+    yield "abertura", app.run
+    yield "busca_titulo", lambda: (
+        app.text_input(key="film_title").input(title),
+        app.button(key="search_button").click().run()
+    )
+    yield "clique_diretor", lambda: click_first(app, "director_")
+    yield "clique_ator", lambda: click_first(app, "actor_")
+    yield "estatisticas", lambda: app.button(key="stats_button").click().run()
+
+
+# Cada fluxo que não chega ao fim conta uma vez em `errors`, com a página em que
+# parou: exceção ao interagir com a página, exceção exibida pelo app, erro exibido
+# (consulta limitada, endpoint fora do ar) ou qualquer exceção da própria thread
+# da sessão (por exemplo, ao compilar o script junto com outras sessões).
+
+def run_session(index, args, pages, errors, apps):
+    from streamlit.testing.v1 import AppTest
+
+    step = "inicio"
+    try:
+        app = AppTest.from_file(str(APP_PATH), default_timeout=args.timeout)
+        apps[index] = app
+        title = args.titles[index % len(args.titles)]
+        rng = random.Random(index)
+
+        for _ in range(args.iterations):
+            for step, action in session_flow(app, title):
+                if args.think:
+                    time.sleep(rng.uniform(0, args.think))
+                start = time.perf_counter()
+                action()
+                pages.append((step, time.perf_counter() - start))
+                if app.exception:
+                    errors.append((step, app.exception[0].value))
+                    break
+                if app.error:
+                    errors.append((step, " / ".join(error.value for error in app.error)))
+                    break
+    except Exception as e:
+        errors.append((step, f"{type(e).__name__}: {e}"))
+
+
+# O AppTest foi feito para uma execução por vez: cada execução instala um Runtime
+# falso global e o remove ao terminar, e sobrepõe a configuração do Streamlit
+# durante a execução. Com sessões simultâneas, uma execução que termina apagaria
+# o Runtime de outra ainda em andamento; aqui o último Runtime instalado continua
+# valendo entre as execuções, e a configuração de teste vale para toda a carga.
+# Um erro ao compilar o script (que compilações simultâneas podem provocar) só
+# aparece no log do Streamlit, com a página vazia; aqui ele é levantado pela
+# execução, para contar como falha do fluxo.
+
+def share_test_runtime():
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.scriptrunner import ScriptRunnerEvent
+    from streamlit.testing.v1 import app_test
+    from streamlit.testing.v1.local_script_runner import LocalScriptRunner
+    from streamlit.testing.v1.util import patch_config_options
+
+    installed = {}
+
+    def instance(cls):
+        if cls._instance is not None:
+            installed["runtime"] = cls._instance
+            return cls._instance
+        if "runtime" in installed:
+            return installed["runtime"]
+        raise RuntimeError("Runtime hasn't been created!")
+
+    def exists(cls):
+        return cls._instance is not None or "runtime" in installed
+
+    run = LocalScriptRunner.run
+
+    def run_raising_compile_errors(self, *args, **kwargs):
+        tree = run(self, *args, **kwargs)
+        for event, data in zip(self.events, self.event_data):
+            if event == ScriptRunnerEvent.SCRIPT_STOPPED_WITH_COMPILE_ERROR:
+                raise data["exception"]
+        return tree
+
+    Runtime.instance = classmethod(instance)
+    Runtime.exists = classmethod(exists)
+    LocalScriptRunner.run = run_raising_compile_errors
+    app_test.patch_config_options = lambda overrides: contextlib.nullcontext()
+    return patch_config_options({"global.appTest": True})
+
+
+def run_sessions(args, pages, errors, apps):
+    threads = []
+    for index in range(args.sessions):
+        thread = threading.Thread(target=run_session, args=(index, args, pages, errors, apps), daemon=True)
+        threads.append(thread)
+        thread.start()
+        if args.ramp_up:
+            time.sleep(args.ramp_up / args.sessions)
+    for thread in threads:
+        thread.join()
+
+
+def end_sessions(apps):
+    from src.result_store import result_store
+
+    for app in apps.values():
+        if "session_id" in app.session_state:
+            result_store.drop_session(app.session_state.session_id)
+    apps.clear()
+    gc.collect()
+
+
+def configure_environment(endpoint_url, work_dir):
+    # Lido pelos módulos do app na importação; precisa vir antes da primeira sessão
+    os.environ["WIKIDATA_ENDPOINT"] = endpoint_url
+    os.environ["SPARQL_BACKEND"] = "wikidata"
+    os.environ["LABEL_CACHE_PATH"] = ""
+    os.environ["SNAPSHOT_PATH"] = str(work_dir / "snapshot.bin")
+    os.environ["SNAPSHOT_REFRESH_INTERVAL"] = "0"
+    os.environ["TITLE_INDEX_PATH"] = str(work_dir / "title_index.bin")
+    os.environ["IMAGE_CACHE_DIR"] = str(work_dir / "images")
+    os.environ["ANALYTICS_PATH"] = str(work_dir / "analytics.sqlite")
+    os.environ.pop("SPARQL_CACHE_PATH", None)
+
+
+def format_ms(value):
+    return f"{value * 1000:.0f}" if value is not None else "-"
+
+
+def report(pages, errors, elapsed, memory, endpoint, args):
+    header = f"{'página':<16} {'n':>6} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9} {'máx (ms)':>9}"
+    print(header)
+    print("-" * len(header))
+    summary = {"paginas": {}}
+    for step in STEPS + ["total"]:
+        durations = sorted(d for s, d in pages if step in (s, "total"))
+        if not durations:
+            continue
+        row = {f"p{p}": percentile(durations, p) for p in (50, 95, 99)}
+        row["n"] = len(durations)
+        row["max"] = durations[-1]
+        summary["paginas"][step] = row
+        print(
+            f"{step:<16} {row['n']:>6} {format_ms(row['p50']):>9} {format_ms(row['p95']):>9} "
+            f"{format_ms(row['p99']):>9} {format_ms(row['max']):>9}"
+        )
+
+    flows = sum(1 for step, _ in pages if step == STEPS[-1])
+    summary["vazao_paginas"] = len(pages) / elapsed
+    summary["vazao_fluxos"] = flows / elapsed
+    summary["duracao"] = elapsed
+    summary["fluxos_com_falha"] = len(errors)
+    summary["endpoint"] = endpoint.stats
+    print()
+    print(f"Sessões: {args.sessions} · duração: {elapsed:.1f} s · fluxos completos: {flows}")
+    print(f"Vazão: {summary['vazao_paginas']:.2f} páginas/s · {summary['vazao_fluxos']:.2f} fluxos/s")
+    print(f"Fluxos com falha: {len(errors)}")
+    for step, message in errors[:5]:
+        print(f"  {step}: {message}")
+
+    if memory is not None:
+        summary["memoria_por_sessao"] = memory["por_sessao"]
+        summary["memoria_compartilhada"] = memory["compartilhada"]
+        summary["memoria_pico"] = memory["pico"]
+        summary["cache_consultas_bytes"] = memory["cache"]
+        print(
+            f"Memória por sessão: {memory['por_sessao'] / 1024:.0f} KiB · "
+            f"compartilhada: {memory['compartilhada'] / 1024 / 1024:.1f} MiB "
+            f"({memory['cache'] / 1024:.0f} KiB no cache de consultas) · "
+            f"pico total {memory['pico'] / 1024 / 1024:.1f} MiB"
+        )
+
+    stats = endpoint.stats
+    print(
+        f"Endpoint: {stats['requisicoes']} requisições · {stats['gravadas']} gravadas · "
+        f"{stats['sinteticas']} sintéticas · {stats['upstream']} do endpoint real · "
+        f"{stats['limitadas']} limitadas (429) · pico de {stats['pico_simultaneas']} simultâneas"
+    )
+
+    # Espera na fila do limitador do app, para ajustar SPARQL_RATE_LIMIT e SPARQL_MAX_CONCURRENT
+    from src.api import get_limiter_stats
+    from src.instrumentation import instrumentation
+    limiter = get_limiter_stats()
+    summary["limitador"] = limiter
+    summary["fila"] = {row["nome"]: row for row in instrumentation.snapshot() if row["tipo"] == "fila"}
+    print(
+        f"Limitador do app: {limiter['taxa']:g}/s, até {limiter['max_simultaneas']} simultâneas · "
+        f"{limiter['liberadas']} liberadas ({limiter['imediatas']} sem espera) · {limiter['desistencias']} desistências"
+    )
+    for name, row in summary["fila"].items():
+        print(f"  espera na fila ({name}): p50 {row['p50_ms']:.0f} ms · p99 {row['p99_ms']:.0f} ms · {row['contagem']} requisições")
+    return summary
+
+
+def main(args):
+    work_dir = Path(tempfile.mkdtemp(prefix="websemantica-carga-"))
+    endpoint = StubEndpoint(
+        latency=args.latency / 1000,
+        jitter=args.jitter / 1000,
+        rate=args.rate,
+        burst=args.burst,
+        max_concurrent=args.max_concurrent,
+        retry_after=args.retry_after,
+        record=args.record,
+        synthetic=not args.no_synthetic
+    )
+    configure_environment(endpoint.start(), work_dir)
+
+    # Uma sessão de aquecimento importa o app e seus módulos fora da medição
+    from streamlit.testing.v1 import AppTest
+    AppTest.from_file(str(APP_PATH), default_timeout=args.timeout).run()
+    from src.api import get_cache_stats
+
+    memory = None
+    if args.memory:
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        cache_baseline = get_cache_stats()["bytes"]
+
+    pages, errors, apps = [], [], {}
+    start = time.perf_counter()
+    with share_test_runtime():
+        run_sessions(args, pages, errors, apps)
+    elapsed = time.perf_counter() - start
+
+    if args.memory:
+        # As sessões continuam vivas em `apps` até aqui, com seu estado e resultados.
+        # Encerrá-las (como faz "Retornar ao explorador") separa a memória de cada
+        # sessão da que continua com o processo: caches, índices e instrumentação.
+        current, peak = tracemalloc.get_traced_memory()
+        end_sessions(apps)
+        shared = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        memory = {
+            "por_sessao": max(current - shared, 0) / args.sessions,
+            "compartilhada": max(shared - baseline, 0),
+            "pico": peak,
+            "cache": get_cache_stats()["bytes"] - cache_baseline,
+        }
+
+    summary = report(pages, errors, elapsed, memory, endpoint, args)
+    endpoint.stop()
+    if args.output:
+        Path(args.output).write_text(json.dumps(summary, indent=2, ensure_ascii=False))
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Teste de carga com sessões simultâneas contra um endpoint SPARQL local.")
+    parser.add_argument("--sessions", type=int, default=10, help="sessões simultâneas")
+    parser.add_argument("--iterations", type=int, default=1, help="repetições do fluxo em cada sessão")
+    parser.add_argument("--ramp-up", type=float, default=0, help="segundos para iniciar todas as sessões")
+    parser.add_argument("--think", type=float, default=0, help="pausa máxima (s) entre as páginas de uma sessão")
+    parser.add_argument("--titles", nargs="+", default=TITLES, help="títulos buscados, em rodízio entre as sessões")
+    parser.add_argument("--latency", type=float, default=200, help="latência média do endpoint (ms)")
+    parser.add_argument("--jitter", type=float, default=100, help="variação aleatória da latência (ms)")
+    parser.add_argument("--rate", type=float, default=0, help="requisições por segundo aceitas pelo endpoint (0 = sem limite)")
+    parser.add_argument("--burst", type=float, default=None, help="rajada máxima acima da taxa")
+    parser.add_argument("--max-concurrent", type=int, default=0, help="consultas simultâneas aceitas (0 = sem limite)")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After (s) das respostas 429")
+    parser.add_argument("--timeout", type=float, default=120, help="tempo máximo (s) de cada página")
+    parser.add_argument("--no-memory", dest="memory", action="store_false", help="não mede a memória (tracemalloc deixa o app mais lento)")
+    parser.add_argument("--no-synthetic", action="store_true", help="falha nas consultas sem resposta gravada")
+    parser.add_argument("--record", action="store_true", help="grava as respostas que faltam a partir do endpoint real")
+    parser.add_argument("--output", help="grava o resumo em JSON")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,149 @@
+
+# Benchmark dos planos de consulta SPARQL.
+# Compara as consultas originais (rdfs:label + FILTER, agrupadas por imagem) com as
+# consultas enxutas (wikibase:label + SAMPLE) e com o modo em duas fases.
+#
+# Gravação das respostas (requer acesso ao endpoint):
+#     python benchmarks/query_plans.py --record
+# Comparação a partir das respostas gravadas:
+#     python benchmarks/query_plans.py
+#
+# As fixtures versionadas em benchmarks/fixtures/ são uma amostra pequena, para rodar
+# sem rede: corpos no formato JSON do endpoint para poucos filmes de cada caso, sem
+# tempo de servidor (null, exibido como "-"). --record as substitui por respostas reais.
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import requests
+
+current_dir = Path(__file__).parent
+parent_dir = current_dir.parent
+sys.path.append(str(parent_dir))
+
+from src.api import WIKIDATA_ENDPOINT, HEADERS
+from src.queries import (
+    get_film_by_title_query,
+    get_films_by_actor_query,
+    get_films_by_director_query,
+    get_films_query,
+    get_film_list_query,
+    get_film_details_query
+)
+
+FIXTURES_DIR = current_dir / "fixtures"
+
+# Casos de teste: (nome, tipo, valor)
+CASES = [
+    ("titulo_inception", "title", "Inception"),
+    ("ator_dicaprio", "actor", "Q38111"),
+    ("diretor_nolan", "director", "Q25191"),
+    ("diretor_spielberg", "director", "Q8877"),
+]
+
+LEGACY_BUILDERS = {
+    "title": get_film_by_title_query,
+    "actor": get_films_by_actor_query,
+    "director": get_films_by_director_query,
+}
+
+# Quantidade de filmes detalhados na segunda fase (uma página de resultados)
+TWO_PHASE_PAGE = 20
+
+
+def fixture_path(case, plan, step):
+    return FIXTURES_DIR / f"{case}.{plan}.{step}.json"
+
+
+def run_query(session, query):
+    start = time.perf_counter()
+    response = session.get(WIKIDATA_ENDPOINT, params={"query": query}, timeout=(5, 120))
+    response.raise_for_status()
+    return {
+        "tempo_servidor": response.elapsed.total_seconds(),
+        "tempo_total": time.perf_counter() - start,
+        "body": response.text,
+    }
+
+
+def record(cases):
+    FIXTURES_DIR.mkdir(parents=True, exist_ok=True)
+    session = requests.Session()
+    session.headers.update(HEADERS)
+
+    for case, kind, value in cases:
+        plans = {
+            "original": [LEGACY_BUILDERS[kind](value)],
+            "enxuta": [get_films_query(kind, value, 100 if kind == "actor" else None)],
+        }
+        for plan, queries in plans.items():
+            for step, query in enumerate(queries):
+                fixture_path(case, plan, step).write_text(json.dumps(run_query(session, query)))
+
+        listing = run_query(session, get_film_list_query(kind, value))
+        fixture_path(case, "duas_fases", 0).write_text(json.dumps(listing))
+        film_ids = [
+            b["film"]["value"].rsplit("/", 1)[-1]
+            for b in json.loads(listing["body"])["results"]["bindings"][:TWO_PHASE_PAGE]
+        ]
+        if film_ids:
+            details = run_query(session, get_film_details_query(film_ids))
+            fixture_path(case, "duas_fases", 1).write_text(json.dumps(details))
+        print(f"Gravado: {case}")
+
+
+def summarize(case, plan):
+    totals = {"bytes": 0, "linhas": 0, "filmes": set(), "tempo_servidor": 0.0, "parse_ms": 0.0}
+    step = 0
+    while fixture_path(case, plan, step).exists():
+        fixture = json.loads(fixture_path(case, plan, step).read_text())
+        body = fixture["body"]
+
+        start = time.perf_counter()
+        bindings = json.loads(body)["results"]["bindings"]
+        totals["parse_ms"] += (time.perf_counter() - start) * 1000
+
+        totals["bytes"] += len(body.encode("utf-8"))
+        if fixture["tempo_servidor"] is None or totals["tempo_servidor"] is None:
+            totals["tempo_servidor"] = None
+        else:
+            totals["tempo_servidor"] += fixture["tempo_servidor"]
+        if plan != "duas_fases" or step > 0:
+            totals["linhas"] += len(bindings)
+            totals["filmes"].update(b["film"]["value"] for b in bindings)
+        step += 1
+
+    if step == 0:
+        return None
+    totals["filmes"] = len(totals["filmes"])
+    return totals
+
+
+def compare(cases):
+    header = f"{'caso':<20} {'plano':<11} {'bytes':>10} {'linhas':>7} {'filmes':>7} {'servidor (s)':>13} {'parse (ms)':>11}"
+    print(header)
+    print("-" * len(header))
+    for case, kind, value in cases:
+        for plan in ("original", "enxuta", "duas_fases"):
+            totals = summarize(case, plan)
+            if totals is None:
+                print(f"{case:<20} {plan:<11} (sem fixture gravada)")
+                continue
+            server = "-" if totals["tempo_servidor"] is None else f"{totals['tempo_servidor']:.2f}"
+            print(
+                f"{case:<20} {plan:<11} {totals['bytes']:>10} {totals['linhas']:>7} {totals['filmes']:>7} "
+                f"{server:>13} {totals['parse_ms']:>11.1f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara os planos de consulta SPARQL em respostas gravadas.")
+    parser.add_argument("--record", action="store_true", help="grava novas respostas a partir do endpoint")
+    args = parser.parse_args()
+
+    if args.record:
+        record(CASES)
+    compare(CASES)
@@ -0,0 +1,123 @@
+
+# Benchmark dos formatos de resultado SPARQL.
+# Compara o caminho antigo (JSON carregado inteiro em dicionários aninhados) com a
+# leitura em colunas (ResultTable) das respostas em JSON, TSV e CSV: bytes
+# recebidos, tempo de parse e pico de memória durante o parse.
+#
+# Gravação das respostas (requer acesso ao endpoint):
+#     python benchmarks/result_formats.py --record
+# Comparação a partir das respostas gravadas:
+#     python benchmarks/result_formats.py
+
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import requests
+
+current_dir = Path(__file__).parent
+parent_dir = current_dir.parent
+sys.path.append(str(parent_dir))
+
+from src.api import WIKIDATA_ENDPOINT, HEADERS, STREAM_CHUNK_SIZE
+from src.queries import get_films_query
+from src.results import RESULT_FORMATS, parse_stream
+
+FIXTURES_DIR = current_dir / "fixtures"
+
+# Casos de teste: (nome, tipo, valor). Filmografias completas, sem paginação,
+# para que as respostas sejam grandes.
+CASES = [
+    ("ator_dicaprio", "actor", "Q38111"),
+    ("diretor_spielberg", "director", "Q8877"),
+    ("diretor_hitchcock", "director", "Q7374"),
+]
+
+REPEATS = 5
+
+
+def fixture_path(case, result_format):
+    return FIXTURES_DIR / f"{case}.resultado.{result_format}"
+
+
+def record(cases):
+    FIXTURES_DIR.mkdir(parents=True, exist_ok=True)
+    session = requests.Session()
+    session.headers.update(HEADERS)
+
+    for case, kind, value in cases:
+        query = get_films_query(kind, value)
+        for result_format, accept in RESULT_FORMATS.items():
+            response = session.get(
+                WIKIDATA_ENDPOINT,
+                params={"query": query},
+                headers={"Accept": accept},
+                timeout=(5, 120)
+            )
+            response.raise_for_status()
+            fixture_path(case, result_format).write_bytes(response.content)
+        print(f"Gravado: {case}")
+
+
+def chunks(body):
+    for start in range(0, len(body), STREAM_CHUNK_SIZE):
+        yield body[start:start + STREAM_CHUNK_SIZE]
+
+
+def parse_legacy(body):
+    results = json.loads(body)
+    return results, len(results["results"]["bindings"])
+
+
+def parse_columnar(body, result_format):
+    table, _ = parse_stream(chunks(body), result_format)
+    return table, len(table)
+
+
+def measure(parse):
+    best = None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result, rows = parse()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+        del result
+
+    tracemalloc.start()
+    result, rows = parse()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return rows, best * 1000, peak / 1024
+
+
+def compare(cases):
+    header = f"{'caso':<20} {'caminho':<16} {'bytes':>10} {'linhas':>7} {'parse (ms)':>11} {'pico (KB)':>10}"
+    print(header)
+    print("-" * len(header))
+    for case, kind, value in cases:
+        paths = [("json (antigo)", "json", parse_legacy)]
+        paths += [(f"{fmt} (colunas)", fmt, None) for fmt in RESULT_FORMATS]
+        for name, result_format, legacy in paths:
+            path = fixture_path(case, result_format)
+            if not path.exists():
+                print(f"{case:<20} {name:<16} (sem fixture gravada)")
+                continue
+            body = path.read_bytes()
+            if legacy:
+                rows, parse_ms, peak_kb = measure(lambda: legacy(body))
+            else:
+                rows, parse_ms, peak_kb = measure(lambda: parse_columnar(body, result_format))
+            print(f"{case:<20} {name:<16} {len(body):>10} {rows:>7} {parse_ms:>11.1f} {peak_kb:>10.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara os formatos de resultado SPARQL em respostas gravadas.")
+    parser.add_argument("--record", action="store_true", help="grava novas respostas a partir do endpoint")
+    args = parser.parse_args()
+
+    if args.record:
+        record(CASES)
+    compare(CASES)
@@ -0,0 +1,358 @@
+import atexit
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+import pandas as pd
+
+
+# Uso agregado de todas as sessões, para decidir o que manter em cache e pré-aquecer.
+# Cada busca, clique e resultado exibido vira um evento num registro local
+# somente de acréscimo (SQLite), com os filmes do resultado resumidos em itens
+# (filme, década, gênero e diretor). Os eventos ficam num buffer em memória e são
+# gravados em lote por uma thread em segundo plano, fora da renderização.
+#
+# A mesma thread mantém agregados por minuto e por dia: a cada rodada lê só os
+# eventos novos (acima da marca d'água gravada junto com os agregados), agrupa com
+# o pandas e soma nas tabelas de agregados. O painel de administração consulta
+# apenas os agregados, nunca os eventos brutos. Os dias são contados em UTC.
+#
+# Eventos já agregados e mais antigos que ANALYTICS_EVENT_RETENTION são apagados na
+# mesma transação da agregação (0 apaga assim que são agregados). A tabela
+# rollup_state guarda a marca d'água da agregação ("eventos") e o último evento
+# gravado ("gravados"), de onde sai o atraso da agregação mostrado no painel.
+
+ANALYTICS_PATH = os.environ.get(
+    "ANALYTICS_PATH",
+    str(Path(__file__).parent.parent / "data" / "analytics.sqlite")
+)
+ANALYTICS_FLUSH_INTERVAL = float(os.environ.get("ANALYTICS_FLUSH_INTERVAL", 5))
+ANALYTICS_ROLLUP_INTERVAL = float(os.environ.get("ANALYTICS_ROLLUP_INTERVAL", 30))
+ANALYTICS_MINUTE_RETENTION = int(os.environ.get("ANALYTICS_MINUTE_RETENTION", 7 * 24 * 60 * 60))
+ANALYTICS_EVENT_RETENTION = int(os.environ.get("ANALYTICS_EVENT_RETENTION", 24 * 60 * 60))
+
+# Eventos guardados em memória enquanto o banco não responde; acima disso são descartados
+ANALYTICS_BUFFER_MAX = 10000
+ROLLUP_BATCH_SIZE = 50000
+
+SEARCH = "busca"
+DIRECTOR_CLICK = "clique_diretor"
+ACTOR_CLICK = "clique_ator"
+SIMILAR_CLICK = "clique_semelhantes"
+RESULTS = "resultado"
+CLICKS = (DIRECTOR_CLICK, ACTOR_CLICK, SIMILAR_CLICK)
+
+# Dimensões dos agregados: "evento" (contagem por tipo de evento), "titulo" (texto
+# buscado), os cliques (QID da pessoa ou do filme) e os itens dos resultados.
+EVENT = "evento"
+TITLE = "titulo"
+FILM = "filme"
+DECADE = "decada"
+GENRE = "genero"
+DIRECTOR = "diretor"
+
+ROLLUP_TABLES = {"minuto": ("rollup_minute", 60), "dia": ("rollup_day", 24 * 60 * 60)}
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS events ("
+    "id INTEGER PRIMARY KEY AUTOINCREMENT, ts REAL NOT NULL, session TEXT NOT NULL, "
+    "kind TEXT NOT NULL, entity TEXT, label TEXT, films INTEGER NOT NULL DEFAULT 0)",
+    "CREATE TABLE IF NOT EXISTS event_items ("
+    "event_id INTEGER NOT NULL, dimension TEXT NOT NULL, value TEXT NOT NULL, "
+    "label TEXT, count INTEGER NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS event_items_event ON event_items (event_id)",
+    *(
+        f"CREATE TABLE IF NOT EXISTS {table} ("
+        "bucket INTEGER NOT NULL, dimension TEXT NOT NULL, value TEXT NOT NULL, "
+        "label TEXT, count INTEGER NOT NULL, PRIMARY KEY (dimension, bucket, value)) WITHOUT ROWID"
+        for table, _ in ROLLUP_TABLES.values()
+    ),
+    "CREATE TABLE IF NOT EXISTS rollup_state (name TEXT PRIMARY KEY, last_event_id INTEGER NOT NULL)",
+)
+
+STATE_SQL = (
+    "INSERT INTO rollup_state (name, last_event_id) VALUES (?, ?) "
+    "ON CONFLICT (name) DO UPDATE SET last_event_id = MAX(last_event_id, excluded.last_event_id)"
+)
+
+UPSERT_SQL = (
+    "INSERT INTO {table} (bucket, dimension, value, label, count) VALUES (?, ?, ?, ?, ?) "
+    "ON CONFLICT (dimension, bucket, value) DO UPDATE SET "
+    "count = count + excluded.count, label = COALESCE(excluded.label, label)"
+)
+
+
+# Itens de um resultado: cada filme conta uma vez para o próprio QID, a década, os
+# gêneros e o diretor. Os valores são QIDs (ou a década); os nomes vão como rótulo.
+
+def film_items(films):
+    counts = Counter()
+    labels = {}
+    for film in films:
+        keys = [(FILM, film.qid, film.name)]
+        if film.year is not None:
+            decade = str(film.year // 10 * 10)
+            keys.append((DECADE, decade, decade))
+        if film.genre_ids and len(film.genre_ids) == len(film.genres):
+            keys.extend((GENRE, genre_id, genre) for genre_id, genre in zip(film.genre_ids, film.genres))
+        else:
+            keys.extend((GENRE, genre, genre) for genre in film.genres)
+        if film.director:
+            keys.append((DIRECTOR, film.director.qid, film.director.name))
+        for dimension, value, label in keys:
+            counts[(dimension, value)] += 1
+            labels[(dimension, value)] = label
+    return [(dimension, value, labels[(dimension, value)], count) for (dimension, value), count in counts.items()]
+
+
+# Fatos de cada evento (além dos itens): o tipo, o texto buscado e a pessoa clicada
+
+def event_facts(events):
+    facts = [events.assign(dimension=EVENT, value=events["kind"], label=None, count=1)]
+    searches = events[events["kind"] == SEARCH]
+    facts.append(searches.assign(dimension=TITLE, value=searches["entity"].str.casefold(), label=searches["entity"], count=1))
+    clicks = events[events["kind"].isin(CLICKS)]
+    facts.append(clicks.assign(dimension=clicks["kind"], value=clicks["entity"], count=1))
+    return pd.concat(facts, ignore_index=True)[["ts", "dimension", "value", "label", "count"]]
+
+
+def aggregate(facts, width):
+    grouped = (
+        facts.assign(bucket=(facts["ts"] // width * width).astype("int64"))
+        .groupby(["bucket", "dimension", "value"], sort=False)
+        .agg(label=("label", "last"), count=("count", "sum"))
+        .reset_index()
+    )
+    return list(zip(
+        grouped["bucket"].tolist(),
+        grouped["dimension"].tolist(),
+        grouped["value"].tolist(),
+        grouped["label"].astype(object).where(grouped["label"].notna(), None).tolist(),
+        grouped["count"].tolist()
+    ))
+
+
+class Analytics:
+    def __init__(self, path=ANALYTICS_PATH, flush_interval=ANALYTICS_FLUSH_INTERVAL,
+                 rollup_interval=ANALYTICS_ROLLUP_INTERVAL, minute_retention=ANALYTICS_MINUTE_RETENTION,
+                 event_retention=ANALYTICS_EVENT_RETENTION):
+        self.flush_interval = flush_interval
+        self.rollup_interval = rollup_interval
+        self.minute_retention = minute_retention
+        self.event_retention = event_retention
+        self._lock = threading.Lock()
+        self._buffer_lock = threading.Lock()
+        self._buffer = []
+        self._thread = None
+        self._last_rollup = None
+        self.stats = {"gravados": 0, "agregados": 0, "removidos": 0, "descartados": 0, "falhas": 0}
+
+        self._disk = None
+        if path:
+            try:
+                self._open_disk(path)
+            except sqlite3.Error as e:
+                print(f"Não foi possível abrir o registro de uso: {e}")
+
+    @property
+    def enabled(self):
+        return self._disk is not None
+
+    def _open_disk(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._disk = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._disk.execute("PRAGMA journal_mode=WAL")
+        self._disk.execute("PRAGMA busy_timeout=5000")
+        for statement in SCHEMA:
+            self._disk.execute(statement)
+        # Arquivos gravados antes do registro do último evento gravado
+        self._disk.execute(
+            "INSERT OR IGNORE INTO rollup_state (name, last_event_id) "
+            "SELECT 'gravados', COALESCE(MAX(id), 0) FROM events"
+        )
+
+    def record(self, session, kind, entity=None, label=None, films=()):
+        if self._disk is None:
+            return
+        event = (time.time(), session, kind, entity, label, len(films), film_items(films))
+        with self._buffer_lock:
+            if len(self._buffer) >= ANALYTICS_BUFFER_MAX:
+                self.stats["descartados"] += 1
+                return
+            self._buffer.append(event)
+        self._start()
+
+    # Gravação dos eventos do buffer numa única transação
+
+    def flush(self):
+        with self._buffer_lock:
+            pending, self._buffer = self._buffer, []
+        if not pending or self._disk is None:
+            return 0
+
+        with self._lock:
+            try:
+                self._disk.execute("BEGIN IMMEDIATE")
+                for ts, session, kind, entity, label, films, items in pending:
+                    event_id = self._disk.execute(
+                        "INSERT INTO events (ts, session, kind, entity, label, films) VALUES (?, ?, ?, ?, ?, ?)",
+                        (ts, session, kind, entity, label, films)
+                    ).lastrowid
+                    self._disk.executemany(
+                        "INSERT INTO event_items (event_id, dimension, value, label, count) VALUES (?, ?, ?, ?, ?)",
+                        [(event_id, *item) for item in items]
+                    )
+                self._disk.execute(STATE_SQL, ("gravados", event_id))
+                self._disk.execute("COMMIT")
+            except sqlite3.Error:
+                self._disk.execute("ROLLBACK")
+                with self._buffer_lock:
+                    self._buffer[:0] = pending[:max(ANALYTICS_BUFFER_MAX - len(self._buffer), 0)]
+                raise
+            self.stats["gravados"] += len(pending)
+        return len(pending)
+
+    # Agregação incremental: eventos acima da marca d'água, em lotes de até
+    # ROLLUP_BATCH_SIZE. A marca avança na mesma transação que soma os agregados,
+    # então vários processos podem compartilhar o arquivo sem contar duas vezes.
+
+    def rollup(self):
+        total = 0
+        while True:
+            count = self._rollup_batch()
+            total += count
+            if count < ROLLUP_BATCH_SIZE:
+                break
+        self._last_rollup = time.time()
+        return total
+
+    def _rollup_batch(self):
+        if self._disk is None:
+            return 0
+        with self._lock:
+            self._disk.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._disk.execute("SELECT last_event_id FROM rollup_state WHERE name = 'eventos'").fetchone()
+                last = row[0] if row else 0
+                upper = self._disk.execute(
+                    "SELECT MAX(id), COUNT(*) FROM (SELECT id FROM events WHERE id > ? ORDER BY id LIMIT ?)",
+                    (last, ROLLUP_BATCH_SIZE)
+                ).fetchone()
+                if upper[0] is None:
+                    self._disk.execute("COMMIT")
+                    return 0
+
+                events = pd.read_sql_query(
+                    "SELECT ts, kind, entity, label FROM events WHERE id > ? AND id <= ?",
+                    self._disk, params=(last, upper[0])
+                )
+                items = pd.read_sql_query(
+                    "SELECT e.ts, i.dimension, i.value, i.label, i.count FROM event_items i "
+                    "JOIN events e ON e.id = i.event_id WHERE i.event_id > ? AND i.event_id <= ?",
+                    self._disk, params=(last, upper[0])
+                )
+                facts = pd.concat([event_facts(events), items], ignore_index=True)
+                for table, width in ROLLUP_TABLES.values():
+                    self._disk.executemany(UPSERT_SQL.format(table=table), aggregate(facts, width))
+
+                self._disk.execute(STATE_SQL, ("eventos", upper[0]))
+                self._disk.execute(
+                    "DELETE FROM rollup_minute WHERE bucket < ?",
+                    (int(time.time() - self.minute_retention),)
+                )
+                removed = self._prune(upper[0])
+                self._disk.execute("COMMIT")
+            except BaseException:
+                self._disk.execute("ROLLBACK")
+                raise
+            self.stats["agregados"] += upper[1]
+            self.stats["removidos"] += removed
+            return upper[1]
+
+    # Apaga os eventos brutos já agregados (até a marca d'água) que passaram da
+    # retenção; os ids crescem com o tempo, então basta o maior id a apagar.
+
+    def _prune(self, watermark):
+        cutoff = self._disk.execute(
+            "SELECT MAX(id) FROM events WHERE id <= ? AND ts < ?",
+            (watermark, time.time() - self.event_retention)
+        ).fetchone()[0]
+        if cutoff is None:
+            return 0
+        self._disk.execute("DELETE FROM event_items WHERE event_id <= ?", (cutoff,))
+        return self._disk.execute("DELETE FROM events WHERE id <= ?", (cutoff,)).rowcount
+
+    def _start(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True, name="analytics")
+                self._thread.start()
+                atexit.register(self._flush_quietly)
+
+    def _run(self):
+        last_rollup = time.monotonic()
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+                if time.monotonic() - last_rollup >= self.rollup_interval:
+                    self.rollup()
+                    last_rollup = time.monotonic()
+            except (sqlite3.Error, ValueError) as e:
+                self.stats["falhas"] += 1
+                print(f"Falha ao gravar o registro de uso: {e}")
+
+    def _flush_quietly(self):
+        try:
+            self.flush()
+        except sqlite3.Error as e:
+            print(f"Falha ao gravar o registro de uso: {e}")
+
+    # Consultas do painel de administração; leem apenas os agregados.
+
+    def top(self, dimension, since, resolution="dia", limit=10):
+        if self._disk is None:
+            return pd.DataFrame(columns=["value", "label", "count"])
+        table, width = ROLLUP_TABLES[resolution]
+        with self._lock:
+            return pd.read_sql_query(
+                f"SELECT value, MAX(label) AS label, SUM(count) AS count FROM {table} "
+                "WHERE dimension = ? AND bucket >= ? GROUP BY value ORDER BY count DESC, value LIMIT ?",
+                self._disk, params=(dimension, int(since // width * width), limit)
+            )
+
+    def timeline(self, since, resolution="minuto"):
+        if self._disk is None:
+            return pd.DataFrame(columns=["bucket", "value", "count"])
+        table, width = ROLLUP_TABLES[resolution]
+        with self._lock:
+            return pd.read_sql_query(
+                f"SELECT bucket, value, count FROM {table} WHERE dimension = ? AND bucket >= ? ORDER BY bucket",
+                self._disk, params=(EVENT, int(since // width * width))
+            )
+
+    def summary(self):
+        with self._buffer_lock:
+            pending = len(self._buffer)
+        lag = 0
+        if self._disk is not None:
+            with self._lock:
+                state = dict(self._disk.execute("SELECT name, last_event_id FROM rollup_state").fetchall())
+            lag = max(state.get("gravados", 0) - state.get("eventos", 0), 0)
+        return {
+            "ativo": self._disk is not None,
+            "em_memoria": pending,
+            "aguardando_agregacao": lag,
+            "ultima_agregacao": self._last_rollup,
+            **self.stats
+        }
+
+
+analytics = Analytics()
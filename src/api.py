@@ -1,8 +1,47 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
-import json
+
+from src.cache import QueryCache, cache_key
+from src.instrumentation import instrumentation
+from src.labels import label_cache, entity_id, table_qids, labeled_table, DEFAULT_LANGUAGE
+from src.resilience import CircuitBreaker, RateLimiter, INTERACTIVE, BATCH, BACKGROUND
+from src.snapshot import snapshot
+from src.results import ResultTable, RESULT_FORMATS, parse_stream
+from src.queries import (
+    get_films_by_titles_query,
+    get_labels_query,
+    chunk_titles,
+    LABELS_BATCH_SIZE
+)
+from src.http_client import (
+    SparqlClient,
+    SparqlError,
+    SparqlTimeoutError,
+    SparqlThrottledError,
+    SparqlQueryError,
+    SparqlUnavailableError,
+    SparqlCircuitOpenError,
+    is_timeout
+)
 
 # Endpoint do Wikidata para consultas SPARQL
-WIKIDATA_ENDPOINT = "https://query.wikidata.org/sparql"
+WIKIDATA_ENDPOINT = os.environ.get("WIKIDATA_ENDPOINT", "https://query.wikidata.org/sparql")
+
+# Formato pedido ao endpoint: "tsv" (padrão), "csv" ou "json". Qualquer que seja o
+# formato, as consultas devolvem um ResultTable (ver results.py).
+RESULT_FORMAT = os.environ.get("SPARQL_RESULT_FORMAT", "tsv")
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Backend das consultas: "wikidata" (endpoint SPARQL, padrão) ou "local" (base SQLite
+# importada de um dump, ver local_store.py), que responde às mesmas consultas sem rede.
+SPARQL_BACKEND = os.environ.get("SPARQL_BACKEND", "wikidata")
+
+# Threads que atualizam em segundo plano os resultados vencidos servidos do cache
+REVALIDATE_WORKERS = int(os.environ.get("SPARQL_REVALIDATE_WORKERS", 2))
 
 # Headers
 HEADERS = {
@@ -10,19 +49,306 @@ HEADERS = {
     "User-Agent": "RodrigoNogueira/1.0"
 }
 
-def execute_sparql_query(query):
-    
+# Agrupamento de consultas idênticas em andamento ("single-flight").
+# Quando várias sessões disparam a mesma consulta ao mesmo tempo, apenas a primeira
+# vai ao Wikidata; as demais aguardam e recebem o mesmo resultado (ou o mesmo erro).
+# Se quem chega tem prioridade maior que a da consulta em andamento (um clique
+# aguardando um pré-carregamento ainda na fila do limitador), ela é promovida.
+
+class _InFlightCall:
+    def __init__(self, ticket):
+        self.done = threading.Event()
+        self.ticket = ticket
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.coalesced = 0
+
+    def do(self, key, fn, ticket=None):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _InFlightCall(ticket)
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            if ticket is not None and call.ticket is not None:
+                call.ticket.promote(ticket.priority)
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+# Backends das consultas. Cada um expõe execute(consulta, fetched, ticket), que
+# devolve um ResultTable e preenche em `fetched` os bytes recebidos e as
+# retentativas. O Wikidata só é consultado depois de o limitador liberar o ticket.
+
+class WikidataBackend:
+    name = "wikidata"
+
+    def __init__(self, client, limiter, result_format=RESULT_FORMAT):
+        self.client = client
+        self.limiter = limiter
+        self.result_format = result_format
+
+    def execute(self, query, fetched, ticket=None):
+        ticket = ticket or self.limiter.ticket()
+        waited = self.limiter.acquire(ticket)
+        instrumentation.record_queue(ticket.priority, self.limiter.queue_timeout if waited is None else waited, waited is None)
+        if waited is None:
+            raise SparqlThrottledError(
+                "Muitas consultas aguardando para ir ao Wikidata; a fila local esgotou o tempo de espera",
+                retry_after=self.limiter.queue_timeout
+            )
+
+        try:
+            return self._execute(query, fetched)
+        finally:
+            self.limiter.release()
+
+    def _execute(self, query, fetched):
+        try:
+            response = self.client.execute(query, headers={"Accept": RESULT_FORMATS[self.result_format]}, stream=True)
+            fetched["retries"] = response.retries
+            try:
+                results, fetched["bytes"] = parse_stream(response.iter_content(STREAM_CHUNK_SIZE), self.result_format)
+            finally:
+                response.close()
+        except SparqlError as e:
+            fetched["retries"] = e.retries
+            print(f"Erro ao executar consulta SPARQL: {e}")
+            raise
+        except requests.exceptions.RequestException as e:
+            if is_timeout(e):
+                print(f"Tempo limite excedido ao ler a resposta do Wikidata: {e}")
+                raise SparqlTimeoutError(f"Tempo limite de leitura excedido: {e}", retries=fetched.get("retries", 0))
+            print(f"Falha ao ler a resposta do Wikidata: {e}")
+            raise SparqlUnavailableError(f"Falha ao ler a resposta do Wikidata: {e}")
+        except ValueError as e:
+            print(f"Resposta inválida do Wikidata: {e}")
+            raise SparqlUnavailableError(f"Resposta inválida do Wikidata: {e}")
+        return results
+
+def create_backend(name):
+    if name == "local":
+        from src.local_store import LocalBackend
+        return LocalBackend()
+    if name != "wikidata":
+        raise ValueError(f"Backend desconhecido: {name}")
+    return WikidataBackend(client, limiter)
+
+# Cliente HTTP com pool de conexões, limitador, cache e agrupamento compartilhados
+# por todas as sessões do processo
+client = SparqlClient(WIKIDATA_ENDPOINT, HEADERS)
+limiter = RateLimiter()
+backend = create_backend(SPARQL_BACKEND)
+query_cache = QueryCache()
+single_flight = SingleFlight()
+breaker = CircuitBreaker()
+
+# Um resultado vencido no cache é devolvido na hora (marcado com stale=True) e
+# atualizado em segundo plano. Sem nada no cache, o snapshot de pré-aquecimento é
+# consultado (ver snapshot.py); sem nada nele, a consulta vai ao backend (o Wikidata,
+# por padrão), a menos que o disjuntor esteja aberto, caso em que falha imediatamente.
+# `priority` é a classe da consulta na fila do limitador (INTERACTIVE, BATCH ou BACKGROUND).
+
+def execute_sparql_query(query, use_cache=True, priority=INTERACTIVE):
+    start = time.perf_counter()
+    fetched = {}
+
     try:
-        response = requests.get(
-            WIKIDATA_ENDPOINT,
-            headers=HEADERS,
-            params={"query": query}
-        )
-        response.raise_for_status() 
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        print(f"Erro ao executar consulta SPARQL: {e}")
-        raise Exception(f"Falha na consulta ao Wikidata: {str(e)}")
+        if use_cache:
+            cached, fresh = query_cache.lookup(query)
+            source = "cache"
+            if cached is None:
+                cached, fresh = snapshot.lookup(query)
+                source = "snapshot"
+            if cached is not None:
+                results = ResultTable.from_dict(cached)
+                if not fresh:
+                    results.stale = True
+                    revalidate(query)
+                _record(query, start, source if fresh else "obsoleto", results, fetched)
+                return results
+
+        ticket = limiter.ticket(priority)
+        results = single_flight.do(cache_key(query), lambda: _fetch(query, use_cache, fetched, ticket), ticket)
     except Exception as e:
-        print(f"Erro inesperado: {e}")
+        _record(query, start, "rede", None, fetched, e)
         raise
+
+    # Sem "fetched" preenchido, o resultado veio de uma consulta idêntica de outra sessão
+    _record(query, start, "rede" if fetched else "agrupada", results, fetched)
+    return results
+
+def _fetch(query, use_cache, fetched, ticket=None):
+    if not breaker.allow():
+        raise SparqlCircuitOpenError(
+            "O Wikidata está instável e as consultas foram suspensas temporariamente",
+            breaker.retry_after()
+        )
+
+    try:
+        results = backend.execute(query, fetched, ticket)
+    except (SparqlTimeoutError, SparqlUnavailableError):
+        breaker.record_failure()
+        raise
+    except BaseException:
+        breaker.record_neutral()
+        raise
+    breaker.record_success()
+
+    if use_cache:
+        query_cache.put(query, results.to_dict(), size=fetched.get("bytes"))
+    return results
+
+# Atualização em segundo plano ("stale-while-revalidate"): cada consulta vencida é
+# atualizada uma única vez, mesmo que várias sessões a recebam do cache ao mesmo tempo.
+
+_revalidator = ThreadPoolExecutor(max_workers=REVALIDATE_WORKERS, thread_name_prefix="revalidate")
+_revalidating = set()
+_revalidating_lock = threading.Lock()
+
+def revalidate(query):
+    key = cache_key(query)
+    with _revalidating_lock:
+        if key in _revalidating:
+            return
+        _revalidating.add(key)
+    _revalidator.submit(_revalidate, query, key)
+
+def _revalidate(query, key):
+    try:
+        ticket = limiter.ticket(BACKGROUND)
+        single_flight.do(key, lambda: _fetch(query, True, {}, ticket), ticket)
+    except SparqlError as e:
+        print(f"Falha ao atualizar consulta em segundo plano: {e}")
+    finally:
+        with _revalidating_lock:
+            _revalidating.discard(key)
+
+def _record(query, start, source, results, fetched, error=None):
+    if not instrumentation.enabled:
+        return
+    rows = len(results) if results is not None else 0
+    instrumentation.record_query(
+        getattr(query, "template", "outra"),
+        time.perf_counter() - start,
+        source,
+        rows=rows,
+        size=fetched.get("bytes", 0),
+        retries=fetched.get("retries", 0),
+        error=error
+    )
+
+# Rótulos e consultas de filmes.
+# As consultas de filmes devolvem só QIDs; os nomes vêm do cache de rótulos, e os
+# QIDs ainda desconhecidos no idioma pedido são resolvidos em lotes de
+# LABELS_BATCH_SIZE. As consultas de rótulos não passam pelo cache de consultas:
+# o cache de rótulos já guarda cada nome individualmente.
+
+def fetch_labels(qids, language=DEFAULT_LANGUAGE, priority=INTERACTIVE):
+    labels = label_cache.get_many(qids, language)
+    missing = [qid for qid in dict.fromkeys(qids) if qid not in labels]
+    if missing:
+        labels.update(snapshot.labels(missing, language))
+        missing = [qid for qid in missing if qid not in labels]
+
+    for start in range(0, len(missing), LABELS_BATCH_SIZE):
+        results = execute_sparql_query(get_labels_query(missing[start:start + LABELS_BATCH_SIZE], language), False, priority)
+        found = {entity_id(row["item"]): row["label"] for row in results if row.get("item") and row.get("label")}
+        label_cache.put_many(found, language)
+        labels.update(found)
+    return labels
+
+def execute_films_query(query, language=DEFAULT_LANGUAGE, use_cache=True, priority=INTERACTIVE):
+    results = execute_sparql_query(query, use_cache, priority)
+    return labeled_table(results, fetch_labels(table_qids(results), language, priority))
+
+# Resolução de títulos em lote. Os títulos são agrupados em consultas com VALUES,
+# executadas com concorrência limitada; os resultados são devolvidos na ordem de
+# entrada, à medida que cada lote termina, como pares (título, linhas).
+
+BATCH_WORKERS = int(os.environ.get("SPARQL_BATCH_WORKERS", 3))
+
+def execute_batch_title_query(titles, language=DEFAULT_LANGUAGE, max_workers=BATCH_WORKERS):
+    titles = [title.strip() for title in titles]
+    unique_titles = [title for title in dict.fromkeys(titles) if title]
+    chunks = list(chunk_titles(unique_titles))
+
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="batch")
+    try:
+        futures = [
+            executor.submit(execute_films_query, get_films_by_titles_query(chunk), language, True, BATCH)
+            for chunk in chunks
+        ]
+
+        matches = {}
+        resolved = {""}
+        position = 0
+        for chunk, future in zip(chunks, futures):
+            for row in future.result():
+                matches.setdefault(row["title"], []).append(row)
+
+            resolved.update(chunk)
+            while position < len(titles) and titles[position] in resolved:
+                yield titles[position], matches.get(titles[position], [])
+                position += 1
+
+        while position < len(titles):
+            yield titles[position], []
+            position += 1
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+# Atualização do snapshot em segundo plano: cada entrada vencida é refeita sem
+# passar pelo cache de consultas, junto com os rótulos nos idiomas do snapshot.
+
+def _refresh_snapshot_entry(query, languages):
+    results = execute_sparql_query(query, False, BACKGROUND)
+    qids = table_qids(results)
+    return results.to_dict(), {language: fetch_labels(qids, language, BACKGROUND) for language in languages}
+
+def start_snapshot_refresh():
+    snapshot.start_refresh(_refresh_snapshot_entry)
+
+def get_circuit_state():
+    return breaker.snapshot()
+
+def get_limiter_stats():
+    return limiter.snapshot()
+
+def get_label_stats():
+    return label_cache.summary()
+
+def get_cache_stats():
+    stats = query_cache.stats()
+    stats["coalescidas"] = single_flight.coalesced
+    stats["em_andamento"] = single_flight.in_flight()
+    with _revalidating_lock:
+        stats["revalidando"] = len(_revalidating)
+    stats["circuito"] = breaker.snapshot()
+    stats["snapshot"] = snapshot.summary()
+    stats["backend"] = backend.name
+    return stats
@@ -6,37 +6,64 @@
 import streamlit as st
 import requests
 import json
-import re
 import sys
 import time
+import uuid
 import pandas as pd
 from datetime import datetime
-from collections import Counter
 from pathlib import Path
 
 current_dir = Path(__file__).parent
 parent_dir = current_dir.parent
 sys.path.append(str(parent_dir))
 
-from src.api import execute_sparql_query
-from src.queries import (
-    get_film_by_title_query,
-    get_films_by_actor_query,
-    get_films_by_director_query
+from src.analytics import analytics, SEARCH, DIRECTOR_CLICK, ACTOR_CLICK, SIMILAR_CLICK, RESULTS, TITLE, FILM, DECADE, GENRE
+from src.api import (
+    execute_films_query,
+    execute_batch_title_query,
+    fetch_labels,
+    get_cache_stats,
+    get_circuit_state,
+    get_label_stats,
+    get_limiter_stats,
+    start_snapshot_refresh,
+    SparqlError,
+    SparqlCircuitOpenError,
+    SparqlTimeoutError,
+    SparqlThrottledError,
+    SparqlQueryError
 )
+from src.queries import get_films_query, get_exploration_query, EXPLORATION_PAGE_SIZE
+from src.graph import entity_graph
+from src.images import thumbnails, DEFAULT_IMAGE
+from src.instrumentation import instrumentation
+from src.labels import label_cache, LANGUAGES, DEFAULT_LANGUAGE
+from src.models import Film, extract_entity_id
+from src.prefetch import prefetcher
+from src.result_store import result_store
+from src.similarity import similarity_index, FEATURE_ACTOR, FEATURE_DECADE, FEATURE_DIRECTOR, FEATURE_GENRE
+from src.stats import SessionStats
+from src.title_index import title_index, INDEX_LANGUAGE
+
+# Quantidade de filmes e de atores por filme considerados no pré-carregamento
+PREFETCH_MAX_FILMS = 8
+PREFETCH_TOP_ACTORS = 3
 
 
 
 # Funções para manipulação dos dados que retornam da Wikidata.
 # Extraem IDs, removem duplicatas e processam métricas para estatísticas.
+# O índice de títulos recebe o rótulo em inglês: o nome exibido, se a sessão está em
+# inglês, ou o rótulo em inglês já conhecido no cache (sem consultar a Wikidata).
 
-def extract_entity_id(url):
-    if not url:
-        return ""
-    
-    parts = url.split("/")
-    if parts:
-        return parts[-1]
+def index_titles(films):
+    films = list(films)
+    if st.session_state.get("language") == INDEX_LANGUAGE:
+        titles = {film.qid: film.name for film in films}
+    else:
+        titles = label_cache.get_many([film.qid for film in films], INDEX_LANGUAGE)
+    for film in films:
+        title_index.add(film.qid, titles.get(film.qid))
 
 def remove_duplicate_films(film_results):
     if not film_results:
@@ -44,54 +71,193 @@ def remove_duplicate_films(film_results):
         
     unique_films = {}
     
-    for film in film_results:
-        if "film" in film and "value" in film["film"]:
-            film_url = film["film"]["value"]
-            film_qid = extract_entity_id(film_url)
+    for row in film_results:
+        if row.get("film"):
+            film_qid = extract_entity_id(row["film"])
             
             if film_qid not in unique_films:
-                unique_films[film_qid] = film
+                unique_films[film_qid] = Film.from_row(row)
     
     unique_film_list = list(unique_films.values())
+    index_titles(unique_film_list)
+    entity_graph.add_films(unique_film_list)
+    similarity_index.add_films(unique_film_list)
     
     if hasattr(st.session_state, 'metrics'):
         for film in unique_film_list:
             process_film_metrics(film)
     
-    try:
-        unique_film_list.sort(
-            key=lambda x: int(x.get("year", {}).get("value", "0")), 
-            reverse=True
-        )
-    except Exception as e:
-        print(f"Erro ao ordenar filmes por ano: {e}")
+    unique_film_list.sort(key=lambda film: film.year or 0, reverse=True)
     
     return unique_film_list
 
+def describe_query_error(error):
+    if isinstance(error, SparqlCircuitOpenError):
+        return (
+            f"O Wikidata está instável e as consultas foram suspensas por {error.retry_after:.0f} segundos. "
+            "Resultados já carregados continuam disponíveis."
+        )
+    if isinstance(error, SparqlTimeoutError):
+        return "A consulta excedeu o tempo limite do Wikidata. Tente novamente em instantes."
+    if isinstance(error, SparqlThrottledError):
+        if error.retry_after:
+            return f"O Wikidata está limitando as requisições. Tente novamente em {error.retry_after:.0f} segundos."
+        return "O Wikidata está limitando as requisições. Tente novamente em instantes."
+    if isinstance(error, SparqlQueryError):
+        return "A consulta foi rejeitada pelo Wikidata. Verifique o texto digitado."
+    if isinstance(error, SparqlError):
+        return "Serviço do Wikidata indisponível no momento."
+    return f"Erro inesperado: {str(error)}"
+
 def process_film_metrics(film):
-    if "filmName" in film and "value" in film["filmName"]:
-        st.session_state.metrics["filmes_encontrados"].append(film["filmName"]["value"])
-    
-    if "year" in film and "value" in film["year"]:
-        st.session_state.metrics["anos_filmes"].append(film["year"]["value"])
-    
-    if "directorName" in film and "value" in film["directorName"]:
-        st.session_state.metrics["diretores"].append(film["directorName"]["value"])
-    
-    if "genres" in film and "value" in film["genres"]:
-        generos = film["genres"]["value"].split(", ")
-        st.session_state.metrics["generos"].append(generos)
-    
-    if "actorTuples" in film and "value" in film["actorTuples"]:
-        actor_tuples = film["actorTuples"]["value"].split(" | ")
-        atores = []
-        for actor_tuple in actor_tuples:
-            match = re.match(r"\(([^,]+),.*\)", actor_tuple)
-            if match:
-                atores.append(match.group(1))
-        st.session_state.metrics["atores"].append(atores)
+    st.session_state.metrics.add_film(film)
+
+# Resultados exibidos: a sessão guarda só o identificador do conjunto de filmes;
+# os filmes ficam no armazenamento compartilhado entre sessões (ver result_store.py).
+# Com replace=True, o conjunto anterior é liberado (uma página a mais da mesma
+# exploração ou os mesmos filmes em outro idioma não precisam ser guardados).
+
+def current_films():
+    handle = st.session_state.results_handle
+    if handle is None:
+        return ()
+    return result_store.get(st.session_state.session_id, handle) or ()
+
+def set_current_films(films, replace=False):
+    previous = st.session_state.results_handle
+    st.session_state.results_handle = result_store.hold(st.session_state.session_id, films)
+    if replace and previous is not None and previous != st.session_state.results_handle:
+        result_store.release(st.session_state.session_id, previous)
+
+# Registro de uso compartilhado entre as sessões (ver src/analytics.py)
+
+def record_event(kind, entity=None, label=None, films=()):
+    analytics.record(st.session_state.session_id, kind, entity, label, films)
+
+def record_exploration_results(films):
+    record_event(
+        RESULTS,
+        f"{st.session_state.recommendation_type}:{st.session_state.entity_id}",
+        st.session_state.entity_name,
+        films
+    )
+
+# Nomes dos filmes no idioma da sessão. Com fetch=False, usa só os rótulos já
+# conhecidos, sem consultar a Wikidata (para resultados exibidos de imediato).
+
+def localize_films(films, fetch=True):
+    qids = [qid for film in films for qid in film.entity_ids()]
+    language = st.session_state.language
+    labels = fetch_labels(qids, language) if fetch else label_cache.get_many(qids, language)
+    return [film.with_labels(labels) for film in films]
 
 
+# Paginação da exploração de atores e diretores: a primeira página é exibida
+# assim que chega e as seguintes são buscadas sob demanda (a próxima já fica
+# sendo carregada em segundo plano).
+
+EXPLORATION_TYPES = ("actor", "director")
+
+# Filmes semelhantes a um filme, calculados pelo índice local (ver src/similarity.py)
+# com os nomes já conhecidos no idioma atual, sem consultar a Wikidata.
+SIMILAR = "similar"
+SIMILAR_ACTORS_SHOWN = 3
+
+def describe_similarity(film, shared, score):
+    parts = []
+    if FEATURE_DIRECTOR in shared:
+        parts.append("mesmo diretor")
+    actor_ids = set(shared.get(FEATURE_ACTOR, ()))
+    actors = [actor.name for actor in film.actors if actor.qid in actor_ids]
+    if actors:
+        extra = len(actors) - SIMILAR_ACTORS_SHOWN
+        parts.append("elenco em comum: " + ", ".join(actors[:SIMILAR_ACTORS_SHOWN]) + (f" e mais {extra}" if extra > 0 else ""))
+    genre_ids = set(shared.get(FEATURE_GENRE, ()))
+    genre_keys = film.genre_ids if len(film.genre_ids) == len(film.genres) else film.genres
+    genres = [genre for genre_id, genre in zip(genre_keys, film.genres) if genre_id in genre_ids]
+    if genres:
+        parts.append("gêneros " + ", ".join(genres))
+    if FEATURE_DECADE in shared:
+        parts.append(f"anos {shared[FEATURE_DECADE][0]}")
+    return f"Semelhança de {score:.0%}: " + " · ".join(parts)
+
+def load_similar_films(film_qid):
+    similar = similarity_index.similar(film_qid)
+    films = localize_films([item.film for item in similar], fetch=False)
+    for film, item in zip(films, similar):
+        st.session_state.similar_reasons[(film_qid, film.qid)] = describe_similarity(film, item.shared, item.score)
+    return films
+
+def fetch_exploration_page(kind, entity_id, page):
+    rows = execute_films_query(get_exploration_query(kind, entity_id, page), st.session_state.language)
+    has_more = len(rows) >= EXPLORATION_PAGE_SIZE
+
+    if has_more:
+        prefetcher.schedule(
+            f"{st.session_state.session_id}:paginas",
+            [get_exploration_query(kind, entity_id, page + 1)],
+            st.session_state.language
+        )
+
+    return rows, has_more
+
+def load_next_page():
+    rows, has_more = fetch_exploration_page(
+        st.session_state.recommendation_type,
+        st.session_state.entity_id,
+        st.session_state.next_page
+    )
+    films = current_films()
+    loaded = {film.qid for film in films}
+    new_films = [film for film in remove_duplicate_films(rows) if film.qid not in loaded]
+
+    set_current_films(films + tuple(new_films), replace=True)
+    record_exploration_results(new_films)
+    st.session_state.next_page += 1
+    st.session_state.has_more_pages = has_more and bool(rows)
+
+    if not st.session_state.has_more_pages:
+        mark_exploration_complete()
+
+# Quando todas as páginas foram carregadas, a filmografia fica registrada como
+# completa no grafo local e os próximos cliques nessa pessoa não consultam a Wikidata.
+
+def mark_exploration_complete():
+    entity_graph.mark_complete(
+        st.session_state.recommendation_type,
+        st.session_state.entity_id,
+        [film.qid for film in current_films()]
+    )
+
+def show_partial_films(placeholder, films):
+    with placeholder.container():
+        st.info(f"{len(films)} filmes já conhecidos; buscando a filmografia completa...")
+        for film in films:
+            year = f" ({film.year})" if film.year is not None else ""
+            st.write(f"- {film.name}{year}")
+
+def schedule_prefetch(films):
+    targets = []
+    for film in films[:PREFETCH_MAX_FILMS]:
+        if film.director:
+            targets.append(("director", film.director.qid))
+        for actor in film.actors[:PREFETCH_TOP_ACTORS]:
+            targets.append(("actor", actor.qid))
+
+    current = (st.session_state.recommendation_type, st.session_state.entity_id)
+    targets = [t for t in dict.fromkeys(targets) if t != current]
+    if targets == st.session_state.prefetch_targets:
+        return
+
+    st.session_state.prefetch_targets = targets
+    queries = [get_exploration_query(kind, qid) for kind, qid in targets]
+    prefetcher.schedule(st.session_state.session_id, queries, st.session_state.language)
+
+def cancel_prefetch():
+    st.session_state.prefetch_targets = []
+    prefetcher.cancel(st.session_state.session_id)
+    prefetcher.cancel(f"{st.session_state.session_id}:paginas")
+
 
 #Funções para estilização da interface e exibição de estatísticas.
 #Definem o visual dos cards de filmes e apresentam métricas de uso.
@@ -151,173 +317,445 @@ def exibir_estatisticas():
     
     col1, col2 = st.columns(2)
     
+    metrics = st.session_state.metrics
+    
     with col1:
         st.subheader("Métricas Gerais")
-        st.metric("Total de Buscas", st.session_state.metrics["busca_count"])
-        st.metric("Total de Filmes Encontrados", len(st.session_state.metrics["filmes_encontrados"]))
+        st.metric("Total de Buscas", metrics.busca_count)
+        st.metric("Total de Filmes Encontrados", metrics.filmes_encontrados)
         
-        if st.session_state.metrics["filmes_por_consulta"]:
-            media_filmes = sum(st.session_state.metrics["filmes_por_consulta"]) / len(st.session_state.metrics["filmes_por_consulta"])
+        media_filmes = metrics.media_filmes_por_consulta()
+        if media_filmes is not None:
             st.metric("Média de Filmes por Consulta", f"{media_filmes:.1f}")
         
-        st.metric("Cliques em Atores", st.session_state.metrics["cliques_atores"])
-        st.metric("Cliques em Diretores", st.session_state.metrics["cliques_diretores"])
+        st.metric("Cliques em Atores", metrics.cliques_atores)
+        st.metric("Cliques em Diretores", metrics.cliques_diretores)
         
-        duracao = datetime.now() - st.session_state.metrics["inicio_sessao"]
+        duracao = datetime.now() - metrics.inicio_sessao
         minutos = duracao.seconds // 60
         segundos = duracao.seconds % 60
         st.metric("Duração da Sessão", f"{minutos} min {segundos} seg")
     
     with col2:
-        if st.session_state.metrics["anos_filmes"]:
+        if metrics.decadas:
             st.subheader("Distribuição de Anos dos Filmes")
-            anos = pd.Series(st.session_state.metrics["anos_filmes"]).astype(int)
-            
-            decadas = (anos // 10 * 10)
-            contagem_decadas = Counter(decadas)
-            
-            decadas_ordenadas = sorted(contagem_decadas.keys())
-            valores = [contagem_decadas[d] for d in decadas_ordenadas]
+            decadas = metrics.decadas_ordenadas()
             
             df_decadas = pd.DataFrame({
-                'Década': [str(d) for d in decadas_ordenadas],
-                'Filmes': valores
+                'Década': [str(d) for d, _ in decadas],
+                'Filmes': [n for _, n in decadas]
             })
             st.bar_chart(df_decadas.set_index('Década'))
     
-    if st.session_state.metrics["diretores"]:
+    if len(metrics.diretores):
         st.subheader("Diretores Mais Frequentes")
-        diretores_counter = Counter(st.session_state.metrics["diretores"])
-        top_diretores = diretores_counter.most_common(5)
-        
-        df_diretores = pd.DataFrame(top_diretores, columns=['Diretor', 'Aparições'])
+        df_diretores = pd.DataFrame(metrics.diretores.most_common(5), columns=['Diretor', 'Aparições'])
         st.table(df_diretores)
         
-    if st.session_state.metrics["atores"]:
+    if len(metrics.atores):
         st.subheader("Atores Mais Frequentes")
-        todos_atores = [a for sublist in st.session_state.metrics["atores"] for a in sublist if a]
-        atores_counter = Counter(todos_atores)
-        top_atores = atores_counter.most_common(5)
-        
-        df_atores = pd.DataFrame(top_atores, columns=['Ator', 'Aparições'])
+        df_atores = pd.DataFrame(metrics.atores.most_common(5), columns=['Ator', 'Aparições'])
         st.table(df_atores)
     
-    if st.session_state.metrics["generos"]:
+    if len(metrics.generos):
         st.subheader("Gêneros Mais Comuns")
-        todos_generos = [g for sublist in st.session_state.metrics["generos"] for g in sublist if g]
-        generos_counter = Counter(todos_generos)
-        top_generos = generos_counter.most_common(5)
-        
-        df_generos = pd.DataFrame(top_generos, columns=['Gênero', 'Contagem'])
+        df_generos = pd.DataFrame(metrics.generos.most_common(5), columns=['Gênero', 'Contagem'])
         st.bar_chart(df_generos.set_index('Gênero'))
 
+    st.subheader("Cache de Consultas")
+    cache_stats = get_cache_stats()
+    col_cache1, col_cache2, col_cache3, col_cache4 = st.columns(4)
+    col_cache1.metric("Taxa de Acerto", f"{cache_stats['taxa_acerto']:.0%}")
+    col_cache2.metric("Hits (memória / disco)", f"{cache_stats['hits_memoria']} / {cache_stats['hits_disco']}")
+    col_cache3.metric("Misses", cache_stats["misses"])
+    col_cache4.metric("Evictions", cache_stats["evictions"])
+    st.caption(
+        f"{cache_stats['entradas']} entradas em memória ocupando {cache_stats['bytes'] / 1024:.0f} KB · "
+        f"{cache_stats['coalescidas']} consultas agrupadas com outras idênticas em andamento · "
+        f"{cache_stats['hits_obsoletos']} resultados vencidos servidos enquanto eram atualizados"
+    )
+    circuito = cache_stats["circuito"]
+    st.caption(
+        f"Backend das consultas: {cache_stats['backend']} · Circuito: {circuito['estado']} · {circuito['falhas_seguidas']} falhas seguidas · "
+        f"{circuito['aberturas']} aberturas · {circuito['rejeitadas']} consultas rejeitadas sem esperar o timeout"
+    )
+    limitador = get_limiter_stats()
+    fila = " · ".join(f"{classe}: {n}" for classe, n in limitador["fila"].items())
+    st.caption(
+        f"Limitador: {limitador['taxa']:g} consultas/s (rajada de {limitador['rajada']:g}), até "
+        f"{limitador['max_simultaneas']} simultâneas · {limitador['ativas']} em execução · na fila: {fila} · "
+        f"{limitador['liberadas']} liberadas ({limitador['imediatas']} sem espera) · "
+        f"{limitador['promovidas']} promovidas · {limitador['desistencias']} desistências"
+    )
+    esperas = [row for row in instrumentation.snapshot() if row["tipo"] == "fila"]
+    if esperas:
+        st.caption("Espera na fila (p50 / p99): " + " · ".join(
+            f"{row['nome']} {row['p50_ms']:.0f} / {row['p99_ms']:.0f} ms" for row in esperas
+        ))
+    snapshot_stats = cache_stats["snapshot"]
+    if snapshot_stats["entradas"]:
+        gerado_em = datetime.fromtimestamp(snapshot_stats["gerado_em"]).strftime("%d/%m/%Y %H:%M")
+        st.caption(
+            f"Snapshot de pré-aquecimento: revisão {snapshot_stats['revisao']} de {gerado_em}, "
+            f"{snapshot_stats['entradas']} entradas · {snapshot_stats['hits']} consultas e "
+            f"{snapshot_stats['rotulos']} rótulos servidos · {snapshot_stats['atualizadas']} entradas atualizadas "
+            f"em segundo plano ({snapshot_stats['pendentes']} ainda não gravadas)"
+        )
+    exibir_desempenho()
+    
+    graph_stats = entity_graph.summary()
+    st.caption(
+        f"Grafo local: {graph_stats['filmes']} filmes e {graph_stats['entidades']} pessoas "
+        f"({graph_stats['completas']} com filmografia completa) · "
+        f"{graph_stats['respostas_locais']} explorações respondidas localmente, "
+        f"{graph_stats['respostas_parciais']} com resultado parcial imediato"
+    )
+    
+    similarity_stats = similarity_index.summary()
+    st.caption(
+        f"Índice de semelhança: {similarity_stats['filmes']} filmes e "
+        f"{similarity_stats['caracteristicas']} características (diretores, atores, gêneros e décadas) · "
+        f"{similarity_stats['consultas']} consultas de filmes semelhantes"
+    )
+    
+    label_stats = get_label_stats()
+    st.caption(
+        f"Cache de rótulos: {label_stats['rotulos']} rótulos em memória · "
+        f"{label_stats['hits']} encontrados em memória, {label_stats['hits_disco']} no disco · "
+        f"{label_stats['buscados']} buscados na Wikidata"
+    )
+    
+    exibir_memoria()
+    exibir_uso()
+
+
+
+# Memória das sessões: o que está no armazenamento compartilhado de resultados, o
+# que as sessões referenciam (quanto ocupariam sem o compartilhamento) e as sessões
+# que mais referenciam, para acompanhar o orçamento de cada uma.
+
+def exibir_memoria():
+    st.subheader("Memória das Sessões")
+    store_stats = result_store.summary()
+    col_mem1, col_mem2, col_mem3, col_mem4 = st.columns(4)
+    col_mem1.metric("Sessões Ativas", store_stats["sessoes"])
+    col_mem2.metric("Memória Compartilhada", f"{store_stats['bytes'] / 1024:.0f} KB")
+    col_mem3.metric("Referenciada pelas Sessões", f"{store_stats['bytes_referenciados'] / 1024:.0f} KB")
+    col_mem4.metric("Conjuntos Liberados", store_stats["liberados"])
+    st.caption(
+        f"{store_stats['conjuntos']} conjuntos de resultados com {store_stats['filmes']} filmes e "
+        f"{store_stats['pessoas']} pessoas · {store_stats['reaproveitados']} conjuntos reaproveitados de outras sessões · "
+        f"orçamento de {store_stats['orcamento_sessao'] / 1024 / 1024:.0f} MB por sessão · "
+        f"{store_stats['sessoes_expiradas']} sessões inativas liberadas"
+    )
+    
+    sessions = sorted(result_store.sessions(), key=lambda row: row["bytes"], reverse=True)[:10]
+    if sessions:
+        df_sessoes = pd.DataFrame([
+            {
+                "Sessão": row["sessao"][:8] + (" (esta)" if row["sessao"] == st.session_state.session_id else ""),
+                "Conjuntos": row["conjuntos"],
+                "KB": round(row["bytes"] / 1024, 1),
+                "Uso do orçamento": f"{row['bytes'] / store_stats['orcamento_sessao']:.0%}",
+                "Inativa há (s)": round(row["ociosa_s"])
+            }
+            for row in sessions
+        ])
+        st.dataframe(df_sessoes, hide_index=True)
+
+
+
+# Uso de todas as sessões, lido apenas dos agregados por minuto (última hora e
+# últimas 24 horas) ou por dia (7 e 30 dias) do registro de uso.
+
+ANALYTICS_PERIODS = {
+    "Última hora": (60 * 60, "minuto"),
+    "Últimas 24 horas": (24 * 60 * 60, "minuto"),
+    "Últimos 7 dias": (7 * 24 * 60 * 60, "dia"),
+    "Últimos 30 dias": (30 * 24 * 60 * 60, "dia")
+}
+ANALYTICS_TOP = 10
+
+def analytics_table(dimension, since, resolution, column):
+    top = analytics.top(dimension, since, resolution, ANALYTICS_TOP)
+    return pd.DataFrame({column: top["label"].fillna(top["value"]), "Contagem": top["count"]})
+
+def exibir_uso():
+    st.subheader("Uso de Todas as Sessões")
+    if not analytics.enabled:
+        st.caption("Registro de uso desativado (ANALYTICS_PATH vazio ou inacessível).")
+        return
+    
+    period = st.selectbox("Período", list(ANALYTICS_PERIODS), key="analytics_period")
+    seconds, resolution = ANALYTICS_PERIODS[period]
+    since = time.time() - seconds
+    
+    timeline = analytics.timeline(since, resolution)
+    events = timeline.groupby("value")["count"].sum()
+    col_uso1, col_uso2, col_uso3, col_uso4 = st.columns(4)
+    col_uso1.metric("Buscas", int(events.get(SEARCH, 0)))
+    col_uso2.metric("Cliques em Diretores", int(events.get(DIRECTOR_CLICK, 0)))
+    col_uso3.metric("Cliques em Atores", int(events.get(ACTOR_CLICK, 0)))
+    col_uso4.metric("Resultados Exibidos", int(events.get(RESULTS, 0)))
+    
+    if not timeline.empty:
+        timeline["Horário"] = pd.to_datetime(timeline["bucket"], unit="s")
+        st.line_chart(timeline.pivot_table(index="Horário", columns="value", values="count", aggfunc="sum", fill_value=0))
+    
+    col_top1, col_top2 = st.columns(2)
+    with col_top1:
+        st.write("**Títulos mais buscados**")
+        st.dataframe(analytics_table(TITLE, since, resolution, "Título"), hide_index=True)
+        st.write("**Diretores mais clicados**")
+        st.dataframe(analytics_table(DIRECTOR_CLICK, since, resolution, "Diretor"), hide_index=True)
+    with col_top2:
+        st.write("**Filmes mais exibidos**")
+        st.dataframe(analytics_table(FILM, since, resolution, "Filme"), hide_index=True)
+        st.write("**Atores mais clicados**")
+        st.dataframe(analytics_table(ACTOR_CLICK, since, resolution, "Ator"), hide_index=True)
+    
+    col_top3, col_top4 = st.columns(2)
+    with col_top3:
+        decades = analytics.top(DECADE, since, resolution, limit=20)
+        if not decades.empty:
+            st.write("**Décadas nos resultados**")
+            st.bar_chart(decades.set_index("value")["count"].sort_index())
+    with col_top4:
+        genres = analytics_table(GENRE, since, resolution, "Gênero")
+        if not genres.empty:
+            st.write("**Gêneros nos resultados**")
+            st.bar_chart(genres.set_index("Gênero")["Contagem"])
+    
+    usage_stats = analytics.summary()
+    st.caption(
+        f"Registro de uso: {usage_stats['gravados']} eventos gravados por este processo, "
+        f"{usage_stats['em_memoria']} aguardando gravação e {usage_stats['aguardando_agregacao']} aguardando agregação · "
+        f"{usage_stats['descartados']} descartados · {usage_stats['removidos']} já agregados removidos do registro · "
+        f"agregados a cada {analytics.rollup_interval:.0f} s"
+    )
+
+
+
+# Percentis de tempo das consultas (por template) e da renderização, a partir da
+# instrumentação compartilhada pelo processo.
+
+# A instrumentação vale para o processo inteiro: o interruptor mostra o estado atual
+# (que outra sessão pode ter mudado) e só o altera quando o usuário o aciona.
+
+def set_instrumentation():
+    instrumentation.enabled = st.session_state.instrumentation_toggle
+
+
+def exibir_desempenho():
+    st.subheader("Desempenho")
+    st.session_state.instrumentation_toggle = instrumentation.enabled
+    st.toggle(
+        "Instrumentação ativa",
+        key="instrumentation_toggle",
+        on_change=set_instrumentation,
+        help="Mede tempo, bytes, linhas, origem e retentativas de cada consulta e o tempo de renderização dos cards e da página."
+    )
+    
+    series = instrumentation.snapshot()
+    if not series:
+        st.caption("Nenhuma medição registrada ainda.")
+        return
+    
+    df_desempenho = pd.DataFrame([
+        {
+            "Tipo": row["tipo"],
+            "Nome": row["nome"],
+            "Contagem": row["contagem"],
+            "p50 (ms)": row["p50_ms"],
+            "p90 (ms)": row["p90_ms"],
+            "p99 (ms)": row["p99_ms"],
+            "KB recebidos": round(row["bytes"] / 1024, 1),
+            "Linhas": row["linhas"],
+            "Origens": ", ".join(f"{k}: {v}" for k, v in sorted(row["origens"].items())),
+            "Retentativas": row["retentativas"],
+            "Erros": row["erros"]
+        }
+        for row in series
+    ])
+    st.dataframe(df_desempenho, hide_index=True)
+    
+    col_json, col_prom = st.columns(2)
+    col_json.download_button(
+        "Exportar (JSON)",
+        instrumentation.to_json().encode("utf-8"),
+        file_name="instrumentacao.json",
+        mime="application/json",
+        key="instrumentation_json"
+    )
+    col_prom.download_button(
+        "Exportar (Prometheus)",
+        instrumentation.to_prometheus().encode("utf-8"),
+        file_name="instrumentacao.prom",
+        mime="text/plain",
+        key="instrumentation_prom"
+    )
+
+
 
+#Funções para exibição de informações de um filme.
+#Cada card é um fragmento isolado: expandir o elenco redesenha apenas o próprio card.
+#O elenco mostra as primeiras linhas de atores e o restante fica recolhido até ser expandido.
 
-#Função principal para exibição de informações de um filme.
-#Cria um layout com título, ano, diretor, imagem, gêneros e atores,
-#com botões interativos para exploração relacionada.
+CARDS_PER_PAGE = 10
+ACTORS_PER_ROW = 4
+CAST_PREVIEW_ROWS = 2
 
-def display_film(film_data, show_divider=True, index=0):
+CLICK_EVENTS = {"director": DIRECTOR_CLICK, "actor": ACTOR_CLICK, SIMILAR: SIMILAR_CLICK}
+
+# `entity` é a pessoa clicada (diretor ou ator) ou, nos filmes semelhantes, o filme
+
+def start_exploration(kind, entity):
+    cancel_prefetch()
+    previous = {
+        "results": st.session_state.results_handle,
+        "language": st.session_state.labels_language,
+        "exploration_key": st.session_state.exploration_key,
+        "next_page": st.session_state.next_page,
+        "has_more_pages": st.session_state.has_more_pages
+    }
+    st.session_state.recommendation_type = kind
+    st.session_state.entity_id = entity.qid
+    st.session_state.entity_name = entity.name
+    
+    record_event(CLICK_EVENTS[kind], entity.qid, entity.name)
+    if kind == "director":
+        st.session_state.metrics.cliques_diretores += 1
+        title = f"Explorando filmes de {entity.name}"
+    elif kind == "actor":
+        st.session_state.metrics.cliques_atores += 1
+        title = f"Explorando a filmografia de {entity.name}"
+    else:
+        title = f"Filmes semelhantes a {entity.name}"
+    
+    st.session_state.search_history.append({
+        "type": kind,
+        "id": entity.qid,
+        "name": entity.name,
+        "title": title,
+        "previous": previous
+    })
+    st.rerun()
+
+# Desfaz a última navegação; os resultados da página anterior voltam a ser exibidos
+# sem nova consulta enquanto estiverem no orçamento de memória da sessão (e no
+# mesmo idioma). Caso contrário, a página anterior é carregada de novo.
+
+def go_back():
+    cancel_prefetch()
+    if st.session_state.search_history:
+        restore_results(st.session_state.search_history.pop()["previous"])
+    
+    if st.session_state.search_history:
+        previous = st.session_state.search_history[-1]
+        st.session_state.recommendation_type = previous["type"]
+        st.session_state.entity_id = previous["id"]
+        st.session_state.entity_name = previous["name"]
+    else:
+        st.session_state.recommendation_type = None
+        st.session_state.entity_id = None
+        st.session_state.entity_name = None
+
+def restore_results(previous):
+    films = None
+    if previous["results"] is not None and previous["language"] == st.session_state.language:
+        films = result_store.restore(st.session_state.session_id, previous["results"])
+    
+    if films is None:
+        st.session_state.results_handle = None
+        st.session_state.exploration_key = None
+        return
+    
+    st.session_state.results_handle = previous["results"]
+    st.session_state.exploration_key = previous["exploration_key"]
+    st.session_state.next_page = previous["next_page"]
+    st.session_state.has_more_pages = previous["has_more_pages"]
+
+def toggle_cast(film_qid):
+    st.session_state.expanded_casts ^= {film_qid}
+
+@st.fragment
+def display_film(film, show_divider=True, index=0, image_path=None):
+    with instrumentation.timer("card_filme"):
+        render_film_card(film, show_divider, index, image_path)
+
+def render_film_card(film, show_divider, index, image_path):
     if show_divider:
         st.divider()
     
-    film_name = film_data["filmName"]["value"] if "filmName" in film_data else "Desconhecido"
-    film_url = film_data["film"]["value"] if "film" in film_data else ""
-    film_id = extract_entity_id(film_url)
-    
     col1, col2 = st.columns([3, 1])
     
     with col1:
-        st.subheader(film_name)
+        st.subheader(film.name)
         
-        if "year" in film_data:
-            st.write(f"**Ano:** {film_data['year']['value']}")
+        if film.year is not None:
+            st.write(f"**Ano:** {film.year}")
         
-        st.caption(f"ID Wikidata: {film_id}")
+        st.caption(f"ID Wikidata: {film.qid}")
         
-        if "director" in film_data and "directorName" in film_data:
-            director_url = film_data["director"]["value"]
-            director_name = film_data["directorName"]["value"]
-            director_id = extract_entity_id(director_url)
+        if st.session_state.recommendation_type == SIMILAR:
+            reason = st.session_state.similar_reasons.get((st.session_state.entity_id, film.qid))
+            if reason:
+                st.caption(reason)
+        
+        if film.director:
+            director = film.director
             
             st.write("**Diretor:** (clique para explorar outros projetos do diretor)")
-            director_button_key = f"director_{director_id}_{film_id}_{index}"
+            director_button_key = f"director_{director.qid}_{film.qid}_{index}"
             
-            if st.button(f"{director_name}", key=director_button_key, type="secondary"):
-                st.session_state.recommendation_type = "director"
-                st.session_state.entity_id = director_id
-                st.session_state.entity_name = director_name
-                
-                st.session_state.metrics["cliques_diretores"] += 1
-                
-                st.session_state.search_history.append({
-                    "type": "director",
-                    "id": director_id,
-                    "name": director_name,
-                    "title": f"Explorando filmes de {director_name}"
-                })
-                st.rerun()
+            if st.button(f"{director.name}", key=director_button_key, type="secondary"):
+                start_exploration("director", director)
+        
+        if st.button("Filmes semelhantes", key=f"similar_{film.qid}_{index}", type="secondary"):
+            start_exploration(SIMILAR, film)
     
     with col2:
-        if "displayImage" in film_data:
-            st.image(film_data["displayImage"]["value"], width=150)
-        else:
-            st.image("static/images/default-image.png", width=150)
+        st.image(image_path or DEFAULT_IMAGE, width=150)
         
-    if "genres" in film_data:
+    if film.genres:
         st.write("**Gêneros:**")
-        genres = film_data["genres"]["value"].split(", ")
-        unique_genres = []
-        for genre in genres:
-            if genre not in unique_genres:
-                unique_genres.append(genre)
-        
-        genre_cols = st.columns(min(len(unique_genres), 4))
+        genre_cols = st.columns(min(len(film.genres), 4))
         
-        for i, genre in enumerate(unique_genres):
+        for i, genre in enumerate(film.genres):
             col_idx = i % len(genre_cols)
             with genre_cols[col_idx]:
                 st.write(genre)
     
-    if "actorTuples" in film_data:
+    if film.actors:
         st.write("**Actors:** (clique nos nomes para explorar a filmografia de cada ator)")
-        actor_tuples = film_data["actorTuples"]["value"].split(" | ")
         
-        actors_data = []
+        preview_size = CAST_PREVIEW_ROWS * ACTORS_PER_ROW
+        expanded = film.qid in st.session_state.expanded_casts
+        actors = film.actors if expanded else film.actors[:preview_size]
         
-        num_actors = len(actor_tuples)
-        num_rows = (num_actors + 3) // 4
+        for row_start in range(0, len(actors), ACTORS_PER_ROW):
+            cols = st.columns(ACTORS_PER_ROW)
+            for col_idx, actor in enumerate(actors[row_start:row_start + ACTORS_PER_ROW]):
+                with cols[col_idx]:
+                    if st.button(f"{actor.name}", key=f"actor_{actor.qid}_{film.qid}_{index}_{col_idx}", type="secondary"):
+                        start_exploration("actor", actor)
         
-        for row in range(num_rows):
-            cols = st.columns(4)
-            for col_idx in range(4):
-                actor_idx = row * 4 + col_idx
-                if actor_idx < num_actors:
-                    actor_tuple = actor_tuples[actor_idx]
-                    match = re.match(r'\(([^,]+), (Q\d+)\)', actor_tuple)
-                    if match:
-                        actor_name, actor_qid = match.groups()
-                        with cols[col_idx]:
-                            if st.button(f"{actor_name}", key=f"actor_{actor_qid}_{film_id}_{index}_{col_idx}", type="secondary"):
-                                st.session_state.recommendation_type = "actor"
-                                st.session_state.entity_id = actor_qid
-                                st.session_state.entity_name = actor_name
-                                
-                                st.session_state.metrics["cliques_atores"] += 1
-                                
-                                st.session_state.search_history.append({
-                                    "type": "actor",
-                                    "id": actor_qid,
-                                    "name": actor_name,
-                                    "title": f"Explorando a filmografia de {actor_name}"
-                                })
-                                st.rerun()
+        hidden = len(film.actors) - preview_size
+        if hidden > 0:
+            st.button(
+                "Recolher elenco" if expanded else f"Mostrar elenco completo (+{hidden})",
+                key=f"cast_{film.qid}_{index}",
+                on_click=toggle_cast,
+                args=(film.qid,)
+            )
 
 
 
 #Configuração inicial da página e inicialização das variáveis de estado.
 #Define as configurações da interface e inicializa o armazenamento de dados para a sessão do usuário.
 
+page_start = time.perf_counter()
+
 st.set_page_config(
     page_title="Explorador de Filmes via Wikidata", 
     page_icon="🎥",
@@ -325,9 +763,10 @@ st.set_page_config(
 )
 
 apply_card_styling()
+start_snapshot_refresh()
 
-if "search_results" not in st.session_state:
-    st.session_state.search_results = []
+if "results_handle" not in st.session_state:
+    st.session_state.results_handle = None
 
 if "exploration_type" not in st.session_state:
     st.session_state.exploration_type = None
@@ -344,23 +783,40 @@ if "entity_name" not in st.session_state:
 if "search_history" not in st.session_state:
     st.session_state.search_history = []
 
+if "similar_reasons" not in st.session_state:
+    st.session_state.similar_reasons = {}
+
 if "metrics" not in st.session_state:
-    st.session_state.metrics = {
-        "busca_count": 0,
-        "filmes_encontrados": [],
-        "anos_filmes": [],
-        "diretores": [],
-        "atores": [],
-        "generos": [],
-        "inicio_sessao": datetime.now(),
-        "cliques_atores": 0,
-        "cliques_diretores": 0,
-        "filmes_por_consulta": []
-    }
+    st.session_state.metrics = SessionStats()
 
 if "show_stats_toggle" not in st.session_state:
     st.session_state.show_stats_toggle = False
 
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+
+if "prefetch_enabled" not in st.session_state:
+    st.session_state.prefetch_enabled = False
+
+if "prefetch_targets" not in st.session_state:
+    st.session_state.prefetch_targets = []
+
+if "expanded_casts" not in st.session_state:
+    st.session_state.expanded_casts = set()
+
+if "results_view" not in st.session_state:
+    st.session_state.results_view = None
+    st.session_state.results_page = 0
+
+if "language" not in st.session_state:
+    st.session_state.language = DEFAULT_LANGUAGE if DEFAULT_LANGUAGE in LANGUAGES else "en"
+    st.session_state.labels_language = st.session_state.language
+
+if "exploration_key" not in st.session_state:
+    st.session_state.exploration_key = None
+    st.session_state.next_page = 0
+    st.session_state.has_more_pages = False
+
 
 
 def toggle_stats():
@@ -378,6 +834,35 @@ with col_titulo:
 
 with col_botao:
     st.button("📊 Estatísticas", key="stats_button", type="secondary", on_click=toggle_stats, use_container_width=True)
+    st.checkbox(
+        "⚡ Pré-carregar filmografias",
+        key="prefetch_enabled",
+        help="Carrega em segundo plano os filmes do diretor e dos principais atores exibidos, para que o próximo clique seja instantâneo."
+    )
+    st.selectbox(
+        "🌐 Idioma dos nomes",
+        list(LANGUAGES),
+        format_func=LANGUAGES.get,
+        key="language",
+        help="Idioma dos nomes de filmes, pessoas e gêneros. A troca reaproveita os resultados já carregados e busca apenas os nomes que faltam."
+    )
+
+# Troca de idioma: os filmes já carregados são renomeados com o cache de rótulos,
+# sem refazer as consultas de filmes.
+if st.session_state.labels_language != st.session_state.language:
+    try:
+        if current_films():
+            set_current_films(localize_films(current_films()), replace=True)
+        st.session_state.labels_language = st.session_state.language
+    except Exception as e:
+        st.warning(f"Não foi possível carregar os nomes no idioma escolhido. {describe_query_error(e)}")
+
+circuit = get_circuit_state()
+if circuit["estado"] != "fechado":
+    st.warning(
+        f"⚠️ O Wikidata está instável (circuito {circuit['estado']}). Novas consultas ficam suspensas "
+        f"por mais {circuit['reabre_em']:.0f} s; resultados em cache continuam sendo exibidos."
+    )
 
 if st.session_state.get("show_stats_toggle", False):
     exibir_estatisticas()
@@ -392,36 +877,109 @@ if st.session_state.search_history:
 
 #Seção de busca para encontrar filmes por título.
 #Apresenta um campo de texto e botão para buscar filmes no Wikidata, processando e exibindo os resultados encontrados.
+#Títulos já vistos ficam no índice local, que sugere correções e permite buscar direto pelo QID.
+
+TITLE_SUGGESTIONS = 4
+
+def run_title_search(query, film_title):
+    with st.spinner('Buscando filmes...'):
+        try:
+            results = execute_films_query(query, st.session_state.language)
+            
+            if results:
+                num_filmes = len(results)
+                st.session_state.metrics.record_search(num_filmes)
+                unique_films = remove_duplicate_films(results)
+                set_current_films(unique_films)
+                record_event(SEARCH, film_title, films=unique_films)
+                st.success(f"Encontrados {len(unique_films)} filmes para '{film_title}'")
+                if results.stale:
+                    st.caption("Resultado em cache, possivelmente desatualizado; atualizando em segundo plano.")
+            else:
+                st.error(f"Nenhum filme encontrado com o título '{film_title}'")
+                set_current_films(())
+                record_event(SEARCH, film_title)
+        except Exception as e:
+            st.error(f"Erro ao buscar filmes. {describe_query_error(e)}")
+
+def run_batch_search(titles):
+    rows = []
+    progress = st.progress(0.0, text="Resolvendo títulos...")
+    try:
+        for i, (title, bindings) in enumerate(execute_batch_title_query(titles, st.session_state.language)):
+            films = {}
+            for row in bindings:
+                film = Film.from_row(row)
+                films.setdefault(film.qid, film)
+            index_titles(films.values())
+            for film in films.values():
+                rows.append({
+                    "Título": title,
+                    "ID Wikidata": film.qid,
+                    "Filme": film.name,
+                    "Ano": film.year,
+                    "Diretor": film.director.name if film.director else None,
+                    "Gêneros": ", ".join(film.genres)
+                })
+            record_event(SEARCH, title, films=tuple(films.values()))
+            if not films:
+                rows.append({"Título": title, "ID Wikidata": None, "Filme": None, "Ano": None, "Diretor": None, "Gêneros": None})
+            progress.progress((i + 1) / len(titles), text=f"{i + 1} de {len(titles)} títulos resolvidos")
+    except Exception as e:
+        st.error(f"Erro na busca em lote. {describe_query_error(e)}")
+    finally:
+        progress.empty()
+    st.session_state.batch_results = pd.DataFrame(rows)
 
 if not st.session_state.recommendation_type:
     st.markdown("<h3 style='color: white;'>Digite o nome de um filme que você já viu e explore informações como elenco, diretor, ano e gênero.</h3>", unsafe_allow_html=True)
-    st.markdown("<span style='font-size: 0.9em; color: #EED202;'>Atenção: Digite o nome do filme em inglês, respeitando letras maiúsculas e pontuação.</span>", unsafe_allow_html=True)
+    st.markdown("<span style='font-size: 0.9em; color: #EED202;'>Atenção: Digite o nome do filme em inglês. Sem sugestões do índice local, a busca exige o título exato, respeitando letras maiúsculas e pontuação.</span>", unsafe_allow_html=True)
     
     col1, col2, col3 = st.columns([1, 2, 1])
     
     with col2:
         film_title = st.text_input("Digite o título do filme", key="film_title", autocomplete="off")
         
+        selected_qids = None
+        suggestions = title_index.suggest(film_title, TITLE_SUGGESTIONS) if film_title else []
+        if suggestions:
+            st.caption("Sugestões (clique para buscar diretamente):")
+            suggestion_cols = st.columns(min(len(suggestions), 4))
+            for i, (qid, label) in enumerate(suggestions):
+                with suggestion_cols[i % len(suggestion_cols)]:
+                    if st.button(label, key=f"suggestion_{qid}", help=f"ID Wikidata: {qid}"):
+                        selected_qids = [qid]
+        
         if st.button("Buscar", key="search_button", use_container_width=True) and film_title:
-            with st.spinner('Buscando filmes...'):
-                try:
-                    query = get_film_by_title_query(film_title)
-                    results = execute_sparql_query(query)
-                    
-                    if results and "results" in results and "bindings" in results["results"] and results["results"]["bindings"]:
-                        st.session_state.metrics["busca_count"] += 1
-                        
-                        num_filmes = len(results["results"]["bindings"])
-                        st.session_state.metrics["filmes_por_consulta"].append(num_filmes)
-                        unique_films = remove_duplicate_films(results["results"]["bindings"])
-                        st.session_state.search_results = unique_films
-                        st.success(f"Encontrados {len(unique_films)} filmes para '{film_title}'")
-                    else:
-                        st.error(f"Nenhum filme encontrado com o título '{film_title}'")
-                        st.session_state.search_results = []
-                except Exception as e:
-                    st.error(f"Erro ao buscar filmes: {str(e)}. Tempo limite excedido ou serviço indisponível.")
-                    st.session_state.search_results = []
+            exact_matches = title_index.exact(film_title)
+            if exact_matches:
+                selected_qids = [qid for qid, _, _ in exact_matches]
+            else:
+                run_title_search(get_films_query("title", film_title), film_title)
+        
+        if selected_qids:
+            run_title_search(get_films_query("qid", selected_qids), film_title)
+        
+        with st.expander("Busca em lote a partir de um arquivo CSV"):
+            uploaded = st.file_uploader("Arquivo CSV com uma coluna de títulos em inglês", type=["csv"], key="batch_csv")
+            if uploaded is not None:
+                df_titulos = pd.read_csv(uploaded)
+                column = st.selectbox("Coluna com os títulos", df_titulos.columns, key="batch_column")
+                if st.button("Resolver títulos", key="batch_button", use_container_width=True):
+                    run_batch_search(df_titulos[column].dropna().astype(str).tolist())
+            
+            batch_results = st.session_state.get("batch_results")
+            if batch_results is not None and not batch_results.empty:
+                encontrados = batch_results["ID Wikidata"].notna().sum()
+                st.caption(f"{encontrados} filmes encontrados para {batch_results['Título'].nunique()} títulos")
+                st.dataframe(batch_results, hide_index=True)
+                st.download_button(
+                    "Baixar resultados (CSV)",
+                    batch_results.to_csv(index=False).encode("utf-8"),
+                    file_name="filmes_resolvidos.csv",
+                    mime="text/csv",
+                    key="batch_download"
+                )
 
 
 
@@ -437,66 +995,154 @@ if st.session_state.recommendation_type and st.session_state.entity_name:
         st.subheader(f"Explorando filmes com {st.session_state.entity_name}")
     
     if st.button("Retornar ao explorador de filmes", key="return_to_search", type="primary"):
+        cancel_prefetch()
+        st.session_state.exploration_key = None
         st.session_state.recommendation_type = None
         st.session_state.entity_id = None
         st.session_state.entity_name = None
-        st.session_state.search_results = []
+        st.session_state.results_handle = None
         st.session_state.search_history = []
+        st.session_state.similar_reasons = {}
+        result_store.drop_session(st.session_state.session_id)
         st.rerun()
     
-    cache_key = f"{st.session_state.recommendation_type}_{st.session_state.entity_id}"
-    
-    if "query_cache" not in st.session_state:
-        st.session_state.query_cache = {}
+    exploration_key = f"{st.session_state.recommendation_type}_{st.session_state.entity_id}"
     
-    if cache_key in st.session_state.query_cache and st.session_state.search_results:
-        results = st.session_state.query_cache[cache_key]
-        unique_films = st.session_state.search_results
+    if st.session_state.exploration_key == exploration_key and current_films():
+        unique_films = current_films()
+    elif st.session_state.recommendation_type == SIMILAR:
+        unique_films = load_similar_films(st.session_state.entity_id)
+        if unique_films:
+            set_current_films(unique_films)
+            record_exploration_results(unique_films)
+            st.session_state.exploration_key = exploration_key
+            st.session_state.has_more_pages = False
+            st.session_state.metrics.record_search(len(unique_films))
+            st.success(
+                f"{len(unique_films)} filmes semelhantes entre os "
+                f"{len(similarity_index)} já carregados nesta e em outras sessões"
+            )
+        else:
+            st.error(f"Nenhum filme semelhante a {st.session_state.entity_name} entre os filmes já carregados")
     else:
-        with st.spinner('Carregando filmes...'):
+        known_films, complete = entity_graph.films_for(st.session_state.recommendation_type, st.session_state.entity_id)
+        
+        if complete and known_films:
             try:
-                if st.session_state.recommendation_type == "actor":
-                    query = get_films_by_actor_query(st.session_state.entity_id)
-                elif st.session_state.recommendation_type == "director":
-                    query = get_films_by_director_query(st.session_state.entity_id)
-                else:
-                    query = None
-                
-                if query:
-                    results = execute_sparql_query(query)
-                    st.session_state.query_cache[cache_key] = results
-                    
-                    if results and "results" in results and "bindings" in results["results"] and results["results"]["bindings"]:
-                        process_film_metrics(results["results"]["bindings"])
-                        
-                        unique_films = remove_duplicate_films(results["results"]["bindings"])
-                        st.session_state.search_results = unique_films
-                        
-                        st.session_state.metrics["busca_count"] += 1
-                        
-                        num_filmes = len(unique_films)
-                        st.session_state.metrics["filmes_por_consulta"].append(num_filmes)
+                unique_films = localize_films(known_films)
+            except Exception:
+                unique_films = localize_films(known_films, fetch=False)
+            for film in unique_films:
+                process_film_metrics(film)
+            set_current_films(unique_films)
+            record_exploration_results(unique_films)
+            st.session_state.exploration_key = exploration_key
+            st.session_state.has_more_pages = False
+            st.session_state.metrics.record_search(len(unique_films))
+            st.success(f"Encontrados {len(unique_films)} filmes")
+        else:
+            partial_placeholder = st.empty()
+            if known_films:
+                show_partial_films(partial_placeholder, localize_films(known_films, fetch=False))
+            
+            with st.spinner('Carregando filmes...'):
+                try:
+                    if st.session_state.recommendation_type in EXPLORATION_TYPES:
+                        rows, has_more = fetch_exploration_page(
+                            st.session_state.recommendation_type,
+                            st.session_state.entity_id,
+                            0
+                        )
                         
-                        st.success(f"Encontrados {len(unique_films)} filmes")
+                        if rows:
+                            unique_films = remove_duplicate_films(rows)
+                            set_current_films(unique_films)
+                            record_exploration_results(unique_films)
+                            st.session_state.exploration_key = exploration_key
+                            st.session_state.next_page = 1
+                            st.session_state.has_more_pages = has_more
+                            
+                            st.session_state.metrics.record_search(len(unique_films))
+                            
+                            if rows.stale:
+                                st.caption("Resultado em cache, possivelmente desatualizado; atualizando em segundo plano.")
+                            
+                            if has_more:
+                                st.success(f"Exibindo os primeiros {len(unique_films)} filmes")
+                            else:
+                                mark_exploration_complete()
+                                st.success(f"Encontrados {len(unique_films)} filmes")
+                        else:
+                            st.error(f"Nenhum filme encontrado com {st.session_state.entity_name}")
                     else:
-                        st.error(f"Nenhum filme encontrado com {st.session_state.entity_name}")
-                        st.session_state.search_results = []
-                else:
-                    st.error("Tipo de exploração inválido")
-                    st.session_state.search_results = []
-            except Exception as e:
-                st.error(f"Erro ao carregar dados: {str(e)}. Tempo limite excedido ou serviço indisponível.")
-                st.session_state.recommendation_type = None
-                st.session_state.entity_id = None
-                st.session_state.entity_name = None
-                st.session_state.search_results = []
-                st.session_state.search_history = []
+                        st.error("Tipo de exploração inválido")
+                except Exception as e:
+                    st.error(f"Erro ao carregar dados. {describe_query_error(e)}")
+                    col_retry, col_back = st.columns(2)
+                    col_retry.button("Tentar novamente", key="retry_exploration", use_container_width=True)
+                    col_back.button("Voltar à página anterior", key="back_exploration", on_click=go_back, use_container_width=True)
+
+            partial_placeholder.empty()
 
 
 
 #Exibição dos resultados da busca ou recomendações.
-#Percorre a lista de filmes e exibe cada um usando a função display_film.
+#Apenas os cards da página atual (CARDS_PER_PAGE filmes) são montados; os demais
+#resultados ficam na sessão e são exibidos pelos botões de navegação.
+
+def change_results_page(delta):
+    st.session_state.results_page += delta
+
+# Na exploração, os resultados guardados só são exibidos se forem da pessoa atual
+# (após uma falha, a sessão ainda guarda os filmes da página anterior).
+films = current_films()
+showing_results = bool(films) and (
+    not st.session_state.recommendation_type
+    or st.session_state.exploration_key == f"{st.session_state.recommendation_type}_{st.session_state.entity_id}"
+)
+
+if showing_results:
+    view_key = (st.session_state.recommendation_type, st.session_state.entity_id, films[0].qid)
+    if st.session_state.results_view != view_key:
+        st.session_state.results_view = view_key
+        st.session_state.results_page = 0
+    
+    page_count = (len(films) + CARDS_PER_PAGE - 1) // CARDS_PER_PAGE
+    page = min(st.session_state.results_page, page_count - 1)
+    first = page * CARDS_PER_PAGE
+    visible_films = films[first:first + CARDS_PER_PAGE]
+    
+    image_paths = thumbnails.fetch_many(film.image for film in visible_films)
+    
+    for i, film in enumerate(visible_films, first):
+        display_film(film, i > first, i, image_paths.get(film.image))
+    
+    if page_count > 1:
+        st.divider()
+        col_prev, col_info, col_next = st.columns([1, 2, 1])
+        col_prev.button("← Anteriores", key="results_prev", disabled=page == 0,
+                        on_click=change_results_page, args=(-1,), use_container_width=True)
+        col_info.caption(f"Filmes {first + 1}–{first + len(visible_films)} de {len(films)}")
+        col_next.button("Próximos →", key="results_next", disabled=page == page_count - 1,
+                        on_click=change_results_page, args=(1,), use_container_width=True)
+
+    if st.session_state.recommendation_type and st.session_state.has_more_pages and page == page_count - 1:
+        st.divider()
+        if st.button("Carregar mais filmes", key="load_more", use_container_width=True):
+            with st.spinner('Carregando mais filmes...'):
+                try:
+                    loaded = len(films)
+                    load_next_page()
+                    if len(current_films()) > loaded:
+                        st.session_state.results_page = loaded // CARDS_PER_PAGE
+                    st.rerun()
+                except Exception as e:
+                    st.error(f"Erro ao carregar mais filmes. {describe_query_error(e)}")
+
+    if st.session_state.prefetch_enabled:
+        schedule_prefetch(visible_films)
+    elif st.session_state.prefetch_targets:
+        cancel_prefetch()
 
-if "search_results" in st.session_state and st.session_state.search_results:
-    for i, film_data in enumerate(st.session_state.search_results):
-        display_film(film_data, i > 0, i)
+if instrumentation.enabled:
+    instrumentation.record_render("pagina", time.perf_counter() - page_start)
@@ -0,0 +1,219 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from hashlib import sha1
+
+
+# Configuração do cache compartilhado de consultas SPARQL.
+# Os limites podem ser ajustados por variáveis de ambiente; sem SPARQL_CACHE_PATH
+# o cache fica apenas em memória.
+
+CACHE_TTL_SECONDS = int(os.environ.get("SPARQL_CACHE_TTL", 6 * 60 * 60))
+CACHE_MAX_ENTRIES = int(os.environ.get("SPARQL_CACHE_MAX_ENTRIES", 512))
+CACHE_MAX_BYTES = int(os.environ.get("SPARQL_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+CACHE_DISK_PATH = os.environ.get("SPARQL_CACHE_PATH")
+CACHE_DISK_TTL_SECONDS = int(os.environ.get("SPARQL_CACHE_DISK_TTL", 7 * 24 * 60 * 60))
+CACHE_DISK_MAX_ENTRIES = int(os.environ.get("SPARQL_CACHE_DISK_MAX_ENTRIES", 20000))
+# Por quanto tempo uma entrada vencida ainda pode ser servida enquanto é atualizada
+CACHE_STALE_TTL_SECONDS = int(os.environ.get("SPARQL_CACHE_STALE_TTL", 7 * 24 * 60 * 60))
+
+_LITERAL_OR_SPACE = re.compile(r'"(?:[^"\\]|\\.)*"|\s+')
+
+
+# Normalização da consulta para gerar a chave do cache.
+# Espaços em branco fora de literais são colapsados, de modo que a mesma consulta
+# gerada com indentação diferente reaproveite a mesma entrada.
+
+def normalize_query(query):
+    def replace(match):
+        text = match.group(0)
+        return text if text.startswith('"') else " "
+
+    return _LITERAL_OR_SPACE.sub(replace, query).strip()
+
+
+def cache_key(query):
+    return sha1(normalize_query(query).encode("utf-8")).hexdigest()
+
+
+# Cache em dois níveis: LRU em memória com TTL e limite de tamanho, e um nível
+# opcional em disco (SQLite com JSON comprimido) que sobrevive a reinícios.
+# Os valores guardados são compartilhados entre sessões e não devem ser alterados.
+# Entradas com mais de `ttl` segundos continuam guardadas até `stale_ttl` e podem ser
+# devolvidas como obsoletas por lookup(), para serem atualizadas em segundo plano.
+
+class QueryCache:
+    def __init__(self, ttl=CACHE_TTL_SECONDS, max_entries=CACHE_MAX_ENTRIES,
+                 max_bytes=CACHE_MAX_BYTES, disk_path=CACHE_DISK_PATH,
+                 disk_ttl=CACHE_DISK_TTL_SECONDS, disk_max_entries=CACHE_DISK_MAX_ENTRIES,
+                 stale_ttl=CACHE_STALE_TTL_SECONDS):
+        self.ttl = ttl
+        self.stale_ttl = max(stale_ttl, ttl)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk_ttl = disk_ttl
+        self.disk_max_entries = disk_max_entries
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._counters = {
+            "hits_memoria": 0,
+            "hits_disco": 0,
+            "hits_obsoletos": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expiracoes": 0,
+        }
+
+        self._disk = None
+        if disk_path:
+            self._open_disk(disk_path)
+
+    def _open_disk(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._disk = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._disk.execute("PRAGMA journal_mode=WAL")
+        self._disk.execute(
+            "CREATE TABLE IF NOT EXISTS query_cache ("
+            "key TEXT PRIMARY KEY, created REAL NOT NULL, payload BLOB NOT NULL)"
+        )
+        self._disk.execute("CREATE INDEX IF NOT EXISTS query_cache_created ON query_cache (created)")
+
+    # Devolve (valor, fresco). Com allow_stale, uma entrada vencida ainda dentro de
+    # stale_ttl é devolvida com fresco=False; caso contrário conta como miss.
+
+    def lookup(self, query, allow_stale=True):
+        key = cache_key(query)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                created, size, value = entry
+                age = now - created
+                if age <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self._counters["hits_memoria"] += 1
+                    return value, True
+                if allow_stale and age <= self.stale_ttl:
+                    self._counters["hits_obsoletos"] += 1
+                    return value, False
+                if age > self.stale_ttl:
+                    self._drop(key)
+                self._counters["expiracoes"] += 1
+                self._counters["misses"] += 1
+                return None, False
+
+            value, size, created = self._disk_get(key, now)
+            if value is not None:
+                self._store(key, value, size, created)
+                if now - created <= self.ttl:
+                    self._counters["hits_disco"] += 1
+                    return value, True
+                if allow_stale and now - created <= self.stale_ttl:
+                    self._counters["hits_obsoletos"] += 1
+                    return value, False
+                self._counters["expiracoes"] += 1
+
+            self._counters["misses"] += 1
+            return None, False
+
+    def put(self, query, value, size=None):
+        key = cache_key(query)
+        now = time.time()
+        if size is None:
+            size = len(json.dumps(value))
+
+        with self._lock:
+            self._store(key, value, size, now)
+            self._disk_put(key, value, now)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            if self._disk is not None:
+                self._disk.execute("DELETE FROM query_cache")
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats["entradas"] = len(self._entries)
+            stats["bytes"] = self._bytes
+            hits = stats["hits_memoria"] + stats["hits_disco"] + stats["hits_obsoletos"]
+            lookups = hits + stats["misses"]
+            stats["taxa_acerto"] = hits / lookups if lookups else 0.0
+            if self._disk is not None:
+                stats["entradas_disco"] = self._disk.execute("SELECT COUNT(*) FROM query_cache").fetchone()[0]
+            return stats
+
+    # Métodos internos; devem ser chamados com o lock adquirido.
+
+    def _store(self, key, value, size, created):
+        if key in self._entries:
+            self._drop(key)
+        if size > self.max_bytes:
+            return
+
+        self._entries[key] = (created, size, value)
+        self._bytes += size
+
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self._counters["evictions"] += 1
+
+    def _drop(self, key):
+        created, size, value = self._entries.pop(key)
+        self._bytes -= size
+
+    def _disk_get(self, key, now):
+        if self._disk is None:
+            return None, 0, None
+
+        row = self._disk.execute(
+            "SELECT created, payload FROM query_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None, 0, None
+
+        created, payload = row
+        if now - created > max(self.disk_ttl, self.stale_ttl):
+            self._disk.execute("DELETE FROM query_cache WHERE key = ?", (key,))
+            self._counters["expiracoes"] += 1
+            return None, 0, None
+
+        try:
+            raw = zlib.decompress(payload)
+            return json.loads(raw), len(raw), created
+        except (zlib.error, ValueError) as e:
+            print(f"Entrada corrompida no cache em disco: {e}")
+            self._disk.execute("DELETE FROM query_cache WHERE key = ?", (key,))
+            return None, 0, None
+
+    def _disk_put(self, key, value, created):
+        if self._disk is None:
+            return
+
+        payload = zlib.compress(json.dumps(value, separators=(",", ":")).encode("utf-8"))
+        self._disk.execute(
+            "INSERT OR REPLACE INTO query_cache (key, created, payload) VALUES (?, ?, ?)",
+            (key, created, payload)
+        )
+
+        excess = self._disk.execute("SELECT COUNT(*) FROM query_cache").fetchone()[0] - self.disk_max_entries
+        if excess > 0:
+            self._disk.execute(
+                "DELETE FROM query_cache WHERE key IN "
+                "(SELECT key FROM query_cache ORDER BY created LIMIT ?)",
+                (excess,)
+            )
+            self._counters["evictions"] += excess
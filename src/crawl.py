@@ -0,0 +1,284 @@
+# Modo headless de coleta: percorre em largura o grafo filme -> diretor/ator -> filmes,
+# a partir de QIDs iniciais, sem passar pela interface do Streamlit.
+#
+# Exemplo:
+#     python src/crawl.py director:Q25191 actor:Q38111 --depth 2 --budget 500 \
+#         --workers 4 --output coleta.jsonl --checkpoint coleta.checkpoint.json
+#
+# Com --resume, a coleta continua do último checkpoint, acrescentando ao arquivo de saída.
+# Os filmes gravados depois do último checkpoint (antes da interrupção) já estão na
+# saída: na retomada eles são lidos de lá e não são gravados de novo.
+# As consultas passam pelo limitador de requisições (SPARQL_RATE_LIMIT e
+# SPARQL_MAX_CONCURRENT), com prioridade de segundo plano.
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from pathlib import Path
+
+current_dir = Path(__file__).parent
+parent_dir = current_dir.parent
+sys.path.append(str(parent_dir))
+
+from src.api import execute_films_query, BACKGROUND
+from src.labels import DEFAULT_LANGUAGE
+from src.models import Film
+from src.queries import get_films_query
+
+ENTITY_KINDS = ("film", "actor", "director")
+CHECKPOINT_EVERY = 20
+PARQUET_PART_ROWS = 5000
+
+
+def parse_seed(seed):
+    kind, sep, qid = seed.partition(":")
+    if not sep or kind not in ENTITY_KINDS or not qid.startswith("Q"):
+        raise argparse.ArgumentTypeError(f"Semente inválida '{seed}'; use tipo:QID, por exemplo director:Q25191")
+    return kind, qid
+
+
+def entity_query(kind, qid):
+    return get_films_query("qid" if kind == "film" else kind, qid)
+
+
+def film_record(film, kind, qid, depth):
+    return {
+        "film": film.qid,
+        "filmName": film.name,
+        "year": film.year,
+        "director": {"qid": film.director.qid, "name": film.director.name} if film.director else None,
+        "actors": [{"qid": actor.qid, "name": actor.name} for actor in film.actors],
+        "genres": list(film.genres),
+        "image": film.image,
+        "source": {"type": kind, "qid": qid},
+        "depth": depth,
+    }
+
+
+# Saída em streaming: JSONL (uma linha por filme) ou Parquet, gravado em partes
+# dentro de um diretório para não acumular tudo em memória.
+
+class JsonlWriter:
+    def __init__(self, path, append):
+        self.path = path
+        self._file = open(path, "a" if append else "w", encoding="utf-8")
+
+    # QIDs dos filmes já gravados; uma última linha incompleta (gravação
+    # interrompida) é descartada antes de acrescentar novas linhas.
+    def existing_films(self):
+        films = set()
+        self._file.flush()
+        with open(self.path, "rb+") as f:
+            complete = 0
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                complete += len(line)
+                films.add(json.loads(line)["film"])
+            f.truncate(complete)
+        self._file.seek(0, os.SEEK_END)
+        return films
+
+    def write(self, record):
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetWriter:
+    def __init__(self, path, append):
+        import pandas as pd
+
+        self._pd = pd
+        self._dir = Path(path)
+        self._dir.mkdir(parents=True, exist_ok=True)
+        if not append:
+            for part in self._dir.glob("part-*.parquet"):
+                part.unlink()
+        self._part = len(list(self._dir.glob("part-*.parquet")))
+        self._rows = []
+
+    def existing_films(self):
+        films = set()
+        for part in sorted(self._dir.glob("part-*.parquet")):
+            films.update(self._pd.read_parquet(part, columns=["film"])["film"])
+        return films
+
+    def write(self, record):
+        row = dict(record)
+        for key in ("director", "actors", "source"):
+            row[key] = json.dumps(row[key], ensure_ascii=False)
+        row["genres"] = ", ".join(row["genres"])
+        self._rows.append(row)
+        if len(self._rows) >= PARQUET_PART_ROWS:
+            self.flush()
+
+    def flush(self):
+        if not self._rows:
+            return
+        self._pd.DataFrame(self._rows).to_parquet(self._dir / f"part-{self._part:05d}.parquet", index=False)
+        self._part += 1
+        self._rows = []
+
+    def close(self):
+        self.flush()
+
+
+class Crawler:
+    def __init__(self, seeds, max_depth, budget, workers, writer, checkpoint_path=None, language=DEFAULT_LANGUAGE):
+        self.max_depth = max_depth
+        self.budget = budget
+        self.workers = workers
+        self.writer = writer
+        self.checkpoint_path = checkpoint_path
+        self.language = language
+
+        self.frontier = []
+        self.visited = set()
+        self.seen_films = set()
+        self.queries = 0
+        self.failures = 0
+
+        for kind, qid in seeds:
+            self._enqueue(kind, qid, 0)
+
+    def _enqueue(self, kind, qid, depth):
+        if (kind, qid) in self.visited or depth > self.max_depth:
+            return
+        self.visited.add((kind, qid))
+        self.frontier.append((kind, qid, depth))
+
+    def run(self):
+        in_flight = {}
+        completed = 0
+        last_checkpoint = 0
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="crawl") as executor:
+            position = 0
+            while (position < len(self.frontier) and self.queries < self.budget) or in_flight:
+                while position < len(self.frontier) and len(in_flight) < self.workers and self.queries < self.budget:
+                    kind, qid, depth = self.frontier[position]
+                    position += 1
+                    self.queries += 1
+                    # Sem cache: a coleta não deve expulsar do cache compartilhado
+                    # as consultas feitas pelas sessões interativas
+                    future = executor.submit(execute_films_query, entity_query(kind, qid), self.language, False, BACKGROUND)
+                    in_flight[future] = (kind, qid, depth)
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    kind, qid, depth = in_flight.pop(future)
+                    self._process(future, kind, qid, depth)
+                    completed += 1
+
+                # O frontier já processado é descartado; as entidades em andamento
+                # continuam no checkpoint para serem refeitas numa retomada.
+                self.frontier = self.frontier[position:]
+                position = 0
+                # Várias consultas podem terminar na mesma rodada do wait()
+                if self.checkpoint_path and completed - last_checkpoint >= CHECKPOINT_EVERY:
+                    self.save_checkpoint(list(in_flight.values()))
+                    last_checkpoint = completed
+
+        self.writer.flush()
+        if self.checkpoint_path:
+            self.save_checkpoint([])
+
+    def _process(self, future, kind, qid, depth):
+        try:
+            results = future.result()
+        except Exception as e:
+            self.failures += 1
+            print(f"Falha ao coletar {kind}:{qid}: {e}", file=sys.stderr)
+            return
+
+        # Mesmo um filme já gravado tem o diretor e o elenco enfileirados: na retomada,
+        # os filmes gravados depois do checkpoint já são conhecidos, mas as pessoas
+        # deles ainda não foram visitadas (as já visitadas são ignoradas em _enqueue).
+        for row in results:
+            film = Film.from_row(row)
+            if film.qid not in self.seen_films:
+                self.seen_films.add(film.qid)
+                self.writer.write(film_record(film, kind, qid, depth))
+
+            if film.director:
+                self._enqueue("director", film.director.qid, depth + 1)
+            for actor in film.actors:
+                self._enqueue("actor", actor.qid, depth + 1)
+
+    def save_checkpoint(self, in_flight):
+        self.writer.flush()
+        state = {
+            "frontier": [list(item) for item in in_flight + self.frontier],
+            "visited": [list(item) for item in self.visited],
+            "seen_films": sorted(self.seen_films),
+            "queries": self.queries - len(in_flight),
+            "failures": self.failures,
+            "max_depth": self.max_depth,
+            "language": self.language,
+            "saved_at": time.time(),
+        }
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    @classmethod
+    def from_checkpoint(cls, path, budget, workers, writer):
+        with open(path, encoding="utf-8") as f:
+            state = json.load(f)
+
+        crawler = cls([], state["max_depth"], budget, workers, writer, path, state.get("language", DEFAULT_LANGUAGE))
+        crawler.frontier = [tuple(item) for item in state["frontier"]]
+        crawler.visited = {tuple(item) for item in state["visited"]}
+        crawler.seen_films = set(state["seen_films"]) | writer.existing_films()
+        crawler.queries = state["queries"]
+        crawler.failures = state["failures"]
+        return crawler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Coleta em largura de filmes, diretores e atores na Wikidata.")
+    parser.add_argument("seeds", nargs="*", type=parse_seed, help="entidades iniciais no formato tipo:QID (film, actor ou director)")
+    parser.add_argument("--depth", type=int, default=1, help="profundidade máxima a partir das sementes")
+    parser.add_argument("--budget", type=int, default=200, help="número máximo de consultas SPARQL")
+    parser.add_argument("--workers", type=int, default=4, help="consultas simultâneas")
+    parser.add_argument("--output", required=True, help="arquivo .jsonl ou diretório .parquet de saída")
+    parser.add_argument("--language", default=DEFAULT_LANGUAGE, help="idioma dos nomes gravados (código da Wikidata, por exemplo en ou pt)")
+    parser.add_argument("--checkpoint", help="arquivo de checkpoint do frontier")
+    parser.add_argument("--resume", action="store_true", help="continua a partir do checkpoint")
+    args = parser.parse_args()
+
+    if args.resume and not (args.checkpoint and os.path.exists(args.checkpoint)):
+        parser.error("--resume requer um --checkpoint existente")
+    if not args.resume and not args.seeds:
+        parser.error("informe ao menos uma semente")
+
+    writer_class = ParquetWriter if args.output.endswith(".parquet") else JsonlWriter
+    writer = writer_class(args.output, append=args.resume)
+
+    if args.resume:
+        crawler = Crawler.from_checkpoint(args.checkpoint, args.budget, args.workers, writer)
+    else:
+        crawler = Crawler(args.seeds, args.depth, args.budget, args.workers, writer, args.checkpoint, args.language)
+
+    start = time.time()
+    try:
+        crawler.run()
+    except KeyboardInterrupt:
+        print("Interrompido; use --resume para continuar do último checkpoint.", file=sys.stderr)
+    finally:
+        writer.close()
+
+    print(
+        f"{len(crawler.seen_films)} filmes, {crawler.queries} consultas, {crawler.failures} falhas, "
+        f"{len(crawler.frontier)} entidades pendentes em {time.time() - start:.1f} s",
+        file=sys.stderr
+    )
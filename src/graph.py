@@ -0,0 +1,91 @@
+import os
+import threading
+from collections import OrderedDict
+
+
+# Grafo local de entidades compartilhado por todas as sessões do processo.
+# Cada filme exibido traz o QID do diretor e o elenco completo, então cada resultado
+# ensina arestas diretor -> filme e ator -> filme. Quando a filmografia de uma pessoa
+# foi carregada por inteiro (todas as páginas da exploração), ela é marcada como
+# completa e o próximo clique nessa pessoa é respondido sem consultar a Wikidata.
+# Para as demais, o grafo fornece um resultado parcial exibido enquanto a consulta roda.
+
+GRAPH_MAX_FILMS = int(os.environ.get("GRAPH_MAX_FILMS", 50000))
+
+
+class EntityGraph:
+    def __init__(self, max_films=GRAPH_MAX_FILMS):
+        self.max_films = max_films
+        self._lock = threading.Lock()
+        self._films = OrderedDict()
+        self._edges = {}
+        self._complete = set()
+        self.stats = {"respostas_locais": 0, "respostas_parciais": 0}
+
+    def __len__(self):
+        with self._lock:
+            return len(self._films)
+
+    def add_films(self, films):
+        with self._lock:
+            for film in films:
+                self._films[film.qid] = film
+                self._films.move_to_end(film.qid)
+                if film.director:
+                    self._edges.setdefault(("director", film.director.qid), set()).add(film.qid)
+                for actor in film.actors:
+                    self._edges.setdefault(("actor", actor.qid), set()).add(film.qid)
+
+            while len(self._films) > self.max_films:
+                self._evict(*self._films.popitem(last=False))
+
+    def _evict(self, qid, film):
+        keys = [("actor", actor.qid) for actor in film.actors]
+        if film.director:
+            keys.append(("director", film.director.qid))
+        for key in keys:
+            # A filmografia deixa de estar completa quando perde um filme
+            self._complete.discard(key)
+            film_ids = self._edges.get(key)
+            if film_ids is not None:
+                film_ids.discard(qid)
+                if not film_ids:
+                    del self._edges[key]
+
+    # A lista retornada pela consulta completa passa a ser a filmografia da pessoa;
+    # arestas aprendidas de outros resultados que ela não contém são descartadas.
+
+    def mark_complete(self, kind, qid, film_ids):
+        key = (kind, qid)
+        with self._lock:
+            film_ids = {film_id for film_id in film_ids if film_id in self._films}
+            self._edges[key] = film_ids
+            self._complete.add(key)
+
+    def films_for(self, kind, qid):
+        key = (kind, qid)
+        with self._lock:
+            complete = key in self._complete
+            films = [self._films[film_id] for film_id in self._edges.get(key, ()) if film_id in self._films]
+            for film in films:
+                self._films.move_to_end(film.qid)
+            if complete:
+                self.stats["respostas_locais"] += 1
+            elif films:
+                self.stats["respostas_parciais"] += 1
+
+        films.sort(key=lambda film: film.qid)
+        films.sort(key=lambda film: film.year or 0, reverse=True)
+        return films, complete
+
+    def summary(self):
+        with self._lock:
+            return {
+                "filmes": len(self._films),
+                "entidades": len(self._edges),
+                "completas": len(self._complete),
+                **self.stats,
+            }
+
+
+entity_graph = EntityGraph()
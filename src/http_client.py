@@ -0,0 +1,179 @@
+import os
+import random
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ReadTimeoutError
+
+
+# Configuração do cliente HTTP usado nas consultas SPARQL.
+# Timeouts separados para conexão e leitura evitam que uma requisição travada
+# prenda a thread da sessão do Streamlit indefinidamente.
+
+CONNECT_TIMEOUT = float(os.environ.get("SPARQL_CONNECT_TIMEOUT", 5))
+READ_TIMEOUT = float(os.environ.get("SPARQL_READ_TIMEOUT", 65))
+MAX_RETRIES = int(os.environ.get("SPARQL_MAX_RETRIES", 3))
+BACKOFF_BASE = float(os.environ.get("SPARQL_BACKOFF_BASE", 0.5))
+BACKOFF_MAX = float(os.environ.get("SPARQL_BACKOFF_MAX", 30))
+POOL_SIZE = int(os.environ.get("SPARQL_POOL_SIZE", 16))
+
+RETRY_STATUS = {429, 502, 503, 504}
+
+# Consultas maiores que isso são enviadas via POST, para não estourar o limite
+# de tamanho de URL do endpoint
+MAX_GET_QUERY_CHARS = 4000
+
+
+# Hierarquia de erros das consultas, para que a interface diferencie timeouts,
+# limitação de taxa, consultas inválidas e indisponibilidade do serviço.
+
+class SparqlError(Exception):
+    def __init__(self, message, status=None, retries=0):
+        super().__init__(message)
+        self.status = status
+        self.retries = retries
+
+
+class SparqlTimeoutError(SparqlError):
+    pass
+
+
+class SparqlThrottledError(SparqlError):
+    def __init__(self, message, status=None, retries=0, retry_after=None):
+        super().__init__(message, status, retries)
+        self.retry_after = retry_after
+
+
+class SparqlQueryError(SparqlError):
+    pass
+
+
+class SparqlUnavailableError(SparqlError):
+    pass
+
+
+class SparqlCircuitOpenError(SparqlUnavailableError):
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value):
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+# Um timeout de leitura no meio do corpo (com stream=True) não chega como ReadTimeout:
+# o requests o entrega como ConnectionError, com o ReadTimeoutError do urllib3 dentro.
+
+def is_timeout(error):
+    if isinstance(error, requests.exceptions.Timeout):
+        return True
+    return isinstance(error, requests.exceptions.ConnectionError) and any(
+        isinstance(arg, ReadTimeoutError) for arg in error.args
+    )
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_MAX):
+    # Backoff exponencial com "full jitter"
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+# Cliente com pool de conexões (keep-alive) compartilhado entre as sessões.
+# Repete requisições de forma limitada em falhas transitórias, respeitando o
+# cabeçalho Retry-After das respostas 429/503.
+
+class SparqlClient:
+    def __init__(self, endpoint, headers, connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT,
+                 max_retries=MAX_RETRIES, pool_size=POOL_SIZE):
+        self.endpoint = endpoint
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+
+        self.session = requests.Session()
+        self.session.headers.update(headers)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def execute(self, query, headers=None, stream=False):
+        attempt = 0
+        while True:
+            try:
+                if len(query) > MAX_GET_QUERY_CHARS:
+                    response = self.session.post(
+                        self.endpoint,
+                        data={"query": query},
+                        headers=headers,
+                        timeout=self.timeout,
+                        stream=stream
+                    )
+                else:
+                    response = self.session.get(
+                        self.endpoint,
+                        params={"query": query},
+                        headers=headers,
+                        timeout=self.timeout,
+                        stream=stream
+                    )
+            except requests.exceptions.ReadTimeout as e:
+                raise SparqlTimeoutError(f"Tempo limite de leitura excedido: {e}", retries=attempt)
+            except (requests.exceptions.ConnectTimeout, requests.exceptions.ConnectionError) as e:
+                if attempt >= self.max_retries:
+                    raise SparqlUnavailableError(f"Falha de conexão com o Wikidata: {e}", retries=attempt)
+                time.sleep(backoff_delay(attempt))
+                attempt += 1
+                continue
+            except requests.exceptions.RequestException as e:
+                raise SparqlError(f"Falha na consulta ao Wikidata: {e}", retries=attempt)
+
+            if response.status_code < 400:
+                response.retries = attempt
+                return response
+
+            if response.status_code in RETRY_STATUS:
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                delay = retry_after if retry_after is not None else backoff_delay(attempt)
+                if attempt < self.max_retries and delay <= BACKOFF_MAX:
+                    # Devolve a conexão ao pool antes de esperar (a resposta pode estar em streaming)
+                    response.close()
+                    time.sleep(delay + random.uniform(0, BACKOFF_BASE))
+                    attempt += 1
+                    continue
+                raise self._error_for(response, attempt, retry_after)
+
+            raise self._error_for(response, attempt)
+
+    def _error_for(self, response, retries, retry_after=None):
+        status = response.status_code
+        try:
+            body = response.text[:500]
+        finally:
+            # A resposta pode estar em streaming: devolve a conexão ao pool
+            response.close()
+
+        if status == 429:
+            return SparqlThrottledError(
+                "O Wikidata limitou a taxa de requisições", status, retries, retry_after
+            )
+        if "TimeoutException" in body or status == 504:
+            return SparqlTimeoutError("A consulta excedeu o tempo limite do Wikidata", status, retries)
+        if status == 400:
+            return SparqlQueryError(f"Consulta SPARQL inválida: {body}", status, retries)
+        if status == 503 and retry_after is not None:
+            return SparqlThrottledError(
+                "O Wikidata está sobrecarregado e pediu para aguardar", status, retries, retry_after
+            )
+        if status >= 500:
+            return SparqlUnavailableError(f"Serviço do Wikidata indisponível (HTTP {status})", status, retries)
+        return SparqlError(f"Falha na consulta ao Wikidata (HTTP {status})", status, retries)
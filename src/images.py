@@ -0,0 +1,214 @@
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from hashlib import sha1
+from pathlib import Path
+from urllib.parse import unquote, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+
+# Miniaturas dos pôsteres exibidos nos cards.
+# Em vez de baixar a imagem original do Commons (muitas vezes vários MB), pede-se
+# uma miniatura via Special:FilePath?width=..., que é guardada em um cache em disco
+# com limite de tamanho (LRU pela data do último acesso). Imagens de outras origens são
+# reduzidas localmente quando o Pillow está disponível.
+#
+# A extensão do arquivo no cache vem do formato da imagem recebida (identificado
+# pelo Pillow ou, sem ele, pelo Content-Type), e não do nome do arquivo no Commons:
+# a miniatura de um logotipo "Foo.svg" é um PNG, e o Streamlit lê arquivos .svg
+# como texto.
+
+ROOT_DIR = Path(__file__).parent.parent
+DEFAULT_IMAGE = str(ROOT_DIR / "static" / "images" / "default-image.png")
+
+THUMB_WIDTH = int(os.environ.get("IMAGE_THUMB_WIDTH", 150))
+IMAGE_CACHE_DIR = Path(os.environ.get("IMAGE_CACHE_DIR", ROOT_DIR / "data" / "images"))
+IMAGE_CACHE_MAX_BYTES = int(os.environ.get("IMAGE_CACHE_MAX_BYTES", 200 * 1024 * 1024))
+IMAGE_WORKERS = int(os.environ.get("IMAGE_WORKERS", 8))
+IMAGE_TIMEOUT = float(os.environ.get("IMAGE_TIMEOUT", 5))
+
+USER_AGENT = "RodrigoNogueira/1.0"
+
+# Incluída na chave do cache: arquivos de versões anteriores (com a extensão do nome
+# no Commons) deixam de ser encontrados e saem pelo LRU
+CACHE_VERSION = 2
+
+CONTENT_TYPE_SUFFIXES = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/gif": ".gif",
+    "image/webp": ".webp",
+    "image/svg+xml": ".svg",
+}
+IMAGE_FORMAT_SUFFIXES = {"JPEG": ".jpg", "PNG": ".png", "GIF": ".gif", "WEBP": ".webp"}
+CACHE_SUFFIXES = tuple(dict.fromkeys(CONTENT_TYPE_SUFFIXES.values()))
+
+
+def thumbnail_url(url, width=THUMB_WIDTH):
+    if "Special:FilePath/" in url:
+        base = url.split("?", 1)[0]
+        if base.startswith("http://commons.wikimedia.org/"):
+            base = base.replace("http://", "https://", 1)
+        return f"{base}?width={width}"
+    return url
+
+
+def file_name(url):
+    return unquote(urlsplit(url).path.rsplit("/", 1)[-1])
+
+
+class ThumbnailCache:
+    def __init__(self, directory=IMAGE_CACHE_DIR, max_bytes=IMAGE_CACHE_MAX_BYTES,
+                 width=THUMB_WIDTH, workers=IMAGE_WORKERS, timeout=IMAGE_TIMEOUT):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.width = width
+        self.timeout = timeout
+
+        self._lock = threading.Lock()
+        self._bytes = None
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="thumbnails")
+        self._in_flight = {}
+        self.stats = {"hits": 0, "downloads": 0, "falhas": 0, "evictions": 0}
+
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = USER_AGENT
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def path_for(self, url, suffix):
+        digest = sha1(f"{file_name(url)}@{self.width}@{CACHE_VERSION}".encode("utf-8")).hexdigest()
+        return self.directory / digest[:2] / f"{digest}{suffix}"
+
+    def get(self, url):
+        for suffix in CACHE_SUFFIXES:
+            path = self.path_for(url, suffix)
+            if path.exists():
+                self.stats["hits"] += 1
+                try:
+                    os.utime(path)
+                except OSError:
+                    pass
+                return str(path)
+        return None
+
+    # Busca as miniaturas em paralelo e devolve {url: caminho local}. URLs que não
+    # ficarem prontas dentro do timeout recebem a imagem padrão.
+
+    def fetch_many(self, urls, timeout=None):
+        paths = {}
+        futures = {}
+        for url in dict.fromkeys(u for u in urls if u):
+            cached = self.get(url)
+            if cached:
+                paths[url] = cached
+            else:
+                futures[url] = self._submit(url)
+
+        if futures:
+            wait(futures.values(), timeout=timeout if timeout is not None else self.timeout)
+        for url, future in futures.items():
+            if future.done() and future.exception() is None and future.result():
+                paths[url] = future.result()
+            else:
+                paths[url] = DEFAULT_IMAGE
+        return paths
+
+    def _submit(self, url):
+        with self._lock:
+            future = self._in_flight.get(url)
+            if future is None:
+                future = self._executor.submit(self._download, url)
+                self._in_flight[url] = future
+                future.add_done_callback(lambda _: self._forget(url))
+            return future
+
+    def _forget(self, url):
+        with self._lock:
+            self._in_flight.pop(url, None)
+
+    def _download(self, url):
+        try:
+            response = self.session.get(thumbnail_url(url, self.width), timeout=self.timeout)
+            response.raise_for_status()
+            content_type = response.headers.get("Content-Type", "").split(";", 1)[0].strip().lower()
+            data, suffix = self._shrink(response.content, content_type)
+        except (requests.exceptions.RequestException, OSError, ValueError) as e:
+            self.stats["falhas"] += 1
+            print(f"Falha ao baixar miniatura {url}: {e}")
+            return None
+
+        path = self.path_for(url, suffix)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+
+        self.stats["downloads"] += 1
+        self._account(len(data))
+        return str(path)
+
+    # Devolve os bytes (reduzidos, se for o caso) e a extensão do arquivo no cache.
+    # SVGs não passam pelo Pillow; o que nem o Pillow nem o Content-Type identificam
+    # como imagem é tratado como falha e o card usa a imagem padrão.
+
+    def _shrink(self, data, content_type):
+        suffix = CONTENT_TYPE_SUFFIXES.get(content_type)
+        if Image is None or suffix == ".svg":
+            if suffix is None:
+                raise ValueError(f"tipo de imagem desconhecido ({content_type or 'sem Content-Type'})")
+            return data, suffix
+
+        with Image.open(io.BytesIO(data)) as image:
+            fmt = image.format or "PNG"
+            suffix = IMAGE_FORMAT_SUFFIXES.get(fmt, suffix)
+            if suffix is None:
+                raise ValueError(f"formato de imagem não suportado ({fmt})")
+            if image.width <= self.width * 1.5:
+                return data, suffix
+            height = max(1, round(image.height * self.width / image.width))
+            thumb = image.convert("RGBA" if fmt == "PNG" else "RGB").resize((self.width, height))
+            output = io.BytesIO()
+            thumb.save(output, format=fmt)
+            return output.getvalue(), suffix
+
+    # Controle do tamanho do cache: o total é calculado uma vez e depois mantido
+    # incrementalmente; ao passar do limite, os arquivos acessados há mais tempo
+    # (get() atualiza a data de modificação) são removidos até sobrar 90% do limite.
+
+    def _account(self, size):
+        with self._lock:
+            if self._bytes is None:
+                self._bytes = sum(p.stat().st_size for p in self.directory.rglob("*") if p.is_file())
+            else:
+                self._bytes += size
+            if self._bytes <= self.max_bytes:
+                return
+
+            files = sorted(
+                (p for p in self.directory.rglob("*") if p.is_file()),
+                key=lambda p: p.stat().st_mtime
+            )
+            target = self.max_bytes * 0.9
+            for p in files:
+                if self._bytes <= target:
+                    break
+                try:
+                    size = p.stat().st_size
+                    p.unlink()
+                except OSError:
+                    continue
+                self._bytes -= size
+                self.stats["evictions"] += 1
+
+
+thumbnails = ThumbnailCache()
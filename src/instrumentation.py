@@ -0,0 +1,234 @@
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# Instrumentação das consultas SPARQL e da renderização das páginas.
+# Cada consulta registra template, tempo total, bytes recebidos, linhas, origem do
+# resultado (cache, rede ou consulta agrupada) e retentativas; cada card de filme e
+# cada execução da página registram o tempo de renderização, e cada requisição ao
+# Wikidata, o tempo de espera na fila do limitador. As amostras ficam em
+# janelas de tamanho fixo por série, usadas para calcular percentis.
+#
+# A coleta pode ser ligada e desligada em tempo de execução (painel "Estatísticas").
+# As medições podem ser exportadas em texto no formato do Prometheus ou em JSON, para
+# um arquivo (INSTRUMENTATION_EXPORT_PATH, .json ou .prom) ou por um endpoint HTTP
+# local (INSTRUMENTATION_PORT, em /metrics e /metrics.json).
+
+ENABLED = os.environ.get("INSTRUMENTATION_ENABLED", "1") != "0"
+SAMPLE_WINDOW = int(os.environ.get("INSTRUMENTATION_SAMPLES", 1000))
+EXPORT_PATH = os.environ.get("INSTRUMENTATION_EXPORT_PATH")
+EXPORT_INTERVAL = float(os.environ.get("INSTRUMENTATION_EXPORT_INTERVAL", 15))
+EXPORT_PORT = os.environ.get("INSTRUMENTATION_PORT")
+
+PERCENTILES = (50, 90, 99)
+
+# Nome da métrica e do rótulo de cada tipo de série na exportação para o Prometheus
+PROMETHEUS_SERIES = {
+    "consulta": ("wikidata_sparql_query", "template"),
+    "fila": ("wikidata_sparql_queue", "priority"),
+    "renderizacao": ("wikidata_render", "name"),
+}
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    rank = max(0, math.ceil(p / 100 * len(sorted_values)) - 1)
+    return sorted_values[rank]
+
+
+class Series:
+    def __init__(self, window):
+        self.durations = deque(maxlen=window)
+        self.count = 0
+        self.seconds = 0.0
+        self.errors = 0
+        self.bytes = 0
+        self.rows = 0
+        self.retries = 0
+        self.sources = {}
+
+    def snapshot(self):
+        durations = sorted(self.durations)
+        return {
+            "contagem": self.count,
+            "tempo_total_s": round(self.seconds, 6),
+            "erros": self.errors,
+            "bytes": self.bytes,
+            "linhas": self.rows,
+            "retentativas": self.retries,
+            "origens": dict(self.sources),
+            **{f"p{p}_ms": _ms(percentile(durations, p)) for p in PERCENTILES},
+        }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 2)
+
+
+class Instrumentation:
+    def __init__(self, enabled=ENABLED, window=SAMPLE_WINDOW):
+        self.enabled = enabled
+        self.window = window
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def _get(self, kind, name):
+        key = (kind, name)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = Series(self.window)
+        return series
+
+    def record_query(self, template, seconds, source, rows=0, size=0, retries=0, error=None):
+        if not self.enabled:
+            return
+        with self._lock:
+            series = self._get("consulta", template)
+            series.count += 1
+            series.seconds += seconds
+            series.durations.append(seconds)
+            series.bytes += size
+            series.rows += rows
+            series.retries += retries
+            series.sources[source] = series.sources.get(source, 0) + 1
+            if error is not None:
+                series.errors += 1
+
+    def record_render(self, name, seconds):
+        if not self.enabled:
+            return
+        with self._lock:
+            series = self._get("renderizacao", name)
+            series.count += 1
+            series.seconds += seconds
+            series.durations.append(seconds)
+
+    # Espera na fila do limitador de requisições ao Wikidata, por classe de prioridade
+
+    def record_queue(self, priority, seconds, gave_up=False):
+        if not self.enabled:
+            return
+        with self._lock:
+            series = self._get("fila", priority)
+            series.count += 1
+            series.seconds += seconds
+            series.durations.append(seconds)
+            if gave_up:
+                series.errors += 1
+
+    @contextmanager
+    def timer(self, name):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_render(name, time.perf_counter() - start)
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def snapshot(self):
+        with self._lock:
+            return [
+                {"tipo": kind, "nome": name, **series.snapshot()}
+                for (kind, name), series in sorted(self._series.items())
+            ]
+
+    # Exportação
+
+    def to_json(self):
+        return json.dumps({"gerado_em": time.time(), "series": self.snapshot()}, ensure_ascii=False, indent=2)
+
+    # Formato de texto do Prometheus: as amostras de cada métrica ficam agrupadas sob
+    # uma linha # TYPE; os tempos são um summary (quantis, _sum e _count), e _sum e
+    # _count cobrem todas as medições, não só a janela usada nos quantis.
+
+    def to_prometheus(self):
+        families = {}
+
+        def add(name, kind, sample):
+            families.setdefault(name, (kind, []))[1].append(sample)
+
+        for row in self.snapshot():
+            prefix, label = PROMETHEUS_SERIES[row["tipo"]]
+            labels = f'{label}="{row["nome"]}"'
+            for p in PERCENTILES:
+                if row[f"p{p}_ms"] is not None:
+                    add(f"{prefix}_seconds", "summary", f'{prefix}_seconds{{{labels},quantile="{p / 100}"}} {row[f"p{p}_ms"] / 1000}')
+            add(f"{prefix}_seconds", "summary", f"{prefix}_seconds_sum{{{labels}}} {row['tempo_total_s']}")
+            add(f"{prefix}_seconds", "summary", f"{prefix}_seconds_count{{{labels}}} {row['contagem']}")
+            if row["tipo"] != "renderizacao":
+                add(f"{prefix}_errors_total", "counter", f"{prefix}_errors_total{{{labels}}} {row['erros']}")
+            if row["tipo"] == "consulta":
+                add(f"{prefix}_bytes_total", "counter", f"{prefix}_bytes_total{{{labels}}} {row['bytes']}")
+                add(f"{prefix}_rows_total", "counter", f"{prefix}_rows_total{{{labels}}} {row['linhas']}")
+                add(f"{prefix}_retries_total", "counter", f"{prefix}_retries_total{{{labels}}} {row['retentativas']}")
+                for source, count in sorted(row["origens"].items()):
+                    add(f"{prefix}_source_total", "counter", f'{prefix}_source_total{{{labels},source="{source}"}} {count}')
+
+        lines = []
+        for name, (kind, samples) in families.items():
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+    def export(self, path):
+        content = self.to_prometheus() if str(path).endswith(".prom") else self.to_json()
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+
+instrumentation = Instrumentation()
+
+
+def _export_loop(path, interval):
+    while True:
+        time.sleep(interval)
+        try:
+            instrumentation.export(path)
+        except OSError as e:
+            print(f"Falha ao exportar a instrumentação: {e}")
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/metrics":
+            body, content_type = instrumentation.to_prometheus(), "text/plain; version=0.0.4"
+        elif self.path == "/metrics.json":
+            body, content_type = instrumentation.to_json(), "application/json"
+        else:
+            self.send_error(404)
+            return
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+if EXPORT_PATH:
+    threading.Thread(target=_export_loop, args=(EXPORT_PATH, EXPORT_INTERVAL), daemon=True).start()
+
+if EXPORT_PORT:
+    try:
+        _server = ThreadingHTTPServer(("127.0.0.1", int(EXPORT_PORT)), _MetricsHandler)
+        threading.Thread(target=_server.serve_forever, daemon=True).start()
+    except OSError as e:
+        print(f"Não foi possível abrir o endpoint de métricas na porta {EXPORT_PORT}: {e}")
@@ -0,0 +1,163 @@
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from src.models import Person
+from src.results import ResultTable
+
+
+# Cache de rótulos QID -> nome, compartilhado por todas as sessões do processo.
+# As consultas de filmes retornam apenas QIDs; os nomes de filmes, diretores, atores
+# e gêneros vêm deste cache, por idioma. Os QIDs ainda desconhecidos são buscados em
+# lote (ver api.fetch_labels) e gravados em um SQLite, para sobreviver a reinícios.
+# Trocar o idioma da interface custa só a busca dos rótulos que faltam.
+
+LABEL_CACHE_PATH = os.environ.get(
+    "LABEL_CACHE_PATH",
+    str(Path(__file__).parent.parent / "data" / "labels.sqlite")
+)
+LABEL_CACHE_MAX_ENTRIES = int(os.environ.get("LABEL_CACHE_MAX_ENTRIES", 200000))
+DEFAULT_LANGUAGE = os.environ.get("LABEL_LANGUAGE", "en")
+
+# Parâmetros por consulta ao SQLite (o limite padrão é 999)
+DISK_BATCH_SIZE = 500
+
+LANGUAGES = {
+    "en": "English",
+    "pt": "Português",
+    "es": "Español",
+    "fr": "Français",
+    "de": "Deutsch",
+    "it": "Italiano",
+}
+
+
+class LabelCache:
+    def __init__(self, path=LABEL_CACHE_PATH, max_entries=LABEL_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.stats = {"hits": 0, "hits_disco": 0, "buscados": 0}
+
+        self._disk = None
+        if path:
+            try:
+                self._open_disk(path)
+            except sqlite3.Error as e:
+                print(f"Não foi possível abrir o cache de rótulos: {e}")
+
+    def _open_disk(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._disk = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._disk.execute("PRAGMA journal_mode=WAL")
+        self._disk.execute(
+            "CREATE TABLE IF NOT EXISTS labels ("
+            "language TEXT NOT NULL, qid TEXT NOT NULL, label TEXT NOT NULL, "
+            "PRIMARY KEY (language, qid))"
+        )
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    # Devolve {qid: rótulo} com os rótulos conhecidos; os ausentes ficam de fora.
+
+    def get_many(self, qids, language):
+        labels = {}
+        pending = []
+        with self._lock:
+            for qid in dict.fromkeys(qids):
+                key = (language, qid)
+                label = self._entries.get(key)
+                if label is not None:
+                    self._entries.move_to_end(key)
+                    labels[qid] = label
+                else:
+                    pending.append(qid)
+            self.stats["hits"] += len(labels)
+
+            if pending and self._disk is not None:
+                for start in range(0, len(pending), DISK_BATCH_SIZE):
+                    chunk = pending[start:start + DISK_BATCH_SIZE]
+                    rows = self._disk.execute(
+                        f"SELECT qid, label FROM labels WHERE language = ? AND qid IN ({','.join('?' * len(chunk))})",
+                        (language, *chunk)
+                    ).fetchall()
+                    for qid, label in rows:
+                        labels[qid] = label
+                        self._store((language, qid), label)
+                    self.stats["hits_disco"] += len(rows)
+        return labels
+
+    def put_many(self, labels, language):
+        if not labels:
+            return
+        with self._lock:
+            for qid, label in labels.items():
+                self._store((language, qid), label)
+            self.stats["buscados"] += len(labels)
+            if self._disk is not None:
+                self._disk.executemany(
+                    "INSERT OR REPLACE INTO labels (language, qid, label) VALUES (?, ?, ?)",
+                    [(language, qid, label) for qid, label in labels.items()]
+                )
+
+    def summary(self):
+        with self._lock:
+            return {"rotulos": len(self._entries), **self.stats}
+
+    def _store(self, key, label):
+        self._entries[key] = label
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+label_cache = LabelCache()
+
+
+# Conversão entre o resultado só com QIDs das consultas de filmes e as colunas com
+# nomes usadas pelo resto do aplicativo: filmName e directorName, e o elenco e os
+# gêneros já como tuplas (actorList, de Person, e genreList, de nomes), montadas
+# direto dos QIDs para que Film.from_row não precise separar strings concatenadas
+# (nomes com " | " ou ", " quebrariam a separação).
+
+def entity_id(value):
+    return value.rsplit("/", 1)[-1] if value else value
+
+
+def table_qids(table):
+    qids = []
+    for name in ("film", "director"):
+        qids.extend(entity_id(value) for value in table.column(name) if value)
+    for name in ("actors", "genreIds"):
+        for value in table.column(name):
+            if value:
+                qids.extend(value.split())
+    return list(dict.fromkeys(qids))
+
+
+def labeled_table(table, labels):
+    films = table.column("film")
+    directors = table.column("director")
+
+    columns = {name: table.columns[name] for name in table.vars if name not in ("actors", "genreIds")}
+    columns["filmName"] = [labels.get(entity_id(film), entity_id(film)) if film else None for film in films]
+    columns["directorName"] = [
+        labels.get(entity_id(director), entity_id(director)) if director else None for director in directors
+    ]
+    columns["actorList"] = [
+        tuple(Person(qid, labels.get(qid, qid)) for qid in dict.fromkeys(actors.split())) if actors else ()
+        for actors in table.column("actors")
+    ]
+    columns["genreList"] = [
+        tuple(dict.fromkeys(labels.get(qid, qid) for qid in genre_ids.split())) if genre_ids else ()
+        for genre_ids in table.column("genreIds")
+    ]
+    columns["genreIds"] = table.column("genreIds")
+
+    return ResultTable(list(columns), columns, table.stale)
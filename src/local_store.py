@@ -0,0 +1,414 @@
+import argparse
+import bz2
+import gzip
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+from urllib.parse import quote
+
+current_dir = Path(__file__).parent
+parent_dir = current_dir.parent
+sys.path.append(str(parent_dir))
+
+from src.http_client import SparqlQueryError
+from src.results import ResultTable, parse_tsv_term
+
+
+# Backend local das consultas, sem rede.
+#
+# Um subconjunto de filmes de um dump da Wikidata (JSON ou N-Triples) é importado
+# para um SQLite indexado (ver o final do arquivo). O LocalBackend responde às mesmas
+# consultas geradas por queries.py (filmes por título, ator, diretor e QID, detalhes,
+# títulos em lote, listas do modo em duas fases e rótulos) a partir do template e dos
+# parâmetros de cada SparqlQuery, devolvendo um ResultTable com as mesmas colunas e
+# valores que o Wikidata devolveria. Com SPARQL_BACKEND=local, o aplicativo roda com
+# latência de milissegundos, sem limites de requisição e sem acesso à rede.
+
+LOCAL_STORE_PATH = os.environ.get(
+    "LOCAL_STORE_PATH",
+    str(parent_dir / "data" / "local_store.sqlite")
+)
+
+ENTITY_PREFIX = "http://www.wikidata.org/entity/"
+PROP_PREFIX = "http://www.wikidata.org/prop/direct/"
+FILE_PATH_PREFIX = "http://commons.wikimedia.org/wiki/Special:FilePath/"
+LABEL_PREDICATES = ("http://www.w3.org/2000/01/rdf-schema#label",)
+
+FILM_CLASS = "Q11424"
+# Propriedades importadas: instância de, diretor, elenco, data de publicação,
+# imagem, logotipo e gênero
+PROPERTIES = ("P31", "P57", "P161", "P577", "P18", "P154", "P136")
+ENTITY_PROPERTIES = ("P31", "P57", "P161", "P136")
+IMPORT_BATCH_SIZE = 50000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS films (qid TEXT PRIMARY KEY, year INTEGER, image TEXT);
+CREATE TABLE IF NOT EXISTS film_directors (film TEXT NOT NULL, director TEXT NOT NULL, PRIMARY KEY (film, director));
+CREATE TABLE IF NOT EXISTS film_actors (film TEXT NOT NULL, actor TEXT NOT NULL, PRIMARY KEY (film, actor));
+CREATE TABLE IF NOT EXISTS film_genres (film TEXT NOT NULL, genre TEXT NOT NULL, PRIMARY KEY (film, genre));
+CREATE TABLE IF NOT EXISTS labels (qid TEXT NOT NULL, language TEXT NOT NULL, label TEXT NOT NULL, PRIMARY KEY (qid, language));
+CREATE INDEX IF NOT EXISTS film_directors_director ON film_directors (director);
+CREATE INDEX IF NOT EXISTS film_actors_actor ON film_actors (actor);
+CREATE INDEX IF NOT EXISTS labels_label ON labels (language, label);
+CREATE INDEX IF NOT EXISTS films_order ON films (year DESC, qid);
+"""
+
+# Filmes como a consulta enxuta os retorna: uma linha por filme e diretor, apenas
+# filmes com diretor, data e elenco, ordenados por ano e QID.
+FILMS_SQL = """
+SELECT {title_column}f.qid, d.director, f.year, f.image,
+       (SELECT group_concat(actor, ' ') FROM film_actors WHERE film = f.qid) AS actors,
+       (SELECT group_concat(genre, ' ') FROM film_genres WHERE film = f.qid) AS genres
+FROM films f
+JOIN film_directors d ON d.film = f.qid
+{title_join}
+WHERE f.year IS NOT NULL
+  AND EXISTS (SELECT 1 FROM film_actors WHERE film = f.qid)
+  AND {selection}
+ORDER BY f.year DESC, f.qid
+LIMIT ? OFFSET ?
+"""
+
+FILM_SELECTIONS = {
+    "title": "f.qid IN (SELECT qid FROM labels WHERE language = 'en' AND label = ?)",
+    "actor": "f.qid IN (SELECT film FROM film_actors WHERE actor = ?)",
+    "director": "f.qid IN (SELECT film FROM film_directors WHERE director = ?)",
+}
+
+LIST_SQL = """
+SELECT f.qid, f.year
+FROM films f
+WHERE f.year IS NOT NULL
+  AND EXISTS (SELECT 1 FROM film_directors WHERE film = f.qid)
+  AND EXISTS (SELECT 1 FROM film_actors WHERE film = f.qid)
+  AND {selection}
+ORDER BY f.year DESC, f.qid
+"""
+
+
+def _placeholders(values):
+    return ",".join("?" * len(values))
+
+
+class LocalStore:
+    def __init__(self, path=LOCAL_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.executescript(SCHEMA)
+
+    def summary(self):
+        with self._lock:
+            counts = {
+                table: self._db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in ("films", "film_directors", "film_actors", "labels")
+            }
+        return {
+            "filmes": counts["films"],
+            "diretores": counts["film_directors"],
+            "atores": counts["film_actors"],
+            "rotulos": counts["labels"],
+        }
+
+    def _fetch(self, sql, params):
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def films(self, selection, params, limit=None, offset=None, with_title=False):
+        sql = FILMS_SQL.format(
+            title_column="t.label, " if with_title else "",
+            title_join="JOIN labels t ON t.qid = f.qid AND t.language = 'en'" if with_title else "",
+            selection=selection
+        )
+        rows = self._fetch(sql, (*params, int(limit) if limit else -1, int(offset or 0)))
+
+        names = ["film", "director", "actors", "year", "displayImage", "genreIds"]
+        if with_title:
+            names.insert(0, "title")
+        columns = {name: [] for name in names}
+        for row in rows:
+            if with_title:
+                columns["title"].append(row[0])
+                row = row[1:]
+            qid, director, year, image, actors, genres = row
+            columns["film"].append(ENTITY_PREFIX + qid)
+            columns["director"].append(ENTITY_PREFIX + director)
+            columns["actors"].append(actors)
+            columns["year"].append(str(year))
+            columns["displayImage"].append(image)
+            columns["genreIds"].append(genres or None)
+        return ResultTable(names, columns)
+
+    def film_list(self, selection, params):
+        rows = self._fetch(LIST_SQL.format(selection=selection), params)
+        return ResultTable(["film", "year"], {
+            "film": [ENTITY_PREFIX + qid for qid, _ in rows],
+            "year": [str(year) for _, year in rows],
+        })
+
+    # Como o serviço wikibase:label: rótulo no idioma pedido, depois "mul" e "en";
+    # sem rótulo, o próprio QID.
+
+    def labels(self, qids, language):
+        fallbacks = list(dict.fromkeys((language, "mul", "en")))
+        found = {}
+        for start in range(0, len(qids), 500):
+            chunk = qids[start:start + 500]
+            rows = self._fetch(
+                f"SELECT qid, language, label FROM labels WHERE qid IN ({_placeholders(chunk)}) "
+                f"AND language IN ({_placeholders(fallbacks)})",
+                (*chunk, *fallbacks)
+            )
+            for qid, lang, label in rows:
+                found.setdefault(qid, {})[lang] = label
+
+        items, values = [], []
+        for qid in qids:
+            by_language = found.get(qid, {})
+            items.append(ENTITY_PREFIX + qid)
+            values.append(next((by_language[lang] for lang in fallbacks if lang in by_language), qid))
+        return ResultTable(["item", "label"], {"item": items, "label": values})
+
+    # Recebe (fatos, rótulos) de cada entidade lida do dump. Tudo passa por tabelas
+    # temporárias, gravadas em lotes, e os filmes são montados no final com SQL.
+
+    def import_entities(self, entities):
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                imported = self._import(entities)
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+        return imported
+
+    def _import(self, entities):
+        db = self._db
+        db.execute("CREATE TEMP TABLE IF NOT EXISTS staging_facts (subject TEXT, property TEXT, value TEXT)")
+        db.execute("CREATE TEMP TABLE IF NOT EXISTS staging_labels (qid TEXT, language TEXT, label TEXT)")
+        db.execute("DELETE FROM staging_facts")
+        db.execute("DELETE FROM staging_labels")
+
+        facts, labels = [], []
+        for entity_facts, entity_labels in entities:
+            facts.extend(entity_facts)
+            labels.extend(entity_labels)
+            if len(facts) + len(labels) >= IMPORT_BATCH_SIZE:
+                db.executemany("INSERT INTO staging_facts VALUES (?, ?, ?)", facts)
+                db.executemany("INSERT INTO staging_labels VALUES (?, ?, ?)", labels)
+                facts, labels = [], []
+        db.executemany("INSERT INTO staging_facts VALUES (?, ?, ?)", facts)
+        db.executemany("INSERT INTO staging_labels VALUES (?, ?, ?)", labels)
+        db.execute("CREATE INDEX IF NOT EXISTS temp.staging_facts_property ON staging_facts (property, subject)")
+
+        db.execute("DROP TABLE IF EXISTS temp.new_films")
+        db.execute(f"""
+            CREATE TEMP TABLE new_films AS
+            SELECT DISTINCT subject AS qid FROM staging_facts WHERE property = 'P31' AND value = '{FILM_CLASS}'
+        """)
+        db.execute("""
+            INSERT OR REPLACE INTO films (qid, year, image)
+            SELECT n.qid,
+                   (SELECT MIN(CAST(value AS INTEGER)) FROM staging_facts WHERE subject = n.qid AND property = 'P577'),
+                   COALESCE(
+                       (SELECT MIN(value) FROM staging_facts WHERE subject = n.qid AND property = 'P154'),
+                       (SELECT MIN(value) FROM staging_facts WHERE subject = n.qid AND property = 'P18')
+                   )
+            FROM new_films n
+        """)
+        for table, column, prop in (
+            ("film_directors", "director", "P57"),
+            ("film_actors", "actor", "P161"),
+            ("film_genres", "genre", "P136"),
+        ):
+            db.execute(f"DELETE FROM {table} WHERE film IN (SELECT qid FROM new_films)")
+            db.execute(f"""
+                INSERT OR IGNORE INTO {table} (film, {column})
+                SELECT subject, value FROM staging_facts
+                WHERE property = '{prop}' AND subject IN (SELECT qid FROM new_films)
+            """)
+
+        # Só os rótulos de filmes e das entidades citadas por eles são mantidos
+        db.execute("""
+            INSERT OR REPLACE INTO labels (qid, language, label)
+            SELECT qid, language, label FROM staging_labels
+            WHERE qid IN (SELECT qid FROM films)
+               OR qid IN (SELECT director FROM film_directors)
+               OR qid IN (SELECT actor FROM film_actors)
+               OR qid IN (SELECT genre FROM film_genres)
+        """)
+        imported = db.execute("SELECT COUNT(*) FROM new_films").fetchone()[0]
+        db.execute("DROP TABLE new_films")
+        db.execute("DELETE FROM staging_facts")
+        db.execute("DELETE FROM staging_labels")
+        return imported
+
+
+# Backend usado por api.execute_sparql_query quando SPARQL_BACKEND=local.
+# Sem rede, as consultas não passam pelo limitador (o ticket é ignorado).
+
+class LocalBackend:
+    name = "local"
+
+    def __init__(self, store=None):
+        self.store = store or LocalStore()
+
+    def execute(self, query, fetched, ticket=None):
+        template = getattr(query, "template", None)
+        params = getattr(query, "params", {})
+        store = self.store
+        fetched["retries"] = 0
+
+        if template and template.startswith("filmes_por_") and template[11:] in FILM_SELECTIONS:
+            return store.films(FILM_SELECTIONS[template[11:]], (params["value"],), params.get("limit"), params.get("offset"))
+        if template == "filmes_por_qid":
+            qids = [params["value"]] if isinstance(params["value"], str) else list(params["value"])
+            return store.films(f"f.qid IN ({_placeholders(qids)})", qids, params.get("limit"), params.get("offset"))
+        if template == "detalhes_filmes":
+            qids = list(params["films"])
+            return store.films(f"f.qid IN ({_placeholders(qids)})", qids)
+        if template == "filmes_por_titulos":
+            titles = list(params["titles"])
+            return store.films(f"t.label IN ({_placeholders(titles)})", titles, with_title=True)
+        if template and template.startswith("lista_por_") and template[10:] in FILM_SELECTIONS:
+            return store.film_list(FILM_SELECTIONS[template[10:]], (params["value"],))
+        if template == "rotulos":
+            return store.labels(list(params["items"]), params["language"])
+
+        raise SparqlQueryError(f"O backend local não responde a consultas do template '{template or 'desconhecido'}'")
+
+
+# Leitura dos dumps. Cada entidade vira fatos (sujeito, propriedade, valor), com QIDs
+# para itens, o ano para datas e a URL do Commons para imagens, e rótulos
+# (QID, idioma, texto). Como em wdt:, só entram as declarações de melhor classificação.
+
+def open_dump(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rt", encoding="utf-8")
+    return open(path, encoding="utf-8")
+
+
+def file_url(name):
+    return FILE_PATH_PREFIX + quote(name.replace("_", " "))
+
+
+def _best_statements(statements):
+    preferred = [s for s in statements if s.get("rank") == "preferred"]
+    return preferred or [s for s in statements if s.get("rank", "normal") == "normal"]
+
+
+def _claim_value(prop, value):
+    if prop in ENTITY_PROPERTIES:
+        return value.get("id") if isinstance(value, dict) else None
+    if prop == "P577":
+        match = re.match(r"([+-]?\d+)-", value.get("time", "")) if isinstance(value, dict) else None
+        return str(int(match.group(1))) if match else None
+    return file_url(value) if isinstance(value, str) else None
+
+
+def read_json_dump(lines, languages):
+    for line in lines:
+        line = line.strip().rstrip(",")
+        if not line or line in ("[", "]"):
+            continue
+        entity = json.loads(line)
+        qid = entity.get("id")
+        if not qid:
+            continue
+
+        facts = []
+        claims = entity.get("claims", {})
+        for prop in PROPERTIES:
+            for statement in _best_statements(claims.get(prop, [])):
+                snak = statement.get("mainsnak", {})
+                if snak.get("snaktype") != "value":
+                    continue
+                value = _claim_value(prop, snak.get("datavalue", {}).get("value"))
+                if value is not None:
+                    facts.append((qid, prop, value))
+
+        labels = [
+            (qid, language, label["value"])
+            for language, label in entity.get("labels", {}).items()
+            if language in languages
+        ]
+        yield facts, labels
+
+
+_TRIPLE_RE = re.compile(r"^<([^>]*)>\s+<([^>]*)>\s+(.*?)\s*\.\s*$")
+
+
+def read_ntriples(lines, languages):
+    for line in lines:
+        match = _TRIPLE_RE.match(line)
+        if not match:
+            continue
+        subject, predicate, term = match.groups()
+        if not subject.startswith(ENTITY_PREFIX):
+            continue
+        qid = subject[len(ENTITY_PREFIX):]
+
+        if predicate in LABEL_PREDICATES:
+            language = term[term.rindex('"') + 2:] if term.startswith('"') and '"@' in term else ""
+            if language in languages:
+                yield [], [(qid, language, parse_tsv_term(term))]
+            continue
+
+        if not predicate.startswith(PROP_PREFIX):
+            continue
+        prop = predicate[len(PROP_PREFIX):]
+        if prop not in PROPERTIES:
+            continue
+
+        value = parse_tsv_term(term)
+        if prop in ENTITY_PROPERTIES:
+            value = value[len(ENTITY_PREFIX):] if value.startswith(ENTITY_PREFIX) else None
+        elif prop == "P577":
+            match = re.match(r"([+-]?\d+)-", value)
+            value = str(int(match.group(1))) if match else None
+        elif not value.startswith(FILE_PATH_PREFIX):
+            value = None
+        if value is not None:
+            yield [(qid, prop, value)], []
+
+
+def import_dump(store, path, languages, dump_format=None):
+    if dump_format is None:
+        dump_format = "nt" if ".nt" in Path(path).name else "json"
+    reader = read_ntriples if dump_format == "nt" else read_json_dump
+    languages = set(languages) | {"en", "mul"}
+
+    with open_dump(path) as f:
+        return store.import_entities(reader(f, languages))
+
+
+# Importação de um dump (de preferência já filtrado para filmes e pessoas):
+#     python src/local_store.py filmes.json.gz [--languages en,pt] [--output data/local_store.sqlite]
+#     python src/local_store.py filmes.nt.bz2
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Importa filmes de um dump da Wikidata para o backend local.")
+    parser.add_argument("dumps", nargs="+", help="arquivos JSON (uma entidade por linha) ou N-Triples, opcionalmente .gz/.bz2")
+    parser.add_argument("--format", choices=("json", "nt"), help="formato do dump (padrão: pela extensão)")
+    parser.add_argument("--languages", default="en,pt", help="idiomas dos rótulos importados, separados por vírgula")
+    parser.add_argument("--output", default=LOCAL_STORE_PATH, help="arquivo SQLite de saída")
+    args = parser.parse_args()
+
+    store = LocalStore(args.output)
+    languages = [language.strip() for language in args.languages.split(",") if language.strip()]
+    for dump in args.dumps:
+        start = time.time()
+        imported = import_dump(store, dump, languages, args.format)
+        print(f"{dump}: {imported} filmes importados em {time.time() - start:.1f} s", file=sys.stderr)
+    print(f"Base local: {store.summary()}", file=sys.stderr)
@@ -0,0 +1,128 @@
+# Modelo compacto dos filmes retornados pela Wikidata.
+# Cada linha do resultado SPARQL é convertida uma única vez, com atores e gêneros já separados
+# em tuplas, para que a renderização e as estatísticas não precisem reprocessar
+# as strings concatenadas a cada execução do script do Streamlit.
+
+def extract_entity_id(url):
+    if not url:
+        return ""
+    return url.rsplit("/", 1)[-1]
+
+
+def parse_actor_tuples(text):
+    actors = []
+    if not text:
+        return tuple(actors)
+
+    seen = set()
+    for actor_tuple in text.split(" | "):
+        inner = actor_tuple.strip()
+        if not (inner.startswith("(") and inner.endswith(")")):
+            continue
+        name, sep, qid = inner[1:-1].rpartition(", ")
+        if not sep or not qid.startswith("Q") or qid in seen:
+            continue
+        seen.add(qid)
+        actors.append(Person(qid, name))
+    return tuple(actors)
+
+
+def parse_genres(text):
+    if not text:
+        return ()
+    return tuple(dict.fromkeys(g for g in text.split(", ") if g))
+
+
+class Person:
+    __slots__ = ("qid", "name")
+
+    def __init__(self, qid, name):
+        self.qid = qid
+        self.name = name
+
+    def __repr__(self):
+        return f"Person({self.qid!r}, {self.name!r})"
+
+
+class Film:
+    __slots__ = ("qid", "name", "year", "director", "actors", "genres", "image", "genre_ids")
+
+    def __init__(self, qid, name, year=None, director=None, actors=(), genres=(), image=None, genre_ids=()):
+        self.qid = qid
+        self.name = name
+        self.year = year
+        self.director = director
+        self.actors = actors
+        self.genres = genres
+        self.image = image
+        self.genre_ids = genre_ids
+
+    # Linha de um ResultTable, com os valores já sem o envelope {"type", "value"}.
+    # As consultas de filmes chegam com o elenco e os gêneros já em tuplas (actorList
+    # e genreList, ver labels.labeled_table); as strings concatenadas (actorTuples e
+    # genres) só são separadas para resultados no formato antigo.
+
+    @classmethod
+    def from_row(cls, row):
+        year = row.get("year")
+        try:
+            year = int(year) if year else None
+        except ValueError:
+            year = None
+
+        actors = row.get("actorList")
+        if actors is None:
+            actors = parse_actor_tuples(row.get("actorTuples"))
+        genres = row.get("genreList")
+        if genres is None:
+            genres = parse_genres(row.get("genres"))
+
+        director = None
+        director_url = row.get("director")
+        if director_url:
+            director = Person(extract_entity_id(director_url), row.get("directorName") or "Desconhecido")
+
+        return cls(
+            qid=extract_entity_id(row.get("film")),
+            name=row.get("filmName") or "Desconhecido",
+            year=year,
+            director=director,
+            actors=actors,
+            genres=genres,
+            image=row.get("displayImage"),
+            genre_ids=tuple((row.get("genreIds") or "").split())
+        )
+
+    # QIDs de todas as entidades nomeadas no card (filme, diretor, atores e gêneros)
+
+    def entity_ids(self):
+        ids = [self.qid]
+        if self.director:
+            ids.append(self.director.qid)
+        ids.extend(actor.qid for actor in self.actors)
+        ids.extend(self.genre_ids)
+        return ids
+
+    # Cópia do filme com os nomes em outro idioma; QIDs sem rótulo mantêm o nome atual
+
+    def with_labels(self, labels):
+        director = self.director
+        if director:
+            director = Person(director.qid, labels.get(director.qid, director.name))
+        genres = self.genres
+        if self.genre_ids:
+            genres = tuple(dict.fromkeys(labels.get(genre_id, genre_id) for genre_id in self.genre_ids))
+
+        return Film(
+            qid=self.qid,
+            name=labels.get(self.qid, self.name),
+            year=self.year,
+            director=director,
+            actors=tuple(Person(actor.qid, labels.get(actor.qid, actor.name)) for actor in self.actors),
+            genres=genres,
+            image=self.image,
+            genre_ids=self.genre_ids
+        )
+
+    def __repr__(self):
+        return f"Film({self.qid!r}, {self.name!r}, {self.year!r})"
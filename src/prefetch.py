@@ -0,0 +1,79 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from src.api import execute_films_query, BACKGROUND
+from src.labels import DEFAULT_LANGUAGE
+
+
+# Pré-carregamento especulativo de filmografias.
+# Enquanto o usuário lê os filmes exibidos, um pool limitado de threads aquece o
+# cache com as consultas que ele provavelmente fará em seguida (diretor e primeiros
+# atores). Cada sessão tem uma "geração": ao navegar, as tarefas ainda pendentes
+# da geração anterior são canceladas. Os rótulos dos filmes pré-carregados também
+# são resolvidos, no idioma da sessão que agendou o pré-carregamento. As consultas
+# entram na fila do limitador com prioridade de segundo plano, atrás dos cliques.
+# As gerações vêm de um contador único do processo, então a entrada de uma sessão
+# pode ser descartada assim que ela não tem mais tarefas pendentes (ou é cancelada)
+# sem que uma tarefa antiga volte a valer para uma geração nova.
+
+PREFETCH_WORKERS = int(os.environ.get("PREFETCH_WORKERS", 2))
+PREFETCH_MAX_PENDING = int(os.environ.get("PREFETCH_MAX_PENDING", 64))
+
+
+class Prefetcher:
+    def __init__(self, workers=PREFETCH_WORKERS, max_pending=PREFETCH_MAX_PENDING):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch")
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._generations = {}
+        self._pending = {}
+        self.max_pending = max_pending
+        self.stats = {"agendadas": 0, "executadas": 0, "canceladas": 0, "falhas": 0}
+
+    def schedule(self, owner, queries, language=DEFAULT_LANGUAGE):
+        with self._lock:
+            self._prune_locked()
+            generation = self._cancel_locked(owner)
+            budget = self.max_pending - sum(1 for fs in self._pending.values() for f in fs if not f.done())
+            futures = []
+            for query in queries[:max(budget, 0)]:
+                futures.append(self._executor.submit(self._run, owner, generation, query, language))
+                self.stats["agendadas"] += 1
+            self._pending[owner] = futures
+
+    def cancel(self, owner):
+        with self._lock:
+            self._cancel_locked(owner)
+            self._pending.pop(owner, None)
+            self._generations.pop(owner, None)
+
+    def _cancel_locked(self, owner):
+        self._generation += 1
+        generation = self._generations[owner] = self._generation
+        for future in self._pending.get(owner, []):
+            if future.cancel():
+                self.stats["canceladas"] += 1
+        return generation
+
+    # Sessões sem tarefas pendentes (inclusive as que foram fechadas sem cancelar)
+    def _prune_locked(self):
+        for owner, futures in list(self._pending.items()):
+            if all(future.done() for future in futures):
+                del self._pending[owner]
+                self._generations.pop(owner, None)
+
+    def _run(self, owner, generation, query, language):
+        with self._lock:
+            if self._generations.get(owner) != generation:
+                self.stats["canceladas"] += 1
+                return
+        try:
+            execute_films_query(query, language, priority=BACKGROUND)
+            self.stats["executadas"] += 1
+        except Exception as e:
+            self.stats["falhas"] += 1
+            print(f"Falha no pré-carregamento: {e}")
+
+
+prefetcher = Prefetcher()
@@ -118,3 +118,171 @@ WHERE {{
 GROUP BY ?film ?filmName ?director ?directorName ?year ?image ?logo
     """
 
+
+
+
+# Consultas enxutas.
+# Retornam apenas QIDs (filme, diretor, atores e gêneros), com imagem e ano agregados
+# (SAMPLE/MIN), de modo que a resposta traga uma linha por filme e diretor. Os nomes
+# não são resolvidos na consulta: vêm do cache de rótulos compartilhado (labels.py),
+# que busca em lote apenas os QIDs ainda desconhecidos, no idioma escolhido.
+
+# Consultas geradas pelos construtores abaixo carregam o nome do template e os
+# parâmetros usados, para a instrumentação agrupar as medições por template e para
+# o backend local (local_store.py) responder sem interpretar o SPARQL.
+
+class SparqlQuery(str):
+    def __new__(cls, text, template, **params):
+        query = super().__new__(cls, text)
+        query.template = template
+        query.params = params
+        return query
+
+
+FILM_SELECTIONS = {
+    "qid": "VALUES ?film {{ {value} }}",
+    "title": '?film rdfs:label "{value}"@en.',
+    "actor": "?film wdt:P161 wd:{value}.",
+    "director": "?film wdt:P57 wd:{value}.",
+}
+
+
+def escape_literal(text):
+    return text.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n").replace("\r", "\\r")
+
+
+def _film_selection(kind, value):
+    if kind not in FILM_SELECTIONS:
+        raise ValueError(f"Tipo de consulta desconhecido: {kind}")
+    if kind == "title":
+        value = escape_literal(value)
+    elif kind == "qid":
+        qids = [value] if isinstance(value, str) else value
+        value = " ".join(f"wd:{qid}" for qid in qids)
+    return FILM_SELECTIONS[kind].format(value=value)
+
+
+def _lean_films_query(selection, limit=None, offset=None, extra_vars=""):
+    query = f"""
+    SELECT {extra_vars}?film ?director
+       (GROUP_CONCAT(DISTINCT STRAFTER(STR(?actor), "entity/"); separator=" ") AS ?actors)
+       (MIN(YEAR(?date)) AS ?year)
+       (SAMPLE(COALESCE(?logo, ?image)) AS ?displayImage)
+       (GROUP_CONCAT(DISTINCT STRAFTER(STR(?genre), "entity/"); separator=" ") AS ?genreIds)
+WHERE {{
+  {selection}
+  ?film wdt:P31 wd:Q11424.
+  ?film wdt:P57 ?director.
+  ?film wdt:P577 ?date.
+  ?film wdt:P161 ?actor.
+
+  OPTIONAL {{ ?film wdt:P18 ?image. }}
+  OPTIONAL {{ ?film wdt:P154 ?logo. }}
+  OPTIONAL {{ ?film wdt:P136 ?genre. }}
+}}
+GROUP BY {extra_vars}?film ?director
+ORDER BY DESC(?year) ?film
+"""
+    if limit:
+        query += f"LIMIT {int(limit)}\n"
+    if offset:
+        query += f"OFFSET {int(offset)}\n"
+    return query
+
+
+# Com `limit` e `offset` a consulta retorna uma página da filmografia; a ordenação
+# por ano e QID garante páginas estáveis entre requisições.
+
+def get_films_query(kind, value, limit=None, offset=None):
+
+    query = _lean_films_query(_film_selection(kind, value), limit, offset)
+    return SparqlQuery(query, f"filmes_por_{kind}", value=value, limit=limit, offset=offset)
+
+
+# Páginas da exploração de atores e diretores, como pedidas pelo aplicativo
+# (também usadas para montar o snapshot de pré-aquecimento).
+
+EXPLORATION_PAGE_SIZE = 20
+
+
+def get_exploration_query(kind, value, page=0):
+
+    return get_films_query(kind, value, EXPLORATION_PAGE_SIZE, page * EXPLORATION_PAGE_SIZE)
+
+
+# Modo em duas fases: primeiro uma lista barata de filmes (QID e ano), depois os
+# detalhes apenas dos filmes exibidos, em lotes com VALUES.
+
+def get_film_list_query(kind, value):
+
+    query = f"""
+    SELECT ?film (MIN(YEAR(?date)) AS ?year)
+WHERE {{
+  {_film_selection(kind, value)}
+  ?film wdt:P31 wd:Q11424.
+  ?film wdt:P577 ?date.
+  FILTER EXISTS {{ ?film wdt:P57 ?director. }}
+  FILTER EXISTS {{ ?film wdt:P161 ?actor. }}
+}}
+GROUP BY ?film
+ORDER BY DESC(?year) ?film
+"""
+    return SparqlQuery(query, f"lista_por_{kind}", value=value)
+
+
+def get_film_details_query(film_ids):
+
+    values = " ".join(f"wd:{film_id}" for film_id in film_ids)
+    query = _lean_films_query(f"VALUES ?film {{ {values} }}")
+    return SparqlQuery(query, "detalhes_filmes", films=list(film_ids))
+
+
+# Resolução em lote: vários títulos em uma única consulta com VALUES. A coluna
+# ?title indica qual título da lista originou cada linha.
+
+TITLES_BATCH_SIZE = 500
+TITLES_BATCH_MAX_CHARS = 40000
+
+
+def get_films_by_titles_query(titles):
+
+    values = " ".join(f'"{escape_literal(title)}"@en' for title in titles)
+    selection = f"VALUES ?title {{ {values} }}\n  ?film rdfs:label ?title."
+    query = _lean_films_query(selection, extra_vars="?title ")
+    return SparqlQuery(query, "filmes_por_titulos", titles=list(titles))
+
+
+def chunk_titles(titles, batch_size=TITLES_BATCH_SIZE, max_chars=TITLES_BATCH_MAX_CHARS):
+    chunk, size = [], 0
+    for title in titles:
+        cost = len(escape_literal(title)) + 6
+        if chunk and (len(chunk) >= batch_size or size + cost > max_chars):
+            yield chunk
+            chunk, size = [], 0
+        chunk.append(title)
+        size += cost
+    if chunk:
+        yield chunk
+
+
+# Rótulos de um lote de entidades em um idioma, com fallback para os rótulos
+# multilíngues ("mul") e em inglês. Sem rótulo algum, o serviço devolve o próprio QID.
+
+LABELS_BATCH_SIZE = 500
+
+
+def get_labels_query(qids, language):
+
+    values = " ".join(f"wd:{qid}" for qid in qids)
+    languages = ",".join(dict.fromkeys((language, "mul", "en")))
+    query = f"""
+    SELECT ?item ?label
+WHERE {{
+  VALUES ?item {{ {values} }}
+  SERVICE wikibase:label {{
+    bd:serviceParam wikibase:language "{languages}".
+    ?item rdfs:label ?label.
+  }}
+}}
+"""
+    return SparqlQuery(query, "rotulos", language=language, items=list(qids))
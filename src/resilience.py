@@ -0,0 +1,213 @@
+import os
+import threading
+import time
+
+
+# Disjuntor ("circuit breaker") das consultas ao Wikidata.
+# Depois de BREAKER_THRESHOLD falhas seguidas por timeout ou indisponibilidade, o
+# circuito abre e as consultas seguintes falham na hora (ou são atendidas pelo cache,
+# mesmo vencido) em vez de cada uma esperar o timeout inteiro. Passados
+# BREAKER_RESET_SECONDS, uma única consulta de teste é liberada ("semiaberto"):
+# se ela der certo o circuito fecha, senão volta a abrir.
+
+BREAKER_THRESHOLD = int(os.environ.get("SPARQL_BREAKER_THRESHOLD", 5))
+BREAKER_RESET_SECONDS = float(os.environ.get("SPARQL_BREAKER_RESET", 30))
+
+CLOSED = "fechado"
+OPEN = "aberto"
+HALF_OPEN = "semiaberto"
+
+
+class CircuitBreaker:
+    def __init__(self, threshold=BREAKER_THRESHOLD, reset_seconds=BREAKER_RESET_SECONDS):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self.stats = {"aberturas": 0, "rejeitadas": 0}
+
+    def allow(self):
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+                self._state = HALF_OPEN
+            if self._state == HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            self.stats["rejeitadas"] += 1
+            return False
+
+    def retry_after(self):
+        with self._lock:
+            if self._opened_at is None or self._state == CLOSED:
+                return 0.0
+            return max(0.0, self.reset_seconds - (time.monotonic() - self._opened_at))
+
+    def record_success(self):
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.threshold:
+                if self._state != OPEN:
+                    self.stats["aberturas"] += 1
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+            self._trial_running = False
+
+    # Chamada quando a consulta liberada terminou com um erro que não indica
+    # instabilidade do serviço (por exemplo, consulta inválida).
+
+    def record_neutral(self):
+        with self._lock:
+            self._trial_running = False
+
+    def snapshot(self):
+        with self._lock:
+            state = self._state
+            if state == OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+                state = HALF_OPEN
+            reopens_in = 0.0
+            if self._state == OPEN:
+                reopens_in = max(0.0, self.reset_seconds - (time.monotonic() - self._opened_at))
+            return {
+                "estado": state,
+                "falhas_seguidas": self._failures,
+                "reabre_em": reopens_in,
+                **self.stats,
+            }
+
+
+# Limitador global das requisições ao Wikidata.
+# O endpoint público limita a taxa por cliente, e todas as sessões do processo saem
+# com o mesmo User-Agent: sem coordenação, uma rajada de várias sessões gera 429 para
+# todas. Cada requisição precisa de uma ficha (balde com RATE_LIMIT fichas por
+# segundo, acumulando até RATE_BURST) e de uma das MAX_CONCURRENT vagas de execução.
+# Enquanto não as obtém, espera numa fila por prioridade: buscas e cliques
+# ("interativa") passam à frente da resolução de títulos em lote ("lote"), que passa
+# à frente do pré-carregamento, das revalidações, da coleta e da atualização do
+# snapshot ("segundo_plano"); dentro da mesma classe, vale a ordem de chegada.
+# Depois de QUEUE_TIMEOUT segundos na fila, a requisição desiste.
+
+RATE_LIMIT = float(os.environ.get("SPARQL_RATE_LIMIT", 5))
+RATE_BURST = float(os.environ.get("SPARQL_RATE_BURST", 10))
+MAX_CONCURRENT = int(os.environ.get("SPARQL_MAX_CONCURRENT", 5))
+QUEUE_TIMEOUT = float(os.environ.get("SPARQL_QUEUE_TIMEOUT", 30))
+
+INTERACTIVE = "interativa"
+BATCH = "lote"
+BACKGROUND = "segundo_plano"
+PRIORITIES = (INTERACTIVE, BATCH, BACKGROUND)
+
+
+# Lugar de uma requisição na fila. A prioridade pode subir enquanto ela espera:
+# quando uma busca interativa aguarda uma consulta idêntica já em andamento no
+# segundo plano (ver api.SingleFlight), a requisição é promovida.
+
+class Ticket:
+    __slots__ = ("limiter", "priority", "seq")
+
+    def __init__(self, limiter, priority, seq):
+        self.limiter = limiter
+        self.priority = priority
+        self.seq = seq
+
+    def promote(self, priority):
+        self.limiter.promote(self, priority)
+
+
+class RateLimiter:
+    def __init__(self, rate=RATE_LIMIT, burst=RATE_BURST, max_concurrent=MAX_CONCURRENT, queue_timeout=QUEUE_TIMEOUT):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.max_concurrent = max_concurrent
+        self.queue_timeout = queue_timeout
+        self._cond = threading.Condition()
+        self._tokens = self.burst
+        self._refilled = time.monotonic()
+        self._active = 0
+        self._waiting = []
+        self._seq = 0
+        self.stats = {"liberadas": 0, "imediatas": 0, "promovidas": 0, "desistencias": 0}
+
+    def ticket(self, priority=INTERACTIVE):
+        with self._cond:
+            self._seq += 1
+            return Ticket(self, priority, self._seq)
+
+    def promote(self, ticket, priority):
+        with self._cond:
+            if PRIORITIES.index(priority) < PRIORITIES.index(ticket.priority):
+                ticket.priority = priority
+                self.stats["promovidas"] += 1
+                self._cond.notify_all()
+
+    # Devolve quantos segundos a requisição esperou na fila, ou None se desistiu
+
+    def acquire(self, ticket):
+        start = time.monotonic()
+        queued = False
+        with self._cond:
+            self._waiting.append(ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    wait = None
+                    if self._head() is ticket and (not self.max_concurrent or self._active < self.max_concurrent):
+                        if not self.rate or self._tokens >= 1:
+                            if self.rate:
+                                self._tokens -= 1
+                            self._active += 1
+                            self.stats["liberadas"] += 1
+                            if not queued:
+                                self.stats["imediatas"] += 1
+                            return now - start
+                        wait = (1 - self._tokens) / self.rate
+
+                    remaining = start + self.queue_timeout - now
+                    if remaining <= 0:
+                        self.stats["desistencias"] += 1
+                        return None
+                    queued = True
+                    self._cond.wait(remaining if wait is None else min(wait, remaining))
+            finally:
+                self._waiting.remove(ticket)
+                self._cond.notify_all()
+
+    def release(self):
+        with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+    def snapshot(self):
+        with self._cond:
+            self._refill(time.monotonic())
+            return {
+                "taxa": self.rate,
+                "rajada": self.burst,
+                "max_simultaneas": self.max_concurrent,
+                "ativas": self._active,
+                "fichas": self._tokens,
+                "fila": {priority: sum(1 for t in self._waiting if t.priority == priority) for priority in PRIORITIES},
+                **self.stats,
+            }
+
+    # Métodos internos; devem ser chamados com o lock adquirido.
+
+    def _refill(self, now):
+        if self.rate:
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate)
+        self._refilled = now
+
+    def _head(self):
+        return min(self._waiting, key=lambda t: (PRIORITIES.index(t.priority), t.seq))
@@ -0,0 +1,288 @@
+import hashlib
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from src.models import Film, Person
+
+
+# Armazenamento compartilhado dos resultados exibidos pelas sessões.
+# A sessão guarda apenas um identificador do conjunto de filmes que está exibindo
+# (ou que exibiu antes, para voltar na navegação); os filmes ficam aqui, imutáveis,
+# uma única vez por processo. Conjuntos iguais (mesmo diretor, mesmo idioma) têm o
+# mesmo identificador, e filmes e pessoas repetidos entre conjuntos são o mesmo
+# objeto, com QIDs e nomes internados. Cada objeto tem uma contagem de referências
+# e é descartado quando nenhuma sessão o referencia mais.
+#
+# Cada sessão tem um orçamento de memória: acima dele, os conjuntos usados há mais
+# tempo são liberados (o conjunto exibido no momento nunca é). Sessões inativas por
+# mais de RESULT_STORE_SESSION_TTL segundos liberam tudo o que referenciam.
+
+RESULT_STORE_SESSION_BUDGET = int(os.environ.get("RESULT_STORE_SESSION_BUDGET", 8 * 1024 * 1024))
+RESULT_STORE_SESSION_TTL = int(os.environ.get("RESULT_STORE_SESSION_TTL", 60 * 60))
+RESULT_STORE_EXPIRE_INTERVAL = 60
+
+# Estimativa de bytes de cada objeto, calculada uma vez quando ele é internado
+PERSON_OVERHEAD = sys.getsizeof(Person("", ""))
+FILM_OVERHEAD = sys.getsizeof(Film("", ""))
+
+
+def text_size(text):
+    return sys.getsizeof(text) if isinstance(text, str) else 0
+
+
+def person_key(person):
+    return (person.qid, person.name)
+
+
+def film_key(film):
+    return (
+        film.qid,
+        film.name,
+        film.year,
+        person_key(film.director) if film.director else None,
+        tuple(person_key(actor) for actor in film.actors),
+        film.genres,
+        film.image,
+        film.genre_ids
+    )
+
+
+def results_handle(keys):
+    digest = hashlib.sha1()
+    for key in keys:
+        digest.update(repr(key).encode("utf-8"))
+    return digest.hexdigest()
+
+
+# `size` é o custo do objeto para a sessão que o referencia (filme com diretor e
+# elenco); `own` é o que ele ocupa além dos objetos que também são compartilhados.
+
+class _Interned:
+    __slots__ = ("value", "size", "own", "refs")
+
+    def __init__(self, value, size, own):
+        self.value = value
+        self.size = size
+        self.own = own
+        self.refs = 0
+
+
+class _ResultSet:
+    __slots__ = ("films", "keys", "size", "refs")
+
+    def __init__(self, films, keys, size):
+        self.films = films
+        self.keys = keys
+        self.size = size
+        self.refs = 0
+
+
+class _SessionHoldings:
+    def __init__(self):
+        self.handles = OrderedDict()
+        self.bytes = 0
+        self.current = None
+        self.last_seen = time.monotonic()
+
+
+class ResultStore:
+    def __init__(self, session_budget=RESULT_STORE_SESSION_BUDGET, session_ttl=RESULT_STORE_SESSION_TTL):
+        self.session_budget = session_budget
+        self.session_ttl = session_ttl
+        self._lock = threading.Lock()
+        self._people = {}
+        self._films = {}
+        self._results = {}
+        self._sessions = {}
+        self._bytes = 0
+        self._last_expire = time.monotonic()
+        self.stats = {"reaproveitados": 0, "liberados": 0, "sessoes_expiradas": 0}
+
+    # Guarda os filmes como o conjunto exibido pela sessão e devolve o identificador
+    # que ela deve manter. O conjunto anterior continua disponível até sair do orçamento.
+
+    def hold(self, owner, films):
+        keys = tuple(film_key(film) for film in films)
+        handle = results_handle(keys)
+        with self._lock:
+            self._expire_idle()
+            holdings = self._session(owner)
+            result = self._results.get(handle)
+            if result is None:
+                result = self._results[handle] = self._create(films, keys)
+            elif handle not in holdings.handles:
+                self.stats["reaproveitados"] += 1
+
+            if handle not in holdings.handles:
+                result.refs += 1
+                holdings.handles[handle] = result.size
+                holdings.bytes += result.size
+            holdings.handles.move_to_end(handle)
+            holdings.current = handle
+            self._enforce_budget(holdings)
+            return handle
+
+    def get(self, owner, handle):
+        with self._lock:
+            holdings = self._session(owner)
+            if handle not in holdings.handles:
+                return None
+            holdings.handles.move_to_end(handle)
+            return self._results[handle].films
+
+    # Torna `handle` o conjunto exibido pela sessão, se ele ainda estiver guardado
+
+    def restore(self, owner, handle):
+        with self._lock:
+            holdings = self._session(owner)
+            if handle not in holdings.handles:
+                return None
+            holdings.handles.move_to_end(handle)
+            holdings.current = handle
+            return self._results[handle].films
+
+    def release(self, owner, handle):
+        with self._lock:
+            holdings = self._sessions.get(owner)
+            if holdings is not None and handle in holdings.handles:
+                self._release(holdings, handle)
+
+    def drop_session(self, owner):
+        with self._lock:
+            holdings = self._sessions.pop(owner, None)
+            if holdings is not None:
+                for handle in list(holdings.handles):
+                    self._release(holdings, handle)
+
+    def summary(self):
+        with self._lock:
+            referenced = sum(holdings.bytes for holdings in self._sessions.values())
+            return {
+                "sessoes": len(self._sessions),
+                "conjuntos": len(self._results),
+                "filmes": len(self._films),
+                "pessoas": len(self._people),
+                "bytes": self._bytes,
+                "bytes_referenciados": referenced,
+                "orcamento_sessao": self.session_budget,
+                **self.stats
+            }
+
+    def sessions(self):
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "sessao": owner,
+                    "conjuntos": len(holdings.handles),
+                    "bytes": holdings.bytes,
+                    "ociosa_s": now - holdings.last_seen
+                }
+                for owner, holdings in self._sessions.items()
+            ]
+
+    # Métodos internos; devem ser chamados com o lock adquirido.
+
+    def _session(self, owner):
+        holdings = self._sessions.get(owner)
+        if holdings is None:
+            holdings = self._sessions[owner] = _SessionHoldings()
+        holdings.last_seen = time.monotonic()
+        return holdings
+
+    def _create(self, films, keys):
+        canonical = tuple(self._intern_film(film, key) for film, key in zip(films, keys))
+        size = sys.getsizeof(canonical) + sum(self._films[key].size for key in keys)
+        self._bytes += sys.getsizeof(canonical)
+        return _ResultSet(canonical, keys, size)
+
+    def _intern_film(self, film, key):
+        entry = self._films.get(key)
+        if entry is None:
+            director = self._intern_person(film.director) if film.director else None
+            actors = tuple(self._intern_person(actor) for actor in film.actors)
+            value = Film(
+                qid=sys.intern(film.qid),
+                name=sys.intern(film.name),
+                year=film.year,
+                director=director,
+                actors=actors,
+                genres=tuple(sys.intern(genre) for genre in film.genres),
+                image=film.image,
+                genre_ids=tuple(sys.intern(genre_id) for genre_id in film.genre_ids)
+            )
+            own = (
+                FILM_OVERHEAD + sys.getsizeof(actors) + sys.getsizeof(value.genres) + sys.getsizeof(value.genre_ids)
+                + text_size(value.name) + text_size(value.image)
+            )
+            people = ([director] if director else []) + list(actors)
+            size = own + sum(self._people[person_key(person)].size for person in people)
+            entry = self._films[key] = _Interned(value, size, own)
+            self._bytes += own
+        entry.refs += 1
+        return entry.value
+
+    def _intern_person(self, person):
+        key = person_key(person)
+        entry = self._people.get(key)
+        if entry is None:
+            value = Person(sys.intern(person.qid), sys.intern(person.name))
+            size = PERSON_OVERHEAD + text_size(value.qid) + text_size(value.name)
+            entry = self._people[key] = _Interned(value, size, size)
+            self._bytes += size
+        entry.refs += 1
+        return entry.value
+
+    def _release(self, holdings, handle):
+        holdings.bytes -= holdings.handles.pop(handle)
+        if holdings.current == handle:
+            holdings.current = None
+        result = self._results[handle]
+        result.refs -= 1
+        if result.refs:
+            return
+
+        del self._results[handle]
+        self.stats["liberados"] += 1
+        self._bytes -= sys.getsizeof(result.films)
+        for film, key in zip(result.films, result.keys):
+            self._release_film(film, key)
+
+    def _release_film(self, film, key):
+        entry = self._films[key]
+        entry.refs -= 1
+        if entry.refs:
+            return
+        del self._films[key]
+        self._bytes -= entry.own
+        for person in ([film.director] if film.director else []) + list(film.actors):
+            person_entry = self._people[person_key(person)]
+            person_entry.refs -= 1
+            if not person_entry.refs:
+                del self._people[person_key(person)]
+                self._bytes -= person_entry.own
+
+    def _enforce_budget(self, holdings):
+        for handle in list(holdings.handles):
+            if holdings.bytes <= self.session_budget:
+                break
+            if handle != holdings.current:
+                self._release(holdings, handle)
+
+    def _expire_idle(self):
+        now = time.monotonic()
+        if now - self._last_expire < RESULT_STORE_EXPIRE_INTERVAL:
+            return
+        self._last_expire = now
+        for owner, holdings in list(self._sessions.items()):
+            if now - holdings.last_seen > self.session_ttl:
+                del self._sessions[owner]
+                for handle in list(holdings.handles):
+                    self._release(holdings, handle)
+                self.stats["sessoes_expiradas"] += 1
+
+
+result_store = ResultStore()
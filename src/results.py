@@ -0,0 +1,159 @@
+import codecs
+import csv
+import json
+import re
+
+
+# Resultados SPARQL em formato colunar.
+# Em vez de manter a estrutura do JSON (uma lista de dicionários com {"type", "value"}
+# para cada célula), cada variável da consulta vira uma lista de valores simples.
+# As respostas em TSV ou CSV são lidas linha a linha, direto do corpo da resposta,
+# sem montar o documento inteiro em memória; a resposta em JSON é convertida para a
+# mesma estrutura, então o resto do aplicativo trabalha com um único formato.
+
+RESULT_FORMATS = {
+    "json": "application/sparql-results+json",
+    "tsv": "text/tab-separated-values",
+    "csv": "text/csv",
+}
+
+_ESCAPES = {"t": "\t", "n": "\n", "r": "\r", "b": "\b", "f": "\f", '"': '"', "'": "'", "\\": "\\"}
+_ESCAPE_RE = re.compile(r"\\(u[0-9A-Fa-f]{4}|U[0-9A-Fa-f]{8}|.)")
+
+
+def _unescape(match):
+    code = match.group(1)
+    if len(code) > 1:
+        return chr(int(code[1:], 16))
+    return _ESCAPES.get(code, code)
+
+
+class ResultTable:
+    __slots__ = ("vars", "columns", "stale")
+
+    def __init__(self, vars, columns, stale=False):
+        self.vars = vars
+        self.columns = columns
+        # Indica um resultado vencido servido do cache enquanto é atualizado
+        self.stale = stale
+
+    def __len__(self):
+        return len(self.columns[self.vars[0]]) if self.vars else 0
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __iter__(self):
+        return self.rows()
+
+    def rows(self):
+        names = self.vars
+        for values in zip(*(self.columns[name] for name in names)):
+            yield dict(zip(names, values))
+
+    def column(self, name):
+        values = self.columns.get(name)
+        return values if values is not None else [None] * len(self)
+
+    def to_dict(self):
+        return {"vars": self.vars, "columns": self.columns}
+
+    @classmethod
+    def from_dict(cls, data):
+        # Entradas antigas do cache em disco ainda estão no formato JSON do SPARQL
+        if "results" in data:
+            return cls.from_json(data)
+        return cls(data["vars"], data["columns"])
+
+    @classmethod
+    def from_json(cls, results):
+        bindings = results.get("results", {}).get("bindings", [])
+        names = list(results.get("head", {}).get("vars") or [])
+        if not names:
+            names = list(dict.fromkeys(name for binding in bindings for name in binding))
+
+        columns = {}
+        for name in names:
+            columns[name] = [binding[name]["value"] if name in binding else None for binding in bindings]
+        return cls(names, columns)
+
+
+def parse_tsv_term(term):
+    if not term:
+        return None
+    first = term[0]
+    if first == "<":
+        return term[1:-1]
+    if first == '"':
+        value = term[1:term.rindex('"')]
+        return _ESCAPE_RE.sub(_unescape, value) if "\\" in value else value
+    return term
+
+
+def parse_tsv(lines):
+    lines = iter(lines)
+    header = next(lines, "").rstrip("\r\n")
+    names = [name.lstrip("?$") for name in header.split("\t")] if header else []
+    values = [[] for _ in names]
+    appenders = [column.append for column in values]
+    width = len(names)
+
+    for line in lines:
+        cells = line.rstrip("\r\n").split("\t")
+        if len(cells) < width:
+            cells += [""] * (width - len(cells))
+        for append, cell in zip(appenders, cells):
+            append(parse_tsv_term(cell))
+
+    return ResultTable(names, dict(zip(names, values)))
+
+
+def parse_csv(lines):
+    reader = csv.reader(lines)
+    names = next(reader, [])
+    values = [[] for _ in names]
+    appenders = [column.append for column in values]
+
+    for row in reader:
+        for append, cell in zip(appenders, row):
+            append(cell or None)
+
+    return ResultTable(names, dict(zip(names, values)))
+
+
+def iter_lines(chunks):
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    pending = ""
+    for chunk in chunks:
+        pending += decoder.decode(chunk)
+        lines = pending.split("\n")
+        pending = lines.pop()
+        for line in lines:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+# Lê o corpo da resposta em blocos e devolve (tabela, bytes recebidos).
+
+def parse_stream(chunks, result_format):
+    received = [0]
+
+    def counted():
+        for chunk in chunks:
+            received[0] += len(chunk)
+            yield chunk
+
+    if result_format == "json":
+        table = ResultTable.from_json(json.loads(b"".join(counted())))
+    elif result_format == "tsv":
+        table = parse_tsv(iter_lines(counted()))
+    elif result_format == "csv":
+        try:
+            table = parse_csv(iter_lines(counted()))
+        except csv.Error as e:
+            raise ValueError(f"CSV inválido: {e}")
+    else:
+        raise ValueError(f"Formato de resultado desconhecido: {result_format}")
+    return table, received[0]
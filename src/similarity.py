@@ -0,0 +1,214 @@
+import os
+import threading
+
+import numpy as np
+
+
+# Filmes semelhantes calculados localmente, a partir dos filmes que as sessões já
+# carregaram (o índice é compartilhado pelo processo e não faz consultas SPARQL).
+# Cada filme é um vetor esparso de características binárias com pesos fixos:
+# diretor, atores, gêneros e década. Os vetores formam uma matriz esparsa guardada
+# por colunas (para cada característica, as linhas dos filmes que a têm), e a
+# similaridade do cosseno de um filme com todos os outros é o produto dessa matriz
+# pelo vetor do filme: um np.bincount das linhas das características dele, com os
+# pesos ao quadrado, dividido pelas normas. O custo depende de quantos filmes têm as
+# características do filme consultado, não do tamanho da matriz inteira.
+#
+# O índice é atualizado a cada resultado (em `remove_duplicate_films`). Um filme que
+# reaparece com outras características (por exemplo, elenco mais completo) ganha
+# uma linha nova e a antiga passa a ter norma zero; as linhas descartadas são
+# removidas quando passam a ser maioria. Acima de SIMILARITY_MAX_FILMS, os filmes
+# indexados há mais tempo saem do índice.
+
+SIMILARITY_MAX_FILMS = int(os.environ.get("SIMILARITY_MAX_FILMS", 200000))
+SIMILARITY_TOP_K = int(os.environ.get("SIMILARITY_TOP_K", 20))
+
+FEATURE_DIRECTOR = "diretor"
+FEATURE_ACTOR = "ator"
+FEATURE_GENRE = "genero"
+FEATURE_DECADE = "decada"
+
+FEATURE_WEIGHTS = {FEATURE_DIRECTOR: 3.0, FEATURE_ACTOR: 1.0, FEATURE_GENRE: 1.0, FEATURE_DECADE: 0.5}
+
+# Listas de linhas maiores que isso são convertidas para arrays e mantidas em cache
+# entre consultas (só a parte acrescentada depois é convertida de novo)
+POSTINGS_CACHE_MIN = 1024
+COMPACT_MIN_ROWS = 1024
+
+
+def film_features(film):
+    features = []
+    if film.director:
+        features.append((FEATURE_DIRECTOR, film.director.qid))
+    features.extend((FEATURE_ACTOR, actor.qid) for actor in film.actors)
+    features.extend((FEATURE_GENRE, genre) for genre in (film.genre_ids or film.genres))
+    if film.year is not None:
+        features.append((FEATURE_DECADE, film.year // 10 * 10))
+    return tuple(dict.fromkeys(features))
+
+
+# Resultado de uma consulta: o filme, a similaridade e as características em comum
+# com o filme consultado, por tipo (QIDs de diretor, atores e gêneros; décadas)
+
+class SimilarFilm:
+    __slots__ = ("film", "score", "shared")
+
+    def __init__(self, film, score, shared):
+        self.film = film
+        self.score = score
+        self.shared = shared
+
+    def __repr__(self):
+        return f"SimilarFilm({self.film.qid!r}, {self.score:.3f})"
+
+
+class SimilarityIndex:
+    def __init__(self, max_films=SIMILARITY_MAX_FILMS):
+        self.max_films = max_films
+        self._lock = threading.Lock()
+        self.stats = {"consultas": 0, "atualizados": 0, "removidos": 0, "compactacoes": 0}
+        self._reset()
+
+    def _reset(self):
+        self._features = {}
+        self._feature_keys = []
+        self._postings = []
+        self._cached = {}
+        self._rows = {}
+        self._row_films = []
+        self._row_features = []
+        self._norms = np.zeros(1024)
+        self._oldest = 0
+        self._dead = 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._rows)
+
+    def add_films(self, films):
+        with self._lock:
+            for film in films:
+                features = film_features(film)
+                row = self._rows.get(film.qid)
+                if row is not None:
+                    if self._feature_keys_of(row) == features:
+                        self._row_films[row] = film
+                        continue
+                    self._drop(row)
+                    self.stats["atualizados"] += 1
+                self._add(film, features)
+
+            while len(self._rows) > self.max_films:
+                row = self._oldest
+                self._oldest += 1
+                if self._row_films[row] is not None:
+                    self._drop(row)
+                    self.stats["removidos"] += 1
+
+            if self._dead > COMPACT_MIN_ROWS and self._dead > len(self._rows):
+                self._compact()
+
+    def similar(self, qid, k=SIMILARITY_TOP_K):
+        with self._lock:
+            row = self._rows.get(qid)
+            if row is None:
+                return []
+            self.stats["consultas"] += 1
+            return self._top(row, k)
+
+    def summary(self):
+        with self._lock:
+            return {
+                "filmes": len(self._rows),
+                "caracteristicas": len(self._features),
+                "linhas_descartadas": self._dead,
+                **self.stats
+            }
+
+    # Métodos internos; devem ser chamados com o lock adquirido.
+
+    def _add(self, film, features):
+        row = len(self._row_films)
+        if row == len(self._norms):
+            self._norms = np.concatenate([self._norms, np.zeros(len(self._norms))])
+
+        feature_ids = []
+        for feature in features:
+            feature_id = self._features.get(feature)
+            if feature_id is None:
+                feature_id = self._features[feature] = len(self._feature_keys)
+                self._feature_keys.append(feature)
+                self._postings.append([])
+            self._postings[feature_id].append(row)
+            feature_ids.append(feature_id)
+
+        self._rows[film.qid] = row
+        self._row_films.append(film)
+        self._row_features.append(tuple(feature_ids))
+        self._norms[row] = sum(FEATURE_WEIGHTS[kind] ** 2 for kind, _ in features) ** 0.5
+
+    def _drop(self, row):
+        del self._rows[self._row_films[row].qid]
+        self._row_films[row] = None
+        self._norms[row] = 0.0
+        self._dead += 1
+
+    def _compact(self):
+        films = [film for film in self._row_films if film is not None]
+        stats = self.stats
+        self._reset()
+        self.stats = stats
+        for film in films:
+            self._add(film, film_features(film))
+        self.stats["compactacoes"] += 1
+
+    def _feature_keys_of(self, row):
+        return tuple(self._feature_keys[feature_id] for feature_id in self._row_features[row])
+
+    def _posting_array(self, feature_id):
+        postings = self._postings[feature_id]
+        if len(postings) < POSTINGS_CACHE_MIN:
+            return np.array(postings, dtype=np.int64)
+        cached = self._cached.get(feature_id)
+        if cached is None:
+            cached = np.array(postings, dtype=np.int64)
+        elif len(cached) < len(postings):
+            cached = np.concatenate([cached, np.array(postings[len(cached):], dtype=np.int64)])
+        self._cached[feature_id] = cached
+        return cached
+
+    def _top(self, row, k):
+        feature_ids = self._row_features[row]
+        if not feature_ids:
+            return []
+        count = len(self._row_films)
+        postings = [self._posting_array(feature_id) for feature_id in feature_ids]
+        weights = [FEATURE_WEIGHTS[self._feature_keys[feature_id][0]] ** 2 for feature_id in feature_ids]
+
+        dots = np.bincount(
+            np.concatenate(postings),
+            weights=np.repeat(weights, [len(rows) for rows in postings]),
+            minlength=count
+        )
+        dots[row] = 0.0
+        norms = self._norms[:count]
+        scores = np.divide(dots, norms * norms[row], out=np.zeros(count), where=norms > 0)
+
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(scores[candidates], -k)[-k:]]
+        candidates = candidates[np.lexsort((candidates, -scores[candidates]))]
+
+        own = set(feature_ids)
+        results = []
+        for candidate in candidates.tolist():
+            shared = {}
+            for feature_id in self._row_features[candidate]:
+                if feature_id in own:
+                    kind, value = self._feature_keys[feature_id]
+                    shared.setdefault(kind, []).append(value)
+            results.append(SimilarFilm(self._row_films[candidate], float(scores[candidate]), shared))
+        return results
+
+
+similarity_index = SimilarityIndex()
@@ -0,0 +1,468 @@
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+current_dir = Path(__file__).parent
+parent_dir = current_dir.parent
+sys.path.append(str(parent_dir))
+
+from src.cache import cache_key
+from src.queries import SparqlQuery, get_films_query, get_exploration_query
+
+
+# Snapshot de pré-aquecimento com os filmes mais procurados.
+#
+# Um passo de build (ver o final do arquivo) executa as consultas de uma lista de
+# títulos, diretores e atores populares e grava os resultados, junto com os rótulos
+# das entidades, em um arquivo compacto e versionado. O aplicativo abre o arquivo
+# via mmap: nada é lido além das páginas tocadas em cada busca, então o tempo de
+# inicialização não depende do tamanho do snapshot. Depois de um deploy, essas
+# consultas são respondidas na hora, antes mesmo de o cache ter sido preenchido.
+#
+# Em segundo plano, as entradas mais antigas são refeitas aos poucos e gravadas em
+# um delta em memória, incorporado ao arquivo (com nova revisão) periodicamente.
+#
+# Formato: cabeçalho, array de offsets e um blob com as entradas ordenadas pela
+# chave. Cada entrada tem a data de coleta, a chave e o conteúdo:
+# - "q:<chave do cache>": consulta, template, parâmetros e resultado (JSON comprimido);
+# - "l:<idioma>:<QID>": rótulo da entidade;
+# - "m:meta": idiomas e demais informações do build.
+
+SNAPSHOT_PATH = os.environ.get(
+    "SNAPSHOT_PATH",
+    str(parent_dir / "data" / "snapshot.bin")
+)
+# Idade a partir da qual uma entrada é servida como obsoleta (e revalidada)
+SNAPSHOT_MAX_AGE = int(os.environ.get("SNAPSHOT_MAX_AGE", 3 * 24 * 60 * 60))
+# Atualização em segundo plano: entradas com mais de SNAPSHOT_REFRESH_AGE segundos
+# são refeitas, SNAPSHOT_REFRESH_BATCH a cada SNAPSHOT_REFRESH_INTERVAL segundos (0 desativa)
+SNAPSHOT_REFRESH_AGE = int(os.environ.get("SNAPSHOT_REFRESH_AGE", 24 * 60 * 60))
+SNAPSHOT_REFRESH_INTERVAL = float(os.environ.get("SNAPSHOT_REFRESH_INTERVAL", 60))
+SNAPSHOT_REFRESH_BATCH = int(os.environ.get("SNAPSHOT_REFRESH_BATCH", 5))
+SNAPSHOT_FLUSH_SIZE = int(os.environ.get("SNAPSHOT_FLUSH_SIZE", 50))
+
+MAGIC = b"WSSN"
+VERSION = 1
+HEADER = struct.Struct("<4sIIdIIII")
+ENTRY = struct.Struct("<dH")
+
+QUERY_PREFIX = b"q:"
+META_KEY = b"m:meta"
+
+SEED_KINDS = ("title", "actor", "director")
+
+
+def query_key(query):
+    return QUERY_PREFIX + cache_key(query).encode("ascii")
+
+
+def label_key(language, qid):
+    return f"l:{language}:{qid}".encode("utf-8")
+
+
+def encode_entry(query, result):
+    entry = {
+        "query": str(query),
+        "template": getattr(query, "template", "outra"),
+        "params": getattr(query, "params", {}),
+        "result": result,
+    }
+    return zlib.compress(json.dumps(entry, ensure_ascii=False).encode("utf-8"))
+
+
+def decode_entry(payload):
+    return json.loads(zlib.decompress(payload).decode("utf-8"))
+
+
+# Gravação do arquivo a partir de {chave: (data de coleta, conteúdo)}.
+
+def build_snapshot(entries, path, revision=1):
+    rows = sorted(entries.items())
+
+    blob = bytearray()
+    offsets = array("I", [0])
+    for key, (created, payload) in rows:
+        blob += ENTRY.pack(created, len(key))
+        blob += key
+        blob += payload
+        offsets.append(len(blob))
+
+    offsets_off = HEADER.size
+    blob_off = offsets_off + offsets.itemsize * len(offsets)
+    header = HEADER.pack(MAGIC, VERSION, revision, time.time(), len(rows), offsets_off, blob_off, len(blob))
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        offsets.tofile(f)
+        f.write(blob)
+    os.replace(tmp_path, path)
+    return len(rows)
+
+
+class MappedSnapshot:
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+
+        (magic, version, self.revision, self.built_at, self.size,
+         offsets_off, blob_off, blob_len) = HEADER.unpack_from(view)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Arquivo de snapshot inválido: {path}")
+        if sys.byteorder != "little":
+            raise ValueError("O snapshot requer uma plataforma little-endian")
+
+        self._offsets = view[offsets_off:offsets_off + 4 * (self.size + 1)].cast("I")
+        self._blob = view[blob_off:blob_off + blob_len]
+
+    def key(self, i):
+        start = self._offsets[i]
+        _, key_len = ENTRY.unpack_from(self._blob, start)
+        key_start = start + ENTRY.size
+        return bytes(self._blob[key_start:key_start + key_len])
+
+    def created(self, i):
+        return ENTRY.unpack_from(self._blob, self._offsets[i])[0]
+
+    def entry(self, i):
+        start, end = self._offsets[i], self._offsets[i + 1]
+        created, key_len = ENTRY.unpack_from(self._blob, start)
+        key_start = start + ENTRY.size
+        key_end = key_start + key_len
+        return bytes(self._blob[key_start:key_end]), created, bytes(self._blob[key_end:end])
+
+    def lower_bound(self, key):
+        lo, hi = 0, self.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def find(self, key):
+        i = self.lower_bound(key)
+        if i < self.size and self.key(i) == key:
+            _, created, payload = self.entry(i)
+            return created, payload
+        return None
+
+    def close(self):
+        for view in (self._offsets, self._blob):
+            view.release()
+        self._mmap.close()
+        self._file.close()
+
+
+class Snapshot:
+    def __init__(self, path=SNAPSHOT_PATH, max_age=SNAPSHOT_MAX_AGE):
+        self.path = Path(path)
+        self.max_age = max_age
+        self._lock = threading.RLock()
+        self._base = None
+        self._delta = {}
+        self._flushing = False
+        self._refresher = None
+        self.stats = {"hits": 0, "rotulos": 0, "atualizadas": 0, "falhas": 0}
+        self._open()
+
+    def _open(self):
+        if self._base is not None:
+            self._base.close()
+            self._base = None
+        if self.path.exists():
+            try:
+                self._base = MappedSnapshot(self.path)
+            except (OSError, ValueError) as e:
+                print(f"Não foi possível abrir o snapshot: {e}")
+
+    def __len__(self):
+        with self._lock:
+            return (self._base.size if self._base else 0) + len(self._delta)
+
+    def _get(self, key):
+        with self._lock:
+            item = self._delta.get(key)
+            if item is None and self._base is not None:
+                item = self._base.find(key)
+            return item
+
+    # Devolve (resultado, fresco) como QueryCache.lookup, ou (None, False).
+
+    def lookup(self, query):
+        if self._base is None and not self._delta:
+            return None, False
+        item = self._get(query_key(query))
+        if item is None:
+            return None, False
+
+        created, payload = item
+        result = decode_entry(payload)["result"]
+        with self._lock:
+            self.stats["hits"] += 1
+        return result, time.time() - created < self.max_age
+
+    def labels(self, qids, language):
+        labels = {}
+        if self._base is None and not self._delta:
+            return labels
+        for qid in qids:
+            item = self._get(label_key(language, qid))
+            if item is not None:
+                labels[qid] = item[1].decode("utf-8")
+        with self._lock:
+            self.stats["rotulos"] += len(labels)
+        return labels
+
+    def meta(self):
+        item = self._get(META_KEY)
+        return json.loads(item[1].decode("utf-8")) if item else {}
+
+    def summary(self):
+        with self._lock:
+            base = self._base
+            return {
+                "entradas": (base.size if base else 0) + len(self._delta),
+                "revisao": base.revision if base else 0,
+                "gerado_em": base.built_at if base else None,
+                "pendentes": len(self._delta),
+                **self.stats,
+            }
+
+    # Atualização em segundo plano. `refresh_entry(consulta, idiomas)` refaz a
+    # consulta e devolve (resultado, {idioma: {qid: rótulo}}); é fornecida por api.py.
+
+    def start_refresh(self, refresh_entry, interval=SNAPSHOT_REFRESH_INTERVAL):
+        with self._lock:
+            if self._refresher is not None or self._base is None or interval <= 0:
+                return
+            self._refresher = threading.Thread(
+                target=self._refresh_loop,
+                args=(refresh_entry, interval),
+                name="snapshot-refresh",
+                daemon=True
+            )
+        self._refresher.start()
+
+    def _refresh_loop(self, refresh_entry, interval):
+        while True:
+            time.sleep(interval)
+            remaining = self.refresh(refresh_entry)
+            if not remaining or len(self._delta) >= SNAPSHOT_FLUSH_SIZE:
+                self.flush()
+
+    def _due(self, refresh_age):
+        now = time.time()
+        due = []
+        with self._lock:
+            base = self._base
+            if base is None:
+                return due
+            for i in range(base.lower_bound(QUERY_PREFIX), base.size):
+                key = base.key(i)
+                if not key.startswith(QUERY_PREFIX):
+                    break
+                item = self._delta.get(key)
+                created = item[0] if item else base.created(i)
+                if now - created > refresh_age:
+                    due.append((created, key))
+        due.sort()
+        return due
+
+    # Refaz até `limit` entradas vencidas, das mais antigas para as mais novas, e
+    # devolve quantas continuam vencidas.
+
+    def refresh(self, refresh_entry, limit=SNAPSHOT_REFRESH_BATCH, refresh_age=SNAPSHOT_REFRESH_AGE):
+        due = self._due(refresh_age)
+        languages = self.meta().get("idiomas", [])
+
+        for _, key in due[:limit]:
+            item = self._get(key)
+            entry = decode_entry(item[1])
+            query = SparqlQuery(entry["query"], entry["template"], **entry["params"])
+            try:
+                result, labels = refresh_entry(query, languages)
+            except Exception as e:
+                with self._lock:
+                    self.stats["falhas"] += 1
+                print(f"Falha ao atualizar o snapshot ({entry['template']}): {e}")
+                continue
+
+            now = time.time()
+            with self._lock:
+                self._delta[key] = (now, encode_entry(query, result))
+                for language, mapping in labels.items():
+                    for qid, label in mapping.items():
+                        self._delta[label_key(language, qid)] = (now, label.encode("utf-8"))
+                self.stats["atualizadas"] += 1
+
+        return max(len(due) - limit, 0)
+
+    # Regrava o arquivo com o delta incorporado, como em title_index.TitleIndex.flush:
+    # a reconstrução acontece fora do lock e só a troca do mapeamento usa o lock.
+
+    def flush(self):
+        with self._lock:
+            if self._flushing or not self._delta:
+                return
+            self._flushing = True
+            pending = dict(self._delta)
+            base = self._base
+
+        try:
+            entries = {}
+            revision = 1
+            if base is not None:
+                revision = base.revision + 1
+                for i in range(base.size):
+                    key, created, payload = base.entry(i)
+                    entries[key] = (created, payload)
+            entries.update(pending)
+            build_snapshot(entries, self.path, revision)
+
+            with self._lock:
+                self._open()
+                for key, item in pending.items():
+                    if self._delta.get(key) is item:
+                        del self._delta[key]
+        except OSError as e:
+            print(f"Falha ao gravar o snapshot: {e}")
+        finally:
+            self._flushing = False
+
+
+snapshot = Snapshot()
+
+
+# Build do snapshot a partir de uma lista de sementes "tipo:valor" (title, director
+# ou actor), na linha de comando ou em um arquivo, uma por linha:
+#     python src/snapshot.py director:Q25191 "title:Inception" --seeds populares.txt \
+#         --pages 2 --languages en,pt [--output data/snapshot.bin]
+
+def parse_seed(seed):
+    kind, sep, value = seed.partition(":")
+    value = value.strip()
+    if not sep or kind not in SEED_KINDS or not value or (kind != "title" and not value.startswith("Q")):
+        raise argparse.ArgumentTypeError(
+            f"Semente inválida '{seed}'; use title:Título, director:QID ou actor:QID"
+        )
+    return kind, value
+
+
+def read_seeds(path):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield parse_seed(line)
+
+
+def seed_queries(seeds, pages):
+    queries = []
+    for kind, value in dict.fromkeys(seeds):
+        if kind == "title":
+            queries.append(get_films_query("title", value))
+        else:
+            queries.extend(get_exploration_query(kind, value, page) for page in range(pages))
+    return queries
+
+
+# Linhas de um resultado separadas por filme, no formato de ResultTable.to_dict().
+# Um título encontrado também pode ser aberto pelo QID (sugestões e índice local).
+
+def film_results(result):
+    positions = {}
+    for i, film in enumerate(result["columns"].get("film", ())):
+        if film:
+            positions.setdefault(film.rsplit("/", 1)[-1], []).append(i)
+    for film_id, rows in positions.items():
+        columns = {name: [values[i] for i in rows] for name, values in result["columns"].items()}
+        yield film_id, {"vars": result["vars"], "columns": columns}
+
+
+def collect(seeds, pages, languages, workers):
+    from src.api import execute_sparql_query, fetch_labels
+    from src.labels import table_qids
+
+    queries = seed_queries(seeds, pages)
+    entries = {}
+    qids = []
+    failures = 0
+    now = time.time()
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="snapshot") as executor:
+        futures = [executor.submit(execute_sparql_query, query, False) for query in queries]
+        for query, future in zip(queries, futures):
+            try:
+                results = future.result()
+            except Exception as e:
+                failures += 1
+                print(f"Falha em {query.template} {query.params}: {e}", file=sys.stderr)
+                continue
+
+            result = results.to_dict()
+            entries[query_key(query)] = (now, encode_entry(query, result))
+            qids.extend(table_qids(results))
+            if query.template == "filmes_por_title":
+                for film_id, film_result in film_results(result):
+                    film_query = get_films_query("qid", [film_id])
+                    entries[query_key(film_query)] = (now, encode_entry(film_query, film_result))
+
+    qids = list(dict.fromkeys(qids))
+    for language in languages:
+        for qid, label in fetch_labels(qids, language).items():
+            entries[label_key(language, qid)] = (now, label.encode("utf-8"))
+
+    meta = {"idiomas": languages, "sementes": len(seeds), "paginas": pages}
+    entries[META_KEY] = (now, json.dumps(meta).encode("utf-8"))
+    return entries, len(queries), failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera o snapshot de pré-aquecimento com filmes populares.")
+    parser.add_argument("seeds", nargs="*", type=parse_seed, help="sementes no formato title:Título, director:QID ou actor:QID")
+    parser.add_argument("--seeds", dest="seeds_file", help="arquivo com uma semente por linha")
+    parser.add_argument("--pages", type=int, default=1, help="páginas da filmografia de cada diretor ou ator")
+    parser.add_argument("--languages", default="en", help="idiomas dos rótulos, separados por vírgula")
+    parser.add_argument("--workers", type=int, default=4, help="consultas simultâneas")
+    parser.add_argument("--output", default=SNAPSHOT_PATH, help="arquivo de saída do snapshot")
+    args = parser.parse_args()
+
+    seeds = list(args.seeds)
+    if args.seeds_file:
+        seeds.extend(read_seeds(args.seeds_file))
+    if not seeds:
+        parser.error("informe ao menos uma semente")
+
+    languages = [language.strip() for language in args.languages.split(",") if language.strip()]
+    start = time.time()
+    entries, total, failures = collect(seeds, args.pages, languages, args.workers)
+
+    revision = 1
+    if os.path.exists(args.output):
+        try:
+            previous = MappedSnapshot(args.output)
+            revision = previous.revision + 1
+            previous.close()
+        except (OSError, ValueError):
+            pass
+
+    count = build_snapshot(entries, args.output, revision)
+    print(
+        f"Snapshot revisão {revision} com {count} entradas ({total} consultas, {failures} falhas) "
+        f"gravado em {args.output} em {time.time() - start:.1f} s",
+        file=sys.stderr
+    )
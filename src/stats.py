@@ -0,0 +1,102 @@
+import heapq
+from collections import Counter
+from datetime import datetime
+
+
+# Estruturas incrementais para o painel de estatísticas.
+# Cada filme atualiza contadores em O(1) no momento em que chega; a memória fica
+# limitada pela capacidade dos top-k e a renderização não depende do tamanho
+# do histórico da sessão.
+
+TOP_K_CAPACITY = 100
+
+
+# Contador aproximado de itens mais frequentes (algoritmo Space-Saving com
+# "stream summary"). Guarda no máximo `capacity` itens; quando cheio, o item
+# novo substitui um dos menos frequentes e herda a contagem dele.
+
+class TopK:
+    def __init__(self, capacity=TOP_K_CAPACITY):
+        self.capacity = capacity
+        self._counts = {}
+        self._buckets = {}
+        self._min = 0
+
+    def __len__(self):
+        return len(self._counts)
+
+    def add(self, item):
+        if item in self._counts:
+            self._increment(item)
+            return
+
+        if len(self._counts) < self.capacity:
+            self._counts[item] = 1
+            self._buckets.setdefault(1, {})[item] = None
+            self._min = 1
+            return
+
+        bucket = self._buckets[self._min]
+        victim = next(iter(bucket))
+        del bucket[victim]
+        del self._counts[victim]
+        bucket[item] = None
+        self._counts[item] = self._min
+        self._increment(item)
+
+    def most_common(self, k):
+        return heapq.nlargest(k, self._counts.items(), key=lambda pair: pair[1])
+
+    def _increment(self, item):
+        count = self._counts[item]
+        bucket = self._buckets[count]
+        del bucket[item]
+        if not bucket:
+            del self._buckets[count]
+            if self._min == count:
+                self._min = count + 1
+
+        self._counts[item] = count + 1
+        self._buckets.setdefault(count + 1, {})[item] = None
+
+
+class SessionStats:
+    def __init__(self, capacity=TOP_K_CAPACITY):
+        self.inicio_sessao = datetime.now()
+        self.busca_count = 0
+        self.filmes_encontrados = 0
+        self.cliques_atores = 0
+        self.cliques_diretores = 0
+
+        self.soma_filmes_por_consulta = 0
+        self.consultas = 0
+
+        self.decadas = Counter()
+        self.diretores = TopK(capacity)
+        self.atores = TopK(capacity)
+        self.generos = TopK(capacity)
+
+    def add_film(self, film):
+        self.filmes_encontrados += 1
+
+        if film.year is not None:
+            self.decadas[film.year // 10 * 10] += 1
+        if film.director:
+            self.diretores.add(film.director.name)
+        for actor in film.actors:
+            self.atores.add(actor.name)
+        for genre in film.genres:
+            self.generos.add(genre)
+
+    def record_search(self, num_filmes):
+        self.busca_count += 1
+        self.soma_filmes_por_consulta += num_filmes
+        self.consultas += 1
+
+    def media_filmes_por_consulta(self):
+        if not self.consultas:
+            return None
+        return self.soma_filmes_por_consulta / self.consultas
+
+    def decadas_ordenadas(self):
+        return sorted(self.decadas.items())
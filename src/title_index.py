@@ -0,0 +1,348 @@
+import argparse
+import heapq
+import mmap
+import os
+import struct
+import sys
+import threading
+import unicodedata
+import zlib
+from array import array
+from collections import Counter
+from pathlib import Path
+
+
+# Índice local de títulos de filmes para busca aproximada e autocompletar.
+#
+# O índice fica em um arquivo compacto mapeado em memória (mmap) com:
+# - um array de entradas ordenado pelo título normalizado, usado como trie
+#   compacta para buscas por prefixo (busca binária);
+# - um índice invertido de trigramas (hash do trigrama -> lista de entradas).
+# Títulos colhidos dos resultados das consultas entram em um pequeno delta em
+# memória, que é gravado no arquivo quando atinge DELTA_FLUSH_SIZE entradas.
+
+INDEX_PATH = os.environ.get(
+    "TITLE_INDEX_PATH",
+    str(Path(__file__).parent.parent / "data" / "title_index.bin")
+)
+DELTA_FLUSH_SIZE = int(os.environ.get("TITLE_INDEX_FLUSH_SIZE", 500))
+
+# A busca por título usa o rótulo em inglês, então o índice guarda só títulos em inglês
+INDEX_LANGUAGE = "en"
+
+MAGIC = b"WSTI"
+VERSION = 1
+HEADER = struct.Struct("<4s10I")
+SEPARATOR = "\x1f"
+
+# Limites da busca aproximada: total de itens de listas invertidas percorridos e
+# quantidade de candidatos que recebem o cálculo exato de similaridade
+MAX_POSTINGS_SCANNED = 3000
+MAX_CANDIDATES = 20
+MIN_SIMILARITY = 0.3
+
+
+def normalize_title(text):
+    text = unicodedata.normalize("NFKD", text.casefold())
+    chars = []
+    for char in text:
+        if unicodedata.combining(char):
+            continue
+        chars.append(char if char.isalnum() else " ")
+    return " ".join("".join(chars).split())
+
+
+def trigrams(norm):
+    padded = f"  {norm} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def trigram_key(trigram):
+    return zlib.crc32(trigram.encode("utf-8"))
+
+
+def similarity(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+# Gravação do arquivo do índice a partir de pares (QID, título).
+
+def build_index(entries, path):
+    unique = {}
+    for qid, label in entries:
+        norm = normalize_title(label)
+        if norm:
+            unique[(norm, qid)] = label
+    rows = sorted(unique.items())
+
+    blob = bytearray()
+    entry_offsets = array("I", [0])
+    postings_by_key = {}
+    for entry_id, ((norm, qid), label) in enumerate(rows):
+        blob += SEPARATOR.join((norm, qid, label)).encode("utf-8")
+        entry_offsets.append(len(blob))
+        for key in {trigram_key(t) for t in trigrams(norm)}:
+            postings_by_key.setdefault(key, []).append(entry_id)
+
+    tri_keys = array("I", sorted(postings_by_key))
+    tri_starts = array("I", [0])
+    postings = array("I")
+    for key in tri_keys:
+        postings.extend(postings_by_key[key])
+        tri_starts.append(len(postings))
+
+    offsets_off = HEADER.size
+    keys_off = offsets_off + entry_offsets.itemsize * len(entry_offsets)
+    starts_off = keys_off + tri_keys.itemsize * len(tri_keys)
+    postings_off = starts_off + tri_starts.itemsize * len(tri_starts)
+    blob_off = postings_off + postings.itemsize * len(postings)
+
+    header = HEADER.pack(
+        MAGIC, VERSION, len(rows), len(tri_keys), len(postings),
+        offsets_off, keys_off, starts_off, postings_off, blob_off, len(blob)
+    )
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        entry_offsets.tofile(f)
+        tri_keys.tofile(f)
+        tri_starts.tofile(f)
+        postings.tofile(f)
+        f.write(blob)
+    os.replace(tmp_path, path)
+    return len(rows)
+
+
+# Leitura do arquivo via mmap: nada é carregado além das páginas tocadas em
+# cada busca, então abrir o índice tem custo constante.
+
+class MappedTitles:
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+
+        (magic, version, self.size, n_keys, n_postings, offsets_off, keys_off,
+         starts_off, postings_off, blob_off, blob_len) = HEADER.unpack_from(view)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Arquivo de índice inválido: {path}")
+        if sys.byteorder != "little":
+            raise ValueError("O índice de títulos requer uma plataforma little-endian")
+
+        self._offsets = view[offsets_off:offsets_off + 4 * (self.size + 1)].cast("I")
+        self._keys = view[keys_off:keys_off + 4 * n_keys].cast("I")
+        self._starts = view[starts_off:starts_off + 4 * (n_keys + 1)].cast("I")
+        self._postings = view[postings_off:postings_off + 4 * n_postings].cast("I")
+        self._blob = view[blob_off:blob_off + blob_len]
+
+    def entry(self, entry_id):
+        start, end = self._offsets[entry_id], self._offsets[entry_id + 1]
+        return bytes(self._blob[start:end]).decode("utf-8").split(SEPARATOR)
+
+    def norm(self, entry_id):
+        return self.entry(entry_id)[0]
+
+    def lower_bound(self, norm):
+        lo, hi = 0, self.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.norm(mid) < norm:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def postings(self, trigram):
+        key = trigram_key(trigram)
+        lo, hi = 0, len(self._keys)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._keys[mid] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self._keys) and self._keys[lo] == key:
+            return self._postings[self._starts[lo]:self._starts[lo + 1]]
+        return self._postings[0:0]
+
+    def close(self):
+        for view in (self._offsets, self._keys, self._starts, self._postings, self._blob):
+            view.release()
+        self._mmap.close()
+        self._file.close()
+
+
+class TitleIndex:
+    def __init__(self, path=INDEX_PATH, flush_size=DELTA_FLUSH_SIZE):
+        self.path = Path(path)
+        self.flush_size = flush_size
+        self._lock = threading.RLock()
+        self._base = None
+        self._delta = {}
+        self._flushing = False
+        self._open()
+
+    def _open(self):
+        if self._base is not None:
+            self._base.close()
+            self._base = None
+        if self.path.exists():
+            try:
+                self._base = MappedTitles(self.path)
+            except (OSError, ValueError) as e:
+                print(f"Não foi possível abrir o índice de títulos: {e}")
+
+    def __len__(self):
+        with self._lock:
+            return (self._base.size if self._base else 0) + len(self._delta)
+
+    # Filmes sem rótulo chegam com o próprio QID como nome e não são indexados
+
+    def add(self, qid, label):
+        if not label or label == qid:
+            return
+        norm = normalize_title(label)
+        if not norm:
+            return
+
+        with self._lock:
+            if (norm, qid) in self._delta or self._base_contains(norm, qid):
+                return
+            self._delta[(norm, qid)] = (label, trigrams(norm))
+            if len(self._delta) >= self.flush_size and not self._flushing:
+                threading.Thread(target=self.flush, daemon=True).start()
+
+    # Regrava o arquivo com o delta incorporado. A reconstrução acontece fora do
+    # lock, para não bloquear buscas; só a troca do mapeamento é feita com ele.
+
+    def flush(self):
+        with self._lock:
+            if self._flushing or not self._delta:
+                return
+            self._flushing = True
+            pending = dict(self._delta)
+            base = self._base
+
+        try:
+            entries = [(qid, label) for (norm, qid), (label, _) in pending.items()]
+            if base is not None:
+                entries.extend((qid, label) for norm, qid, label in map(base.entry, range(base.size)))
+            build_index(entries, self.path)
+
+            with self._lock:
+                self._open()
+                for key in pending:
+                    self._delta.pop(key, None)
+        except OSError as e:
+            print(f"Falha ao gravar o índice de títulos: {e}")
+        finally:
+            self._flushing = False
+
+    def exact(self, text):
+        norm = normalize_title(text)
+        return [match for match in self.prefix(text, limit=50) if match[2] == norm]
+
+    def prefix(self, text, limit=10):
+        norm = normalize_title(text)
+        if not norm:
+            return []
+
+        results = []
+        with self._lock:
+            if self._base is not None:
+                i = self._base.lower_bound(norm)
+                while i < self._base.size and len(results) < limit * 5:
+                    entry_norm, qid, label = self._base.entry(i)
+                    if not entry_norm.startswith(norm):
+                        break
+                    results.append((qid, label, entry_norm))
+                    i += 1
+            for (entry_norm, qid), (label, _) in self._delta.items():
+                if entry_norm.startswith(norm):
+                    results.append((qid, label, entry_norm))
+
+        results.sort(key=lambda r: (len(r[2]), r[2]))
+        return results[:limit]
+
+    def fuzzy(self, text, limit=10, min_similarity=MIN_SIMILARITY):
+        norm = normalize_title(text)
+        if not norm:
+            return []
+        query_trigrams = trigrams(norm)
+
+        scored = []
+        with self._lock:
+            if self._base is not None:
+                # Os candidatos são as entradas que mais compartilham trigramas com a
+                # busca, contados a partir das listas mais raras primeiro para não
+                # percorrer listas enormes de trigramas comuns.
+                hits = Counter()
+                scanned = 0
+                for posting in sorted((self._base.postings(t) for t in query_trigrams), key=len):
+                    if scanned and scanned + len(posting) > MAX_POSTINGS_SCANNED:
+                        break
+                    hits.update(posting[:MAX_POSTINGS_SCANNED].tolist())
+                    scanned += len(posting)
+                for entry_id in heapq.nlargest(MAX_CANDIDATES, hits, key=hits.__getitem__):
+                    entry_norm, qid, label = self._base.entry(entry_id)
+                    score = similarity(query_trigrams, trigrams(entry_norm))
+                    if score >= min_similarity:
+                        scored.append((score, qid, label))
+            for (entry_norm, qid), (label, entry_trigrams) in self._delta.items():
+                score = similarity(query_trigrams, entry_trigrams)
+                if score >= min_similarity:
+                    scored.append((score, qid, label))
+
+        scored.sort(key=lambda s: -s[0])
+        return [(qid, label, score) for score, qid, label in scored[:limit]]
+
+    def suggest(self, text, limit=8):
+        suggestions = {}
+        for qid, label, _ in self.prefix(text, limit):
+            suggestions[qid] = label
+        if len(suggestions) < limit:
+            for qid, label, _ in self.fuzzy(text, limit):
+                suggestions.setdefault(qid, label)
+        return list(suggestions.items())[:limit]
+
+    def _base_contains(self, norm, qid):
+        if self._base is None:
+            return False
+        i = self._base.lower_bound(norm)
+        while i < self._base.size:
+            entry_norm, entry_qid, _ = self._base.entry(i)
+            if entry_norm != norm:
+                return False
+            if entry_qid == qid:
+                return True
+            i += 1
+        return False
+
+
+title_index = TitleIndex()
+
+
+# Construção do índice a partir de um dump de rótulos em TSV (QID<TAB>título),
+# por exemplo exportado de uma consulta SPARQL ou de um dump da Wikidata:
+#     python src/title_index.py rotulos.tsv [--output data/title_index.bin]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Constrói o índice local de títulos de filmes.")
+    parser.add_argument("labels", help="arquivo TSV com QID e título em cada linha")
+    parser.add_argument("--output", default=INDEX_PATH, help="arquivo de saída do índice")
+    args = parser.parse_args()
+
+    def read_labels(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                parts = line.rstrip("\n").split("\t")
+                if len(parts) >= 2 and parts[0]:
+                    yield parts[0].rsplit("/", 1)[-1], parts[1]
+
+    total = build_index(read_labels(args.labels), args.output)
+    print(f"Índice com {total} títulos gravado em {args.output}")
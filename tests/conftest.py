@@ -0,0 +1,115 @@
+# Configuração comum dos testes.
+# Os módulos do app leem a configuração do ambiente na importação, então os caches
+# em disco são desativados (ou apontados para um diretório temporário) antes de
+# qualquer import de src. O fixture `stub_endpoint` sobe um servidor HTTP local
+# que conta as requisições recebidas e responde com o que o teste definir.
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+current_dir = Path(__file__).parent
+parent_dir = current_dir.parent
+sys.path.append(str(parent_dir))
+
+WORK_DIR = Path(tempfile.mkdtemp(prefix="websemantica-testes-"))
+
+os.environ.update({
+    "SPARQL_BACKEND": "wikidata",
+    "LABEL_CACHE_PATH": "",
+    "ANALYTICS_PATH": "",
+    "SNAPSHOT_PATH": str(WORK_DIR / "snapshot.bin"),
+    "SNAPSHOT_REFRESH_INTERVAL": "0",
+    "TITLE_INDEX_PATH": str(WORK_DIR / "title_index.bin"),
+    "IMAGE_CACHE_DIR": str(WORK_DIR / "images"),
+})
+os.environ.pop("SPARQL_CACHE_PATH", None)
+os.environ.pop("INSTRUMENTATION_EXPORT_PATH", None)
+os.environ.pop("INSTRUMENTATION_PORT", None)
+
+
+# Endpoint local: `respond(path, query)` devolve (status, cabeçalhos, corpo) e pode
+# ser trocado pelo teste; `delay` segura cada resposta para que requisições
+# simultâneas se sobreponham, e `body_delay` segura o corpo no meio, depois dos
+# cabeçalhos. `requests` guarda (método, caminho, consulta) de cada requisição.
+
+class StubEndpoint:
+    def __init__(self):
+        self.requests = []
+        self.delay = 0.0
+        self.body_delay = 0.0
+        self.respond = lambda path, query: (200, {"Content-Type": "text/plain"}, b"")
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    @property
+    def count(self):
+        with self._lock:
+            return len(self.requests)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                self._answer("GET", parsed.path, parse_qs(parsed.query).get("query", [""])[0])
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode("utf-8")
+                self._answer("POST", urlparse(self.path).path, parse_qs(body).get("query", [""])[0])
+
+            def _answer(self, method, path, query):
+                with stub._lock:
+                    stub.requests.append((method, path, query))
+                if stub.delay:
+                    time.sleep(stub.delay)
+                status, headers, body = stub.respond(path, query)
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if stub.body_delay:
+                    self.wfile.write(body[:len(body) // 2])
+                    self.wfile.flush()
+                    time.sleep(stub.body_delay)
+                    body = body[len(body) // 2:]
+                try:
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+@pytest.fixture
+def stub_endpoint():
+    stub = StubEndpoint().start()
+    yield stub
+    stub.stop()
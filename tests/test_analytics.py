@@ -0,0 +1,80 @@
+import time
+
+from src.analytics import Analytics, SEARCH, RESULTS, FILM, TITLE
+from src.models import Film, Person
+
+FILMS = (
+    Film("Q1025", "Heat", 1995, Person("Q1", "Michael Mann"), genres=("crime",), genre_ids=("Q959790",)),
+    Film("Q2001", "Thief", 1981, Person("Q1", "Michael Mann"), genres=("crime",), genre_ids=("Q959790",)),
+)
+
+
+def analytics_at(tmp_path, **options):
+    return Analytics(path=str(tmp_path / "analytics.sqlite"), **options)
+
+
+def raw_counts(analytics):
+    return (
+        analytics._disk.execute("SELECT COUNT(*) FROM events").fetchone()[0],
+        analytics._disk.execute("SELECT COUNT(*) FROM event_items").fetchone()[0],
+    )
+
+
+def test_summary_reads_the_rollup_lag_without_scanning_events(tmp_path):
+    analytics = analytics_at(tmp_path)
+    for title in ("Heat", "heat", "Alien"):
+        analytics.record("s1", SEARCH, title)
+    analytics.flush()
+
+    statements = []
+    analytics._disk.set_trace_callback(statements.append)
+    assert analytics.summary()["aguardando_agregacao"] == 3
+    analytics._disk.set_trace_callback(None)
+    assert statements and not any("events" in statement for statement in statements)
+
+    analytics.rollup()
+    assert analytics.summary()["aguardando_agregacao"] == 0
+    assert analytics.top(TITLE, 0)["count"].tolist() == [2, 1]
+
+
+def test_rolled_up_events_are_pruned_after_the_retention(tmp_path):
+    analytics = analytics_at(tmp_path, event_retention=0)
+    analytics.record("s1", RESULTS, "director:Q1", "Michael Mann", FILMS)
+    analytics.record("s1", SEARCH, "Heat")
+    analytics.flush()
+    time.sleep(0.01)
+
+    assert analytics.rollup() == 2
+    assert raw_counts(analytics) == (0, 0)
+    assert analytics.stats["removidos"] == 2
+    assert sorted(analytics.top(FILM, 0)["value"]) == ["Q1025", "Q2001"]
+
+    # Os ids não são reaproveitados depois da remoção: a marca d'água continua válida
+    analytics.record("s2", SEARCH, "Heat")
+    analytics.flush()
+    assert analytics.summary()["aguardando_agregacao"] == 1
+    assert analytics.rollup() == 1
+    assert analytics.top(TITLE, 0)["count"].tolist() == [2]
+
+
+def test_events_within_the_retention_are_kept(tmp_path):
+    analytics = analytics_at(tmp_path, event_retention=3600)
+    analytics.record("s1", RESULTS, "director:Q1", "Michael Mann", FILMS)
+    analytics.flush()
+    analytics.rollup()
+
+    events, items = raw_counts(analytics)
+    assert events == 1
+    assert items > 0
+    assert analytics.summary()["aguardando_agregacao"] == 0
+
+
+def test_lag_is_known_when_reopening_an_existing_log(tmp_path):
+    first = analytics_at(tmp_path)
+    first.record("s1", SEARCH, "Heat")
+    first.record("s1", SEARCH, "Alien")
+    first.flush()
+    first._disk.execute("DELETE FROM rollup_state WHERE name = 'gravados'")
+
+    reopened = analytics_at(tmp_path)
+    assert reopened.summary()["aguardando_agregacao"] == 2
@@ -0,0 +1,52 @@
+from pathlib import Path
+
+from streamlit.testing.v1 import AppTest
+
+from src import api
+
+APP = str(Path(__file__).parent.parent / "src" / "app.py")
+
+ENTITY = "http://www.wikidata.org/entity/"
+
+
+def film_row(title, film, year):
+    return {
+        "title": title,
+        "film": ENTITY + film,
+        "filmName": title,
+        "year": year,
+        "director": ENTITY + "Q1",
+        "directorName": "Diretor",
+        "actorTuples": "",
+        "genres": "drama",
+        "genreIds": "Q130232",
+    }
+
+
+# "Heat" tem dois filmes (um deles repetido nas linhas, como acontece com vários
+# gêneros ou atores); "Filme Inexistente" não é encontrado
+
+BATCH = {
+    "Heat": [film_row("Heat", "Q1025", 1995), film_row("Heat", "Q1025", 1995), film_row("Heat", "Q2001", 1986)],
+    "Filme Inexistente": [],
+    "Alien": [film_row("Alien", "Q103569", 1979)],
+}
+
+
+def fake_batch_title_query(titles, language):
+    for title in titles:
+        yield title, BATCH[title]
+
+
+def test_batch_search_has_one_row_per_film_found(monkeypatch):
+    monkeypatch.setattr(api, "execute_batch_title_query", fake_batch_title_query)
+    at = AppTest.from_file(APP, default_timeout=60).run()
+
+    at.file_uploader(key="batch_csv").set_value(("titulos.csv", "titulo\nHeat\nFilme Inexistente\nAlien\n".encode("utf-8"), "text/csv")).run()
+    at.button(key="batch_button").click().run()
+
+    assert not at.exception
+    results = at.session_state.batch_results
+    assert list(results["Título"]) == ["Heat", "Heat", "Filme Inexistente", "Alien"]
+    assert list(results["ID Wikidata"].fillna("")) == ["Q1025", "Q2001", "", "Q103569"]
+    assert list(results["Ano"].fillna(0)) == [1995, 1986, 0, 1979]
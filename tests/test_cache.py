@@ -0,0 +1,108 @@
+import pytest
+
+from src import cache as cache_module
+from src.cache import QueryCache, cache_key
+
+QUERY = 'SELECT ?film WHERE { ?film rdfs:label "Heat"@en }'
+VALUE = [{"film": "http://www.wikidata.org/entity/Q1025"}]
+
+
+# Relógio controlado pelo teste: `clock.now` é o time.time() visto pelo cache
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, "time", clock)
+    return clock
+
+
+def test_equivalent_queries_share_a_key():
+    assert cache_key("SELECT ?film\n  WHERE { ?film ?p ?o }") == cache_key("SELECT ?film WHERE { ?film ?p ?o }")
+    assert cache_key('SELECT ?x WHERE { ?x rdfs:label "a  b" }') != cache_key('SELECT ?x WHERE { ?x rdfs:label "a b" }')
+
+
+def test_entry_expires_after_ttl(clock):
+    cache = QueryCache(ttl=60, stale_ttl=60, disk_path=None)
+    cache.put(QUERY, VALUE)
+
+    clock.now += 59
+    assert cache.lookup(QUERY) == (VALUE, True)
+
+    clock.now += 2
+    assert cache.lookup(QUERY) == (None, False)
+    assert cache.stats()["expiracoes"] == 1
+    assert cache.stats()["entradas"] == 0
+
+
+def test_stale_entry_is_served_within_the_stale_window(clock):
+    cache = QueryCache(ttl=60, stale_ttl=600, disk_path=None)
+    cache.put(QUERY, VALUE)
+
+    clock.now += 120
+    assert cache.lookup(QUERY) == (VALUE, False)
+    assert cache.lookup(QUERY, allow_stale=False) == (None, False)
+    assert cache.stats()["hits_obsoletos"] == 1
+
+    clock.now += 600
+    assert cache.lookup(QUERY) == (None, False)
+    assert cache.stats()["entradas"] == 0
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = QueryCache(max_entries=2, disk_path=None)
+    cache.put("A", ["a"])
+    cache.put("B", ["b"])
+    cache.lookup("A")
+    cache.put("C", ["c"])
+
+    assert cache.lookup("B") == (None, False)
+    assert cache.lookup("A") == (["a"], True)
+    assert cache.lookup("C") == (["c"], True)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_byte_limit_evicts_and_skips_oversized_values(clock):
+    cache = QueryCache(max_bytes=100, disk_path=None)
+    cache.put("A", ["a"], size=60)
+    cache.put("B", ["b"], size=60)
+    cache.put("C", ["c"], size=500)
+
+    assert cache.lookup("A") == (None, False)
+    assert cache.lookup("B") == (["b"], True)
+    assert cache.lookup("C") == (None, False)
+    assert cache.stats()["bytes"] == 60
+
+
+def test_disk_tier_survives_a_new_instance(clock, tmp_path):
+    path = str(tmp_path / "cache" / "consultas.sqlite")
+    QueryCache(ttl=60, disk_path=path).put(QUERY, VALUE)
+
+    restarted = QueryCache(ttl=60, stale_ttl=600, disk_path=path)
+    assert restarted.lookup(QUERY) == (VALUE, True)
+    assert restarted.stats()["hits_disco"] == 1
+    # A entrada lida do disco passa a ficar também em memória
+    assert restarted.lookup(QUERY) == (VALUE, True)
+    assert restarted.stats()["hits_memoria"] == 1
+
+    clock.now += 120
+    assert QueryCache(ttl=60, stale_ttl=600, disk_path=path).lookup(QUERY) == (VALUE, False)
+
+
+def test_disk_tier_keeps_only_the_newest_entries(clock, tmp_path):
+    cache = QueryCache(disk_path=str(tmp_path / "consultas.sqlite"), disk_max_entries=2)
+    for query in ("A", "B", "C"):
+        cache.put(query, [query])
+        clock.now += 1
+
+    assert cache.stats()["entradas_disco"] == 2
+    restarted = QueryCache(disk_path=str(tmp_path / "consultas.sqlite"))
+    assert restarted.lookup("A") == (None, False)
+    assert restarted.lookup("C") == (["C"], True)
@@ -0,0 +1,120 @@
+import json
+import time
+from concurrent.futures import wait, ALL_COMPLETED
+
+import pytest
+
+from src import crawl
+from src.crawl import Crawler, JsonlWriter, ParquetWriter
+from src.models import Person
+
+ENTITY = "http://www.wikidata.org/entity/"
+
+# Grafo sintético: o diretor D0 dirigiu F0..F9; cada filme Fi tem os atores Ai e
+# A(i+1), e cada ator Ai também atuou no filme Gi (sem diretor)
+
+
+def film_row(film, director, actors):
+    return {
+        "film": ENTITY + film,
+        "filmName": f"Filme {film}",
+        "year": "2000",
+        "director": ENTITY + director if director else None,
+        "directorName": director,
+        "actorList": tuple(Person(actor, f"Ator {actor}") for actor in actors),
+        "genreList": ("drama",),
+        "genreIds": "Q130232",
+    }
+
+
+def fake_films_query(query, language, use_cache, priority):
+    time.sleep(0.002)
+    kind, qid = query.split(":")
+    if kind == "director":
+        return [film_row(f"F{i}", "D0", [f"A{i}", f"A{i + 1}"]) for i in range(10)]
+    if kind == "actor":
+        i = int(qid[1:])
+        films = [film_row(f"G{i}", None, [qid])]
+        if i < 10:
+            films.append(film_row(f"F{i}", "D0", [f"A{i}", f"A{i + 1}"]))
+        return films
+    return []
+
+
+@pytest.fixture(autouse=True)
+def fake_wikidata(monkeypatch):
+    monkeypatch.setattr(crawl, "entity_query", lambda kind, qid: f"{kind}:{qid}")
+    monkeypatch.setattr(crawl, "execute_films_query", fake_films_query)
+    monkeypatch.setattr(crawl, "CHECKPOINT_EVERY", 3)
+
+
+def jsonl_films(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line)["film"] for line in f]
+
+
+def full_crawl(output):
+    writer = JsonlWriter(output, append=False)
+    Crawler([("director", "D0")], 2, 100, 4, writer).run()
+    writer.close()
+    return jsonl_films(output)
+
+
+def test_checkpoints_are_not_skipped_when_several_queries_finish_together(tmp_path, monkeypatch):
+    saved = []
+    monkeypatch.setattr(Crawler, "save_checkpoint", lambda self, in_flight: saved.append(len(in_flight)))
+    # Cada rodada do wait() recebe todas as consultas em andamento: depois da
+    # semente (D0), as 11 consultas de atores terminam em grupos de 4, 4 e 3
+    monkeypatch.setattr(crawl, "wait", lambda futures, return_when: wait(futures, return_when=ALL_COMPLETED))
+    writer = JsonlWriter(tmp_path / "coleta.jsonl", append=False)
+    Crawler([("director", "D0")], 2, 100, 4, writer, tmp_path / "coleta.checkpoint.json").run()
+    writer.close()
+
+    # Concluídas: 1, 5, 9 e 12. Checkpoints com 5, 9 e 12 (3 ou mais desde o último)
+    # e o final; com `completed % CHECKPOINT_EVERY`, só 9 e 12 contariam
+    assert len(saved) == 4
+
+
+@pytest.mark.parametrize("output_name, writer_class", [("coleta.jsonl", JsonlWriter), ("coleta.parquet", ParquetWriter)])
+def test_resume_after_interruption_does_not_duplicate_films(tmp_path, monkeypatch, output_name, writer_class):
+    expected = sorted(full_crawl(tmp_path / "referencia.jsonl"))
+
+    # Simula uma interrupção depois do primeiro checkpoint: a coleta continua
+    # gravando a saída, mas o checkpoint guardado é o primeiro.
+    checkpoint = tmp_path / "coleta.checkpoint.json"
+    original_save = Crawler.save_checkpoint
+
+    def first_only(self, in_flight):
+        if not checkpoint.exists():
+            original_save(self, in_flight)
+
+    monkeypatch.setattr(Crawler, "save_checkpoint", first_only)
+    output = tmp_path / output_name
+    writer = writer_class(str(output), append=False)
+    Crawler([("director", "D0")], 2, 100, 4, writer, str(checkpoint)).run()
+    writer.close()
+    monkeypatch.setattr(Crawler, "save_checkpoint", original_save)
+
+    writer = writer_class(str(output), append=True)
+    Crawler.from_checkpoint(str(checkpoint), 100, 4, writer).run()
+    writer.close()
+
+    if writer_class is JsonlWriter:
+        films = jsonl_films(output)
+    else:
+        import pandas as pd
+        films = list(pd.concat(pd.read_parquet(part) for part in sorted(output.glob("part-*.parquet")))["film"])
+    assert len(films) == len(set(films))
+    assert sorted(films) == expected
+
+
+def test_resume_drops_a_truncated_last_line(tmp_path):
+    output = tmp_path / "coleta.jsonl"
+    output.write_text('{"film": "F1"}\n{"film": "F2"}\n{"fil', encoding="utf-8")
+
+    writer = JsonlWriter(output, append=True)
+    assert writer.existing_films() == {"F1", "F2"}
+    writer.write({"film": "F3"})
+    writer.close()
+
+    assert jsonl_films(output) == ["F1", "F2", "F3"]
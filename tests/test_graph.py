@@ -0,0 +1,32 @@
+from src.graph import EntityGraph
+from src.models import Film, Person
+
+
+def film(qid, year, director, actors):
+    return Film(qid=qid, name=qid, year=year, director=Person(director, director), actors=tuple(Person(a, a) for a in actors), genres=())
+
+
+def test_filmography_is_partial_until_marked_complete():
+    graph = EntityGraph()
+    graph.add_films([film("Q1", 1990, "D1", ["A1"]), film("Q2", 2000, "D2", ["A1"])])
+
+    films, complete = graph.films_for("actor", "A1")
+    assert [f.qid for f in films] == ["Q2", "Q1"]
+    assert complete is False
+
+    graph.add_films([film("Q3", 2010, "D1", ["A2"])])
+    graph.mark_complete("actor", "A1", ["Q1", "Q2"])
+    assert graph.films_for("actor", "A1")[1] is True
+    assert graph.summary()["respostas_locais"] == 1
+
+
+def test_evicting_a_film_makes_the_filmography_partial_again():
+    graph = EntityGraph(max_films=2)
+    graph.add_films([film("Q1", 1990, "D1", ["A1"]), film("Q2", 2000, "D1", ["A1"])])
+    graph.mark_complete("director", "D1", ["Q1", "Q2"])
+
+    graph.add_films([film("Q3", 2010, "D2", ["A2"])])
+
+    films, complete = graph.films_for("director", "D1")
+    assert [f.qid for f in films] == ["Q2"]
+    assert complete is False
@@ -0,0 +1,135 @@
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+from src import api, http_client
+from src.http_client import (
+    SparqlClient,
+    SparqlThrottledError,
+    SparqlTimeoutError,
+    SparqlUnavailableError,
+    MAX_GET_QUERY_CHARS,
+    BACKOFF_BASE,
+)
+from src.resilience import RateLimiter
+
+QUERY = "SELECT ?film WHERE { ?film wdt:P31 wd:Q11424 } LIMIT 1"
+
+RESULT = {
+    "head": {"vars": ["film"]},
+    "results": {"bindings": [{"film": {"type": "uri", "value": "http://www.wikidata.org/entity/Q25188"}}]}
+}
+
+OK = (200, {"Content-Type": "application/sparql-results+json"}, json.dumps(RESULT).encode("utf-8"))
+
+
+# Respostas em sequência: cada requisição recebe a próxima; a última se repete
+
+def answers(*responses):
+    remaining = list(responses)
+    return lambda path, query: remaining.pop(0) if len(remaining) > 1 else remaining[0]
+
+
+# As esperas entre tentativas são registradas em vez de dormidas
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(http_client, "time", SimpleNamespace(time=time.time, sleep=sleeps.append))
+    return sleeps
+
+
+@pytest.fixture
+def closed(monkeypatch):
+    closed = []
+    close = requests.Response.close
+
+    def tracking_close(response):
+        closed.append(response.status_code)
+        close(response)
+
+    monkeypatch.setattr(requests.Response, "close", tracking_close)
+    return closed
+
+
+def test_retry_after_is_honoured_once_before_success(stub_endpoint, sleeps):
+    stub_endpoint.respond = answers((429, {"Retry-After": "2"}, b""), OK)
+    client = SparqlClient(stub_endpoint.url, api.HEADERS, max_retries=3)
+
+    response = client.execute(QUERY)
+
+    assert response.status_code == 200
+    assert response.retries == 1
+    assert stub_endpoint.count == 2
+    assert len(sleeps) == 1
+    assert 2 <= sleeps[0] <= 2 + BACKOFF_BASE
+
+
+@pytest.mark.parametrize("status", [502, 503, 504])
+def test_transient_server_errors_are_retried_with_backoff(stub_endpoint, sleeps, status):
+    stub_endpoint.respond = answers((status, {}, b""), OK)
+    client = SparqlClient(stub_endpoint.url, api.HEADERS, max_retries=3)
+
+    assert client.execute(QUERY).retries == 1
+    assert stub_endpoint.count == 2
+    assert len(sleeps) == 1
+    assert 0 <= sleeps[0] <= 2 * BACKOFF_BASE
+
+
+def test_exhausted_retries_raise_and_close_every_response(stub_endpoint, sleeps, closed):
+    stub_endpoint.respond = answers((429, {"Retry-After": "1"}, b""))
+    client = SparqlClient(stub_endpoint.url, api.HEADERS, max_retries=2)
+
+    with pytest.raises(SparqlThrottledError) as error:
+        client.execute(QUERY, stream=True)
+
+    assert error.value.retries == 2
+    assert error.value.retry_after == 1
+    assert stub_endpoint.count == 3
+    assert len(sleeps) == 2
+    assert closed == [429, 429, 429]
+
+
+def test_retry_after_beyond_the_limit_is_not_waited(stub_endpoint, sleeps):
+    stub_endpoint.respond = answers((503, {"Retry-After": "3600"}, b""))
+    client = SparqlClient(stub_endpoint.url, api.HEADERS, max_retries=3)
+
+    with pytest.raises(SparqlThrottledError):
+        client.execute(QUERY)
+
+    assert stub_endpoint.count == 1
+    assert sleeps == []
+
+
+def test_long_queries_switch_from_get_to_post(stub_endpoint):
+    stub_endpoint.respond = answers(OK)
+    client = SparqlClient(stub_endpoint.url, api.HEADERS, max_retries=0)
+    long_query = QUERY + " #" + "x" * MAX_GET_QUERY_CHARS
+
+    client.execute(QUERY)
+    client.execute(long_query)
+
+    assert [(method, query) for method, _, query in stub_endpoint.requests] == [("GET", QUERY), ("POST", long_query)]
+
+
+def test_read_timeout_while_streaming_the_body_is_a_timeout(stub_endpoint):
+    stub_endpoint.respond = answers(OK)
+    stub_endpoint.body_delay = 1
+    client = SparqlClient(stub_endpoint.url, api.HEADERS, read_timeout=0.2, max_retries=0)
+    backend = api.WikidataBackend(client, RateLimiter(rate=1000, burst=1000), "json")
+
+    with pytest.raises(SparqlTimeoutError):
+        backend.execute(QUERY, {})
+
+
+def test_connection_failure_is_unavailable(sleeps):
+    client = SparqlClient("http://127.0.0.1:9/sparql", api.HEADERS, max_retries=1)
+
+    with pytest.raises(SparqlUnavailableError) as error:
+        client.execute(QUERY)
+
+    assert error.value.retries == 1
+    assert len(sleeps) == 1
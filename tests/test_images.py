@@ -0,0 +1,73 @@
+import io
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from src.images import ThumbnailCache, DEFAULT_IMAGE
+
+SVG = b'<svg xmlns="http://www.w3.org/2000/svg" width="10" height="10"><rect width="10" height="10"/></svg>'
+
+
+def png_bytes(width=300, height=450):
+    output = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 30, 30)).save(output, format="PNG")
+    return output.getvalue()
+
+
+# Stand-in das imagens: Special:FilePath (com ?width) devolve sempre uma miniatura
+# PNG, como o Commons faz inclusive para arquivos .svg; outros caminhos devolvem o
+# arquivo como está
+
+def images(path, query):
+    if "/Special:FilePath/" in path:
+        return 200, {"Content-Type": "image/png"}, png_bytes()
+    if path.endswith(".svg"):
+        return 200, {"Content-Type": "image/svg+xml"}, SVG
+    return 200, {"Content-Type": "text/html; charset=utf-8"}, b"<html>erro</html>"
+
+
+@pytest.fixture
+def cache(stub_endpoint, tmp_path):
+    stub_endpoint.respond = images
+    return ThumbnailCache(directory=tmp_path, width=150, workers=2, timeout=5)
+
+
+def test_svg_logo_thumbnail_is_cached_as_png(stub_endpoint, cache):
+    url = f"{stub_endpoint.url}/wiki/Special:FilePath/Logo%20do%20filme.svg"
+
+    path = cache.fetch_many([url])[url]
+
+    assert path != DEFAULT_IMAGE
+    assert Path(path).suffix == ".png"
+    with Image.open(path) as image:
+        assert image.format == "PNG"
+        assert image.width == 150
+
+
+def test_cached_thumbnail_is_served_without_new_request(stub_endpoint, cache):
+    url = f"{stub_endpoint.url}/wiki/Special:FilePath/Poster.jpg"
+
+    first = cache.fetch_many([url])[url]
+    second = cache.fetch_many([url])[url]
+
+    assert first == second
+    assert Path(first).suffix == ".png"
+    assert stub_endpoint.count == 1
+    assert cache.stats["hits"] == 1
+
+
+def test_real_svg_keeps_svg_suffix(stub_endpoint, cache):
+    url = f"{stub_endpoint.url}/imagens/Logo.svg"
+
+    path = cache.fetch_many([url])[url]
+
+    assert Path(path).suffix == ".svg"
+    assert Path(path).read_text(encoding="utf-8").startswith("<svg")
+
+
+def test_non_image_response_falls_back_to_default_image(stub_endpoint, cache):
+    url = f"{stub_endpoint.url}/imagens/Pagina.html"
+
+    assert cache.fetch_many([url])[url] == DEFAULT_IMAGE
+    assert cache.stats["falhas"] == 1
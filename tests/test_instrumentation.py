@@ -0,0 +1,67 @@
+from pathlib import Path
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+from src.instrumentation import Instrumentation, instrumentation
+
+APP = str(Path(__file__).parent.parent / "src" / "app.py")
+
+
+def test_prometheus_export_is_a_summary_with_sum_and_count():
+    metrics = Instrumentation(enabled=True)
+    metrics.record_query("films", 0.5, "rede", rows=3, size=100)
+    metrics.record_query("films", 0.25, "cache")
+    metrics.record_render("pagina", 0.1)
+
+    lines = metrics.to_prometheus().splitlines()
+
+    assert "# TYPE wikidata_sparql_query_seconds summary" in lines
+    assert 'wikidata_sparql_query_seconds_sum{template="films"} 0.75' in lines
+    assert 'wikidata_sparql_query_seconds_count{template="films"} 2' in lines
+    assert 'wikidata_render_seconds_count{name="pagina"} 1' in lines
+    assert not any(line.startswith("wikidata_sparql_query_total") for line in lines)
+
+    # Cada métrica tem uma única linha # TYPE, seguida de todas as suas amostras
+    families = [line.split()[2] for line in lines if line.startswith("# TYPE")]
+    assert len(families) == len(set(families))
+    current = None
+    for line in lines:
+        if line.startswith("# TYPE"):
+            current = line.split()[2]
+        else:
+            assert line.split("{", 1)[0] in (current, f"{current}_sum", f"{current}_count")
+
+
+def open_performance_panel():
+    at = AppTest.from_file(APP, default_timeout=60).run()
+    at.button(key="stats_button").click().run()
+    assert not at.exception
+    return at
+
+
+@pytest.fixture
+def restore_instrumentation():
+    enabled = instrumentation.enabled
+    yield
+    instrumentation.enabled = enabled
+
+
+def test_toggle_changes_instrumentation_only_when_switched(restore_instrumentation):
+    instrumentation.enabled = True
+    first = open_performance_panel()
+    second = open_performance_panel()
+
+    first.toggle(key="instrumentation_toggle").set_value(False).run()
+    assert instrumentation.enabled is False
+
+    # A outra sessão ainda tinha o interruptor ligado: redesenhá-la não religa a
+    # instrumentação, e o interruptor passa a mostrar o estado atual
+    second.run()
+    assert instrumentation.enabled is False
+    assert second.toggle(key="instrumentation_toggle").value is False
+
+    second.toggle(key="instrumentation_toggle").set_value(True).run()
+    assert instrumentation.enabled is True
+    first.run()
+    assert first.toggle(key="instrumentation_toggle").value is True
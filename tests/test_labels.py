@@ -0,0 +1,63 @@
+from src.labels import labeled_table, table_qids
+from src.models import Film, Person
+from src.results import ResultTable
+
+ENTITY = "http://www.wikidata.org/entity/"
+
+
+def films_table():
+    return ResultTable(
+        ["film", "year", "director", "actors", "genreIds"],
+        {
+            "film": [ENTITY + "Q1", ENTITY + "Q10"],
+            "year": ["2001", None],
+            "director": [ENTITY + "Q2", None],
+            "actors": ["Q3 Q4 Q3", None],
+            "genreIds": ["Q5 Q6 Q7", None],
+        }
+    )
+
+
+# Nomes com os separadores das antigas strings concatenadas (" | " e ", ")
+LABELS = {
+    "Q1": "Tom | Jerry, o filme",
+    "Q2": "Diretor, Jr.",
+    "Q3": "Smith, Jr.",
+    "Q4": "A | B",
+    "Q5": "drama, romance",
+    "Q6": "ação",
+    "Q7": "ação",
+}
+
+
+def test_names_with_separators_reach_the_film_intact():
+    film = Film.from_row(list(labeled_table(films_table(), LABELS))[0])
+
+    assert film.name == "Tom | Jerry, o filme"
+    assert film.year == 2001
+    assert (film.director.qid, film.director.name) == ("Q2", "Diretor, Jr.")
+    assert [(actor.qid, actor.name) for actor in film.actors] == [("Q3", "Smith, Jr."), ("Q4", "A | B")]
+    assert film.genres == ("drama, romance", "ação")
+    assert film.genre_ids == ("Q5", "Q6", "Q7")
+
+
+def test_cast_and_genres_are_tuples_without_strings():
+    row = list(labeled_table(films_table(), LABELS))[0]
+
+    assert "actorTuples" not in row and "genres" not in row
+    assert all(isinstance(actor, Person) for actor in row["actorList"])
+    assert row["genreList"] == ("drama, romance", "ação")
+
+
+def test_missing_labels_fall_back_to_qids_and_empty_columns_to_empty_tuples():
+    rows = list(labeled_table(films_table(), {}))
+
+    first = Film.from_row(rows[0])
+    assert first.name == "Q1"
+    assert [actor.name for actor in first.actors] == ["Q3", "Q4"]
+    second = Film.from_row(rows[1])
+    assert (second.actors, second.genres, second.director) == ((), (), None)
+
+
+def test_table_qids_lists_every_entity_once():
+    assert table_qids(films_table()) == ["Q1", "Q10", "Q2", "Q3", "Q4", "Q5", "Q6", "Q7"]
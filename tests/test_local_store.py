@@ -0,0 +1,159 @@
+import json
+import re
+
+import pytest
+
+from src import api, local_store
+from src.local_store import LocalStore, import_dump
+from src.queries import get_films_query, get_labels_query
+from src.resilience import RateLimiter
+
+ENTITY = "http://www.wikidata.org/entity/"
+PROP = "http://www.wikidata.org/prop/direct/"
+LABEL = "http://www.w3.org/2000/01/rdf-schema#label"
+
+
+def claim(prop, value, rank="normal"):
+    if isinstance(value, str) and value.startswith("Q"):
+        value = {"entity-type": "item", "id": value}
+    return {"mainsnak": {"snaktype": "value", "property": prop, "datavalue": {"value": value}}, "rank": rank}
+
+
+def entity(qid, labels, **claims):
+    return json.dumps({
+        "id": qid,
+        "labels": {language: {"language": language, "value": label} for language, label in labels.items()},
+        "claims": {prop: statements for prop, statements in claims.items()},
+    })
+
+
+# Dump JSON (uma entidade por linha, como o dump oficial): Heat, com um segundo
+# diretor de classificação normal, ignorado diante do preferido, e as pessoas e o
+# gênero citados pelo filme
+JSON_DUMP = "\n".join([
+    "[",
+    entity(
+        "Q1025", {"en": "Heat", "pt": "Fogo Contra Fogo", "de": "Heat"},
+        P31=[claim("P31", "Q11424")],
+        P57=[claim("P57", "Q1", "preferred"), claim("P57", "Q9")],
+        P161=[claim("P161", "Q2"), claim("P161", "Q3")],
+        P577=[claim("P577", {"time": "+1995-12-15T00:00:00Z"})],
+        P18=[claim("P18", "Heat_poster.jpg")],
+        P136=[claim("P136", "Q959790")],
+    ) + ",",
+    entity("Q1", {"en": "Michael Mann", "pt": "Michael Mann"}) + ",",
+    entity("Q2", {"en": "Al Pacino"}) + ",",
+    entity("Q3", {"en": "Robert De Niro"}) + ",",
+    entity("Q9", {"en": "Someone Else"}) + ",",
+    entity("Q959790", {"en": "crime film", "pt": "filme policial"}),
+    "]",
+]) + "\n"
+
+# Dump N-Triples (wdt:): Thief, do mesmo diretor e com um dos mesmos atores
+NT_DUMP = "\n".join([
+    f"<{ENTITY}Q2001> <{PROP}P31> <{ENTITY}Q11424> .",
+    f"<{ENTITY}Q2001> <{PROP}P57> <{ENTITY}Q1> .",
+    f"<{ENTITY}Q2001> <{PROP}P161> <{ENTITY}Q2> .",
+    f'<{ENTITY}Q2001> <{PROP}P577> "1981-03-27T00:00:00Z"^^<http://www.w3.org/2001/XMLSchema#dateTime> .',
+    f'<{ENTITY}Q2001> <{LABEL}> "Thief"@en .',
+    f'<{ENTITY}Q2001> <{LABEL}> "Profissão: Ladrão"@pt .',
+    f'<{ENTITY}Q2001> <{LABEL}> "Le Solitaire"@fr .',
+    f'<{ENTITY}Q1> <{LABEL}> "Michael Mann"@en .',
+    f'<{ENTITY}Q2> <{LABEL}> "Al Pacino"@en .',
+]) + "\n"
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = LocalStore(str(tmp_path / "local_store.sqlite"))
+    (tmp_path / "filmes.json").write_text(JSON_DUMP, encoding="utf-8")
+    (tmp_path / "filmes.nt").write_text(NT_DUMP, encoding="utf-8")
+    assert import_dump(store, str(tmp_path / "filmes.json"), ["pt"]) == 1
+    assert import_dump(store, str(tmp_path / "filmes.nt"), ["pt"]) == 1
+    return store
+
+
+# O aplicativo com SPARQL_BACKEND=local: o backend vem de create_backend(), sobre a
+# base importada acima, e as consultas passam por execute_sparql_query
+
+@pytest.fixture
+def local(store, monkeypatch):
+    monkeypatch.setattr(api, "SPARQL_BACKEND", "local")
+    monkeypatch.setattr(local_store, "LocalStore", lambda: store)
+    monkeypatch.setattr(api, "backend", api.create_backend(api.SPARQL_BACKEND))
+    monkeypatch.setattr(api, "single_flight", api.SingleFlight())
+    return api.backend
+
+
+def test_dumps_are_imported(store):
+    assert store.summary() == {"filmes": 2, "diretores": 2, "atores": 3, "rotulos": 10}
+
+
+# Variáveis projetadas pelo SELECT: as que o Wikidata devolve no cabeçalho da resposta
+
+def projected_vars(query):
+    clause = query[query.index("SELECT") + len("SELECT"):query.index("WHERE")]
+    names, depth, alias = [], 0, False
+    for token in re.findall(r"[()]|\bAS\b|\?\w+", clause):
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            depth -= 1
+        elif token == "AS":
+            alias = True
+        elif depth == 0 or alias:
+            names.append(token[1:])
+            alias = False
+    return names
+
+
+def wikidata_columns(stub_endpoint, query):
+    stub_endpoint.respond = lambda path, text: (
+        200,
+        {"Content-Type": "text/tab-separated-values"},
+        ("\t".join("?" + name for name in projected_vars(text)) + "\n").encode("utf-8")
+    )
+    client = api.SparqlClient(stub_endpoint.url, api.HEADERS, max_retries=0)
+    backend = api.WikidataBackend(client, RateLimiter(rate=1000, burst=1000))
+    return backend.execute(query, {}).vars
+
+
+TEMPLATES = {
+    "title": (get_films_query("title", "Heat"), ["Q1025"]),
+    "actor": (get_films_query("actor", "Q2"), ["Q1025", "Q2001"]),
+    "director": (get_films_query("director", "Q1"), ["Q1025", "Q2001"]),
+    "labels": (get_labels_query(["Q2001", "Q1025", "Q3", "Q404"], "pt"), ["Q2001", "Q1025", "Q3", "Q404"]),
+}
+
+
+@pytest.mark.parametrize("template", TEMPLATES)
+def test_local_templates_have_the_wikidata_columns(local, stub_endpoint, template):
+    query, qids = TEMPLATES[template]
+
+    results = api.execute_sparql_query(query, use_cache=False)
+
+    assert local.name == "local"
+    assert results.vars == wikidata_columns(stub_endpoint, query)
+    key = "item" if template == "labels" else "film"
+    assert results.column(key) == [ENTITY + qid for qid in qids]
+
+
+def test_local_films_carry_the_lean_query_values(local):
+    results = api.execute_sparql_query(get_films_query("director", "Q1"), use_cache=False)
+
+    heat, thief = list(results)
+    assert heat == {
+        "film": ENTITY + "Q1025",
+        "director": ENTITY + "Q1",
+        "actors": "Q2 Q3",
+        "year": "1995",
+        "displayImage": "http://commons.wikimedia.org/wiki/Special:FilePath/Heat%20poster.jpg",
+        "genreIds": "Q959790",
+    }
+    assert (thief["year"], thief["actors"], thief["displayImage"], thief["genreIds"]) == ("1981", "Q2", None, None)
+
+
+def test_local_labels_fall_back_to_english_and_then_to_the_qid(local):
+    results = api.execute_sparql_query(get_labels_query(["Q2001", "Q1025", "Q3", "Q404"], "pt"), use_cache=False)
+
+    assert results.column("label") == ["Profissão: Ladrão", "Fogo Contra Fogo", "Robert De Niro", "Q404"]
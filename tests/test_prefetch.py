@@ -0,0 +1,40 @@
+import threading
+
+from src import prefetch
+from src.prefetch import Prefetcher
+
+
+def test_sessions_are_forgotten_once_their_tasks_finish(monkeypatch):
+    monkeypatch.setattr(prefetch, "execute_films_query", lambda query, language, priority: None)
+    prefetcher = Prefetcher(workers=2)
+
+    for session in range(50):
+        prefetcher.schedule(f"sessao-{session}", ["consulta-1", "consulta-2"])
+        for future in prefetcher._pending[f"sessao-{session}"]:
+            future.result(timeout=5)
+
+    prefetcher.schedule("ultima", [])
+    assert set(prefetcher._generations) == {"ultima"}
+    assert set(prefetcher._pending) == {"ultima"}
+    assert prefetcher.stats["executadas"] == 100
+
+
+def test_cancel_forgets_the_session_and_skips_its_pending_tasks(monkeypatch):
+    release = threading.Event()
+    ran = []
+
+    def slow_query(query, language, priority):
+        release.wait(timeout=5)
+        ran.append(query)
+
+    monkeypatch.setattr(prefetch, "execute_films_query", slow_query)
+    prefetcher = Prefetcher(workers=1)
+
+    prefetcher.schedule("sessao", ["primeira", "segunda", "terceira"])
+    prefetcher.cancel("sessao")
+    release.set()
+    prefetcher._executor.shutdown(wait=True)
+
+    assert "sessao" not in prefetcher._generations
+    assert "sessao" not in prefetcher._pending
+    assert ran in ([], ["primeira"])
@@ -0,0 +1,179 @@
+import json
+import threading
+import time
+
+import pytest
+
+from src import api
+from src.cache import QueryCache
+from src.http_client import SparqlClient, SparqlCircuitOpenError, SparqlUnavailableError
+from src.resilience import CircuitBreaker, RateLimiter, CLOSED, OPEN, HALF_OPEN, INTERACTIVE, BATCH, BACKGROUND
+
+QUERY = "SELECT ?film WHERE { ?film wdt:P57 wd:Q25191 }"
+
+
+def result(qid):
+    body = {
+        "head": {"vars": ["film"]},
+        "results": {"bindings": [{"film": {"type": "uri", "value": f"http://www.wikidata.org/entity/{qid}"}}]}
+    }
+    return 200, {"Content-Type": "application/sparql-results+json"}, json.dumps(body).encode("utf-8")
+
+
+UNAVAILABLE = (503, {"Content-Type": "text/plain"}, b"Service Unavailable")
+
+
+# Disjuntor
+
+def test_breaker_opens_after_threshold_and_closes_after_a_successful_trial():
+    breaker = CircuitBreaker(threshold=2, reset_seconds=0.1)
+    breaker.record_failure()
+    assert breaker.snapshot()["estado"] == CLOSED
+    breaker.record_failure()
+    assert breaker.snapshot()["estado"] == OPEN
+    assert not breaker.allow()
+
+    time.sleep(0.15)
+    assert breaker.snapshot()["estado"] == HALF_OPEN
+    # Só uma consulta de teste passa enquanto o circuito está semiaberto
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.snapshot()["estado"] == CLOSED
+    assert breaker.allow()
+
+
+def test_failed_trial_reopens_the_breaker():
+    breaker = CircuitBreaker(threshold=1, reset_seconds=0.1)
+    breaker.record_failure()
+    time.sleep(0.15)
+    assert breaker.allow()
+    breaker.record_failure()
+
+    assert breaker.snapshot()["estado"] == OPEN
+    assert breaker.stats["aberturas"] == 2
+    assert not breaker.allow()
+
+
+# Consultas com o Wikidata fora do ar: o endpoint local responde 503 até o disjuntor
+# abrir; o resultado vencido no cache continua sendo servido e, com o serviço de
+# volta, a revalidação em segundo plano o atualiza.
+
+@pytest.fixture
+def wikidata(stub_endpoint, monkeypatch):
+    client = SparqlClient(stub_endpoint.url, api.HEADERS, max_retries=0)
+    limiter = RateLimiter(rate=1000, burst=1000)
+    monkeypatch.setattr(api, "limiter", limiter)
+    monkeypatch.setattr(api, "backend", api.WikidataBackend(client, limiter, "json"))
+    monkeypatch.setattr(api, "single_flight", api.SingleFlight())
+    monkeypatch.setattr(api, "breaker", CircuitBreaker(threshold=2, reset_seconds=0.2))
+    monkeypatch.setattr(api, "query_cache", QueryCache(ttl=0, stale_ttl=3600, disk_path=None))
+    return stub_endpoint
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condição não atingida a tempo")
+        time.sleep(0.02)
+
+
+def test_stale_result_is_served_while_the_breaker_is_open_and_then_revalidated(wikidata):
+    wikidata.respond = lambda path, query: result("Q1")
+    assert list(api.execute_sparql_query(QUERY))[0]["film"].endswith("/Q1")
+
+    # Sem cache, as falhas chegam a quem consultou e abrem o disjuntor
+    wikidata.respond = lambda path, query: UNAVAILABLE
+    for _ in range(2):
+        with pytest.raises(SparqlUnavailableError):
+            api.execute_sparql_query(QUERY, use_cache=False)
+    assert api.breaker.snapshot()["estado"] == OPEN
+    with pytest.raises(SparqlCircuitOpenError):
+        api.execute_sparql_query(QUERY, use_cache=False)
+
+    # Com o circuito aberto, o resultado vencido é servido sem esperar o Wikidata,
+    # e a revalidação falha na hora sem chegar ao endpoint
+    calls = wikidata.count
+    stale = api.execute_sparql_query(QUERY)
+    assert stale.stale
+    assert list(stale)[0]["film"].endswith("/Q1")
+    wait_for(lambda: not api._revalidating)
+    assert wikidata.count == calls
+
+    # Passado o tempo de reabertura, a revalidação é a consulta de teste: ela fecha
+    # o circuito e atualiza o cache
+    wikidata.respond = lambda path, query: result("Q2")
+    time.sleep(0.25)
+    assert list(api.execute_sparql_query(QUERY))[0]["film"].endswith("/Q1")
+    wait_for(lambda: not api._revalidating)
+    assert wikidata.count == calls + 1
+    assert api.breaker.snapshot()["estado"] == CLOSED
+    cached, _ = api.query_cache.lookup(QUERY)
+    assert cached["columns"]["film"] == ["http://www.wikidata.org/entity/Q2"]
+
+
+# Limitador: com todas as vagas ocupadas, os tickets esperam e são liberados por
+# prioridade (interativa, lote, segundo plano) e, na mesma classe, por ordem de chegada.
+
+def queue_tickets(limiter, priorities):
+    released = []
+    lock = threading.Lock()
+    tickets = []
+
+    def worker(ticket):
+        if limiter.acquire(ticket) is not None:
+            with lock:
+                released.append(ticket)
+            limiter.release()
+
+    threads = []
+    for priority in priorities:
+        ticket = limiter.ticket(priority)
+        tickets.append(ticket)
+        thread = threading.Thread(target=worker, args=(ticket,))
+        thread.start()
+        threads.append(thread)
+    wait_for(lambda: sum(limiter.snapshot()["fila"].values()) == len(priorities))
+    return tickets, released, threads
+
+
+def test_saturated_limiter_releases_by_priority_then_arrival():
+    limiter = RateLimiter(rate=0, max_concurrent=1, queue_timeout=5)
+    holder = limiter.ticket(INTERACTIVE)
+    assert limiter.acquire(holder) is not None
+
+    tickets, released, threads = queue_tickets(limiter, [BACKGROUND, BATCH, INTERACTIVE, BACKGROUND, INTERACTIVE, BATCH])
+    assert limiter.snapshot()["fila"] == {INTERACTIVE: 2, BATCH: 2, BACKGROUND: 2}
+
+    limiter.release()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert released == [tickets[2], tickets[4], tickets[1], tickets[5], tickets[0], tickets[3]]
+
+
+def test_promoted_ticket_jumps_ahead_of_its_old_class():
+    limiter = RateLimiter(rate=0, max_concurrent=1, queue_timeout=5)
+    holder = limiter.ticket(INTERACTIVE)
+    limiter.acquire(holder)
+
+    tickets, released, threads = queue_tickets(limiter, [BATCH, BACKGROUND, BATCH])
+    tickets[1].promote(INTERACTIVE)
+    # Promover para uma classe menos prioritária não muda nada
+    tickets[0].promote(BACKGROUND)
+
+    limiter.release()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert released == [tickets[1], tickets[0], tickets[2]]
+    assert limiter.stats["promovidas"] == 1
+
+
+def test_ticket_gives_up_after_the_queue_timeout():
+    limiter = RateLimiter(rate=0, max_concurrent=1, queue_timeout=0.1)
+    limiter.acquire(limiter.ticket(INTERACTIVE))
+
+    assert limiter.acquire(limiter.ticket(BACKGROUND)) is None
+    assert limiter.stats["desistencias"] == 1
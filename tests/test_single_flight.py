@@ -0,0 +1,92 @@
+import json
+import threading
+
+import pytest
+
+from src import api
+from src.http_client import SparqlClient, SparqlQueryError
+from src.resilience import CircuitBreaker, RateLimiter
+
+THREADS = 8
+
+QUERY = "SELECT ?film WHERE { ?film wdt:P31 wd:Q11424 } LIMIT 1"
+
+RESULT = {
+    "head": {"vars": ["film"]},
+    "results": {"bindings": [{"film": {"type": "uri", "value": "http://www.wikidata.org/entity/Q25188"}}]}
+}
+
+
+# Backend, limitador, agrupamento e disjuntor novos, apontados para o endpoint local,
+# para que nenhum estado compartilhado de outros testes interfira na contagem
+
+@pytest.fixture
+def wikidata(stub_endpoint, monkeypatch):
+    client = SparqlClient(stub_endpoint.url, api.HEADERS, max_retries=0)
+    limiter = RateLimiter(rate=1000, burst=1000)
+    monkeypatch.setattr(api, "limiter", limiter)
+    monkeypatch.setattr(api, "backend", api.WikidataBackend(client, limiter, "json"))
+    monkeypatch.setattr(api, "single_flight", api.SingleFlight())
+    monkeypatch.setattr(api, "breaker", CircuitBreaker())
+    stub_endpoint.delay = 0.3
+    return stub_endpoint
+
+
+def run_concurrently(fn, threads=THREADS):
+    barrier = threading.Barrier(threads)
+    outcomes = [None] * threads
+
+    def worker(i):
+        barrier.wait()
+        try:
+            outcomes[i] = ("ok", fn())
+        except Exception as e:
+            outcomes[i] = ("erro", e)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join(timeout=10)
+    return outcomes
+
+
+def test_concurrent_identical_queries_make_one_upstream_call(wikidata):
+    wikidata.respond = lambda path, query: (
+        200, {"Content-Type": "application/sparql-results+json"}, json.dumps(RESULT).encode("utf-8")
+    )
+
+    outcomes = run_concurrently(lambda: api.execute_sparql_query(QUERY, use_cache=False))
+
+    assert wikidata.count == 1
+    assert all(status == "ok" for status, _ in outcomes)
+    results = [result for _, result in outcomes]
+    assert all(result is results[0] for result in results)
+    assert list(results[0])[0]["film"] == "http://www.wikidata.org/entity/Q25188"
+    assert api.single_flight.coalesced == THREADS - 1
+    assert api.single_flight.in_flight() == 0
+
+
+def test_upstream_error_reaches_every_waiter(wikidata):
+    wikidata.respond = lambda path, query: (400, {"Content-Type": "text/plain"}, b"MalformedQueryException")
+
+    outcomes = run_concurrently(lambda: api.execute_sparql_query(QUERY, use_cache=False))
+
+    assert wikidata.count == 1
+    assert all(status == "erro" for status, _ in outcomes)
+    errors = [error for _, error in outcomes]
+    assert all(isinstance(error, SparqlQueryError) for error in errors)
+    assert all(error is errors[0] for error in errors)
+    assert api.single_flight.in_flight() == 0
+
+
+def test_next_query_after_completion_goes_upstream_again(wikidata):
+    wikidata.respond = lambda path, query: (
+        200, {"Content-Type": "application/sparql-results+json"}, json.dumps(RESULT).encode("utf-8")
+    )
+    wikidata.delay = 0
+
+    api.execute_sparql_query(QUERY, use_cache=False)
+    api.execute_sparql_query(QUERY, use_cache=False)
+
+    assert wikidata.count == 2
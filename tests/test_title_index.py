@@ -0,0 +1,66 @@
+from pathlib import Path
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+from src import api, title_index as title_index_module
+from src.labels import label_cache
+from src.title_index import TitleIndex
+
+APP = str(Path(__file__).parent.parent / "src" / "app.py")
+
+ENTITY = "http://www.wikidata.org/entity/"
+
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    index = TitleIndex(path=tmp_path / "title_index.bin")
+    monkeypatch.setattr(title_index_module, "title_index", index)
+    return index
+
+
+def test_names_without_a_label_are_not_indexed(index):
+    index.add("Q1025", "Heat")
+    index.add("Q2001", "Q2001")
+    index.add("Q2002", "")
+    index.add("Q2003", None)
+
+    assert [qid for qid, _, _ in index.exact("heat")] == ["Q1025"]
+    assert index.exact("Q2001") == []
+    assert len(index) == 1
+
+
+def film_row(title, film, name):
+    return {
+        "title": title,
+        "film": ENTITY + film,
+        "filmName": name,
+        "year": 1995,
+        "director": None,
+        "actorTuples": "",
+        "genres": "",
+        "genreIds": "",
+    }
+
+
+# Sessão em português: o nome exibido é o rótulo em português (ou o QID, sem rótulo);
+# só o rótulo em inglês já conhecido entra no índice
+
+def fake_batch_title_query(titles, language):
+    yield "Heat", [film_row("Heat", "Q1025", "Fogo Contra Fogo"), film_row("Heat", "Q2001", "Q2001")]
+
+
+def test_only_english_titles_are_indexed_from_a_portuguese_session(index, monkeypatch):
+    monkeypatch.setattr(api, "execute_batch_title_query", fake_batch_title_query)
+    label_cache.put_many({"Q1025": "Heat"}, "en")
+    at = AppTest.from_file(APP, default_timeout=60).run()
+    at.selectbox(key="language").set_value("pt").run()
+
+    at.file_uploader(key="batch_csv").set_value(("titulos.csv", b"titulo\nHeat\n", "text/csv")).run()
+    at.button(key="batch_button").click().run()
+
+    assert not at.exception
+    assert list(at.session_state.batch_results["Filme"]) == ["Fogo Contra Fogo", "Q2001"]
+    assert [qid for qid, _, _ in index.exact("Heat")] == ["Q1025"]
+    assert index.exact("Fogo Contra Fogo") == []
+    assert len(index) == 1